@@ -0,0 +1,151 @@
+"""
+Async HTTP API for querying documents.
+
+Run with:
+    uvicorn api:app --workers 4
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from handler.async_llm_invoker import AsyncGPT4Assistant, create_openai_session
+from handler.async_qdrant_adapter import AsyncQdrantHandler
+from handler.async_query_retrieval import AsyncQdrantQueryHandler
+from handler.embedding_cache import EmbeddingCache
+from handler.answer_cache import SemanticAnswerCache
+from handler.context_assembler import ContextAssembler
+from handler.instrumentation import configure_instrumentation, instrumentation
+
+load_dotenv()
+
+QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+QDRANT_STORAGE_MODE = os.getenv("QDRANT_STORAGE_MODE", "per_document")
+QDRANT_COLLECTION_PROFILE = os.getenv("QDRANT_COLLECTION_PROFILE", "default")
+METRICS_SINKS = os.getenv("CLAUSEAI_METRICS", "").split(",")
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+
+configure_instrumentation(METRICS_SINKS, json_log_path=os.getenv("CLAUSEAI_METRICS_LOG") or None)
+
+
+class QueryRequest(BaseModel):
+    document_id: str
+    query: str
+    limit: int = 10
+    score_threshold: float = 0.1
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    http_session = create_openai_session()
+    app.state.http_session = http_session
+    app.state.qdrant_handler = AsyncQdrantHandler(
+        url=QDRANT_URL, api_key=QDRANT_API_KEY, storage_mode=QDRANT_STORAGE_MODE,
+        collection_profile=QDRANT_COLLECTION_PROFILE,
+    )
+    app.state.assistant = AsyncGPT4Assistant(OPENAI_API_KEY, http_session=http_session)
+    app.state.embedding_cache = EmbeddingCache()
+    app.state.answer_cache = SemanticAnswerCache(
+        similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")),
+        ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    )
+    yield
+    await app.state.qdrant_handler.close()
+    await http_session.close()
+
+
+app = FastAPI(title="ClauseAI", lifespan=lifespan)
+
+
+@app.get("/documents")
+async def list_documents():
+    return {"documents": await app.state.qdrant_handler.get_collection_names()}
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Serve Prometheus metrics when the Prometheus sink is enabled, otherwise the in-process stage totals.
+    """
+    if "prometheus" in (name.strip().lower() for name in METRICS_SINKS):
+        import prometheus_client
+        return PlainTextResponse(prometheus_client.generate_latest(), media_type=prometheus_client.CONTENT_TYPE_LATEST)
+    return instrumentation.snapshot()
+
+
+def get_query_client(request: QueryRequest) -> AsyncQdrantQueryHandler:
+    return AsyncQdrantQueryHandler(
+        document_id=request.document_id,
+        openai_api_key=OPENAI_API_KEY,
+        qdrant_client=app.state.qdrant_handler,
+        embedding_cache=app.state.embedding_cache,
+        http_session=app.state.http_session,
+    )
+
+
+async def retrieve_context(request: QueryRequest, query_vector: list = None):
+    return await get_query_client(request).query_response(
+        request.query, limit=request.limit, score_threshold=request.score_threshold, query_vector=query_vector
+    )
+
+
+@app.post("/query")
+async def query_document(request: QueryRequest):
+    query_vector, document_version = await asyncio.gather(
+        get_query_client(request).generate_vector_embedding(request.query),
+        app.state.qdrant_handler.get_document_version(request.document_id),
+    )
+    cached_answer = await asyncio.to_thread(
+        app.state.answer_cache.lookup, request.document_id, query_vector, document_version
+    )
+    if cached_answer:
+        return {"answer": cached_answer["answer"], "context": [], "cached": True}
+
+    qdrant_response = await retrieve_context(request, query_vector)
+    context_chunks = ContextAssembler(token_budget=CONTEXT_TOKEN_BUDGET).assemble(qdrant_response)
+    answer = await app.state.assistant.get_response(
+        task_type="general_query", context_chunks=context_chunks, query=request.query
+    )
+    if qdrant_response and not answer.startswith("An error occurred"):
+        await asyncio.to_thread(
+            app.state.answer_cache.store, request.document_id, request.query, query_vector, answer, document_version
+        )
+    return {"answer": answer, "context": qdrant_response, "cached": False}
+
+
+@app.post("/query/stream")
+async def stream_query_document(request: QueryRequest):
+    query_vector, document_version = await asyncio.gather(
+        get_query_client(request).generate_vector_embedding(request.query),
+        app.state.qdrant_handler.get_document_version(request.document_id),
+    )
+    cached_answer = await asyncio.to_thread(
+        app.state.answer_cache.lookup, request.document_id, query_vector, document_version
+    )
+    if cached_answer:
+        return StreamingResponse(iter([cached_answer["answer"]]), media_type="text/plain")
+
+    qdrant_response = await retrieve_context(request, query_vector)
+    context_chunks = ContextAssembler(token_budget=CONTEXT_TOKEN_BUDGET).assemble(qdrant_response)
+
+    async def stream_answer():
+        latency, deltas = {}, []
+        async for delta in app.state.assistant.stream_response(
+            task_type="general_query", context_chunks=context_chunks, query=request.query, latency=latency
+        ):
+            deltas.append(delta)
+            yield delta
+        # Reached only when the client read the whole answer; failed streams are not cached.
+        if qdrant_response and latency["error"] is None:
+            await asyncio.to_thread(
+                app.state.answer_cache.store, request.document_id, request.query, query_vector,
+                "".join(deltas), document_version,
+            )
+
+    return StreamingResponse(stream_answer(), media_type="text/plain")
@@ -0,0 +1,102 @@
+"""
+Benchmark the peak memory of document ingestion:
+- whole_document: `convert`, `split_file`, then the embedded batches streamed into the store.
+- convert_markdown: `convert` then `process_document`, which re-splits the Markdown page by page.
+- page_stream: `iter_markdown_sections` into `process_pages`, with the cached Markdown written to
+  a file as the pages pass, as the ingestion job worker and the bulk ingestor run it.
+
+Each measurement runs in a fresh process, so peak RSS is not shared between runs. Uploads are
+discarded, so the numbers exclude the vectors held by Qdrant.
+
+Usage:
+    python -m benchmarks.bench_chunking_memory --pages 50 200 800
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import FakeEmbeddingEngine, NullVectorStore
+from benchmarks.synthetic_pdf import write_pdf
+from handler.layout_identifier import PDFToMarkdownConverter, write_markdown_sections
+from handler.vector_generator import QdrantDocumentProcessor
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def whole_document(pdf_file: str, dimension: int) -> int:
+    converter = PDFToMarkdownConverter(pdf_file)
+    document_id, markdown_content = converter.convert()
+    processor = QdrantDocumentProcessor(
+        "offline", NullVectorStore(), markdown_content, document_id,
+        embedding_engine=FakeEmbeddingEngine(dimension=dimension),
+    )
+    split_documents = processor.split_file(markdown_content)
+    return processor.qdrant_client.store_batches(
+        processor.iter_embedding_batches(split_documents), collection_name=document_id
+    )
+
+
+def convert_markdown(pdf_file: str, dimension: int) -> int:
+    converter = PDFToMarkdownConverter(pdf_file)
+    document_id, markdown_content = converter.convert()
+    processor = QdrantDocumentProcessor(
+        "offline", NullVectorStore(), markdown_content, document_id,
+        embedding_engine=FakeEmbeddingEngine(dimension=dimension),
+    )
+    return processor.process_document()
+
+
+def page_stream(pdf_file: str, dimension: int) -> int:
+    converter = PDFToMarkdownConverter(pdf_file)
+    processor = QdrantDocumentProcessor(
+        "offline", NullVectorStore(), None, converter.generate_document_id(),
+        embedding_engine=FakeEmbeddingEngine(dimension=dimension),
+    )
+    with open(f"{pdf_file}.{os.getpid()}.md", "w", encoding="utf-8") as markdown_file:
+        return processor.process_pages(write_markdown_sections(converter.iter_markdown_sections(), markdown_file))
+
+
+MODES = {"whole_document": whole_document, "convert_markdown": convert_markdown, "page_stream": page_stream}
+
+
+def measure(mode: str, pdf_file: str, dimension: int, results):
+    # The splitter and the PDF reader are imported on first use; load them before the baseline,
+    # so the growth is the document's alone.
+    from langchain.text_splitter import RecursiveCharacterTextSplitter  # noqa: F401
+    from pypdf import PdfReader  # noqa: F401
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    chunks = MODES[mode](pdf_file, dimension)
+    results.put((chunks, time.perf_counter() - start, baseline, peak_rss_mb()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the peak memory of document ingestion.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--dimension", type=int, default=1536)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'pages':>6} {'mode':<16} {'chunks':>7} {'seconds':>8} {'peak RSS MB':>12} {'growth MB':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for page_count in args.pages:
+            pdf_file = write_pdf(os.path.join(workdir, f"contract_{page_count}.pdf"), page_count)
+            for mode in MODES:
+                results = context.Queue()
+                process = context.Process(target=measure, args=(mode, pdf_file, args.dimension, results))
+                process.start()
+                chunks, elapsed, baseline, peak = results.get()
+                process.join()
+                print(f"{page_count:>6} {mode:<16} {chunks:>7} {elapsed:>8.2f} {peak:>12.1f} {peak - baseline:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark the cold start of the app, query and ingestion paths: import time, resident memory, and
+which heavy dependencies each path loads.
+
+Every scenario runs in a fresh interpreter, so no module is shared between measurements:
+- startup: the handler modules imported by workflow.py (without Streamlit itself), as the app and
+  every spawned ingestion worker load them before doing any work.
+- worker_idle: an ingestion worker built and waiting for jobs.
+- query: startup, then a question answered over a stored document (fake embeddings and completion).
+- ingest: startup, then a synthetic PDF converted, chunked, embedded (fake) and stored.
+
+Qdrant runs in-process in ":memory:" mode and no network is used.
+
+Usage:
+    python -m benchmarks.bench_cold_start --repeat 3 --pages 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = [
+    "langchain", "langchain_core", "langchain_community", "langchain_text_splitters", "faiss", "unstructured",
+    "ocrmypdf", "pypdf", "openai", "aiohttp", "tiktoken", "qdrant_client", "numpy",
+]
+
+STARTUP = """
+import handler.qdrant_adapter, handler.query_retrieval, handler.portfolio_query, handler.context_assembler
+import handler.llm_invoker, handler.ingestion_cache, handler.embedding_cache, handler.answer_cache
+import handler.instrumentation, handler.embedding_scheduler, handler.ingestion_jobs
+"""
+
+SCENARIOS = {
+    "startup": "",
+    "worker_idle": """
+from handler.ingestion_jobs import IngestionJobWorker, JobQueue
+worker = IngestionJobWorker(JobQueue(os.path.join(workdir, "cache")), "offline", qdrant_url="http://localhost:6333")
+worker.process_next()
+""",
+    "query": """
+from benchmarks.fakes import FakeChatCompletion, FakeEmbeddingEngine
+from handler.context_assembler import ContextAssembler
+from handler.llm_invoker import GPT4Assistant
+from handler.qdrant_adapter import QdrantHandler
+from handler.query_retrieval import QdrantQueryHandler
+engine = FakeEmbeddingEngine(dimension=384)
+qdrant_handler = QdrantHandler(location=":memory:")
+texts = [f"Clause {idx}: either party may terminate this agreement upon thirty days notice." for idx in range(64)]
+qdrant_handler.store_batches(
+    iter([([{"text": text, "page": 1, "char_start": 0, "char_end": len(text)} for text in texts],
+           engine.embed_documents(texts))]),
+    collection_name="contract",
+    metadata={"embedding_backend": engine.backend, "embedding_model": engine.model_name},
+)
+query_client = QdrantQueryHandler("contract", "offline", qdrant_handler, embedding_engine=engine)
+results = query_client.query_response("What is the termination notice period?", limit=10, score_threshold=0.0)
+assistant = GPT4Assistant("offline", completion_fn=FakeChatCompletion())
+assistant.get_response("general_query", ContextAssembler().assemble(results), "What is the notice period?")
+""",
+    "ingest": """
+from benchmarks.fakes import FakeEmbeddingEngine
+from benchmarks.synthetic_pdf import write_pdf
+from handler.layout_identifier import PDFToMarkdownConverter
+from handler.qdrant_adapter import QdrantHandler
+from handler.vector_generator import QdrantDocumentProcessor
+pdf_file = write_pdf(os.path.join(workdir, "contract.pdf"), pages)
+converter = PDFToMarkdownConverter(pdf_file)
+processor = QdrantDocumentProcessor(
+    "offline", QdrantHandler(location=":memory:"), None, converter.generate_document_id(),
+    embedding_engine=FakeEmbeddingEngine(dimension=384),
+)
+processor.process_pages(converter.iter_document_pages())
+""",
+}
+
+RUNNER = """
+import os, resource, sys, time
+workdir, pages = sys.argv[1], int(sys.argv[2])
+start = time.perf_counter()
+{startup}
+import_seconds = time.perf_counter() - start
+{scenario}
+total_seconds = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    rss = next((int(line.split()[1]) / 1024 for line in f if line.startswith("VmRSS:")), None)
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print("RESULT " + json.dumps({{
+    "import_seconds": import_seconds,
+    "total_seconds": total_seconds,
+    "rss_mb": rss,
+    "peak_rss_mb": peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024,
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_scenario(name: str, workdir: str, pages: int) -> dict:
+    code = "import json\n" + RUNNER.format(startup=STARTUP, scenario=SCENARIOS[name], heavy=HEAVY_MODULES)
+    completed = subprocess.run(
+        [sys.executable, "-c", code, workdir, str(pages)],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    lines = [line for line in completed.stdout.splitlines() if line.startswith("RESULT ")]
+    if completed.returncode != 0 or not lines:
+        raise RuntimeError(f"Scenario '{name}' failed:\n{completed.stderr[-2000:]}")
+    return json.loads(lines[-1][len("RESULT "):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import time and memory of the app paths.")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per scenario (medians reported).")
+    parser.add_argument("--pages", type=int, default=20, help="Pages of the ingested PDF.")
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'scenario':<12} {'import s':>9} {'total s':>8} {'RSS MB':>7} {'peak MB':>8}  heavy modules loaded")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.scenarios:
+            runs = [run_scenario(name, workdir, args.pages) for _ in range(args.repeat)]
+            result = {
+                key: statistics.median(run[key] for run in runs)
+                for key in ("import_seconds", "total_seconds", "rss_mb", "peak_rss_mb")
+            }
+            result["loaded"] = runs[-1]["loaded"]
+            results[name] = result
+            print(
+                f"{name:<12} {result['import_seconds']:>9.2f} {result['total_seconds']:>8.2f} "
+                f"{result['rss_mb']:>7.0f} {result['peak_rss_mb']:>8.0f}  {', '.join(result['loaded']) or '-'}"
+            )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark collection profiles: recall versus memory versus search latency.
+
+Runs in Qdrant local mode by default. Local mode accepts but does not apply quantization or HNSW
+settings (it always searches exactly), so there the quantized recall is computed by replaying
+Qdrant's scheme in NumPy: int8 codes calibrated on a value quantile, or one sign bit per dimension,
+scored to fetch `limit * oversampling` candidates which are rescored with the original vectors.
+Pass `--url` to measure the real recall and latency of a Qdrant server instead.
+
+Memory is the estimated resident size per profile (see `CollectionProfile.ram_bytes_per_vector`),
+reported for the benchmark size and extrapolated to `--scale` vectors.
+
+Usage:
+    python -m benchmarks.bench_collection_profiles --points 20000 --dimension 1536 --scale 5000000
+"""
+import argparse
+import time
+import uuid
+
+import numpy as np
+
+from handler.collection_profiles import COLLECTION_PROFILES, PROFILE_BINARY, PROFILE_SCALAR
+from handler.qdrant_adapter import QdrantHandler
+
+
+def clustered_vectors(count: int, dimension: int, rng: np.random.Generator, clusters: int = None) -> np.ndarray:
+    """
+    Unit vectors drawn around cluster centres with a shared offset, which resembles the
+    anisotropy of text embeddings better than uniform random vectors.
+    """
+    clusters = clusters or max(1, count // 50)
+    offset = rng.standard_normal(dimension).astype(np.float32) * 0.5
+    centres = rng.standard_normal((clusters, dimension)).astype(np.float32) + offset
+    vectors = centres[rng.integers(0, clusters, count)] + rng.standard_normal((count, dimension)).astype(np.float32) * 0.6
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, scores.shape[1])
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, candidates, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def quantized_candidates(profile, vectors: np.ndarray, queries: np.ndarray, count: int) -> np.ndarray:
+    """
+    Replay the quantized scoring of a profile and return the `count` best candidates per query.
+    """
+    if profile.quantization == PROFILE_SCALAR:
+        low, high = np.quantile(vectors, [1 - profile.scalar_quantile, profile.scalar_quantile])
+        scale = (high - low) / 255.0
+        decoded = np.clip(np.round((vectors - low) / scale), 0, 255).astype(np.float32) * scale + low
+        decoded_queries = np.clip(np.round((queries - low) / scale), 0, 255).astype(np.float32) * scale + low
+        return top_k(decoded_queries @ decoded.T, count)
+    if profile.quantization == PROFILE_BINARY:
+        bits = np.where(vectors > 0, 1.0, -1.0).astype(np.float32)
+        query_bits = np.where(queries > 0, 1.0, -1.0).astype(np.float32)
+        return top_k(query_bits @ bits.T, count)
+    return top_k(queries @ vectors.T, count)
+
+
+def emulated_recall(profile, vectors, queries, truth, limit: int, rescore: bool) -> float:
+    oversampling = (profile.oversampling or 1.0) if rescore else 1.0
+    candidates = quantized_candidates(profile, vectors, queries, int(limit * oversampling))
+    if rescore:
+        exact = np.einsum("qd,qcd->qc", queries, vectors[candidates])
+        candidates = np.take_along_axis(candidates, top_k(exact, limit), axis=1)
+    candidates = candidates[:, :limit]
+    return float(np.mean([len(set(found) & set(expected)) / limit for found, expected in zip(candidates, truth)]))
+
+
+def bench_profile(name: str, vectors, queries, truth, limit: int, url: str, api_key: str) -> dict:
+    profile = COLLECTION_PROFILES[name]
+    if url:
+        handler = QdrantHandler(url=url, api_key=api_key, collection_profile=profile)
+    else:
+        handler = QdrantHandler(location=":memory:", collection_profile=profile)
+    collection = f"bench_profile_{name}_{uuid.uuid4().hex[:8]}"
+    batches = (
+        ([{"text": str(idx)} for idx in range(start, min(start + 1024, len(vectors)))], vectors[start:start + 1024])
+        for start in range(0, len(vectors), 1024)
+    )
+    start = time.perf_counter()
+    handler.store_batches(batches, collection_name=collection)
+    upload_seconds = time.perf_counter() - start
+
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results = handler.search_qdrant(collection, query.tolist(), limit=limit, score_threshold=0.0)
+        latencies.append(time.perf_counter() - start)
+        found.append([result["id"] for result in results])
+    if url:
+        recall = float(np.mean([len(set(ids) & set(expected)) / limit for ids, expected in zip(found, truth)]))
+        recall_no_rescore = None
+        handler.qdrant_client.delete_collection(collection)
+    else:
+        recall = emulated_recall(profile, vectors, queries, truth, limit, rescore=profile.rescore)
+        recall_no_rescore = emulated_recall(profile, vectors, queries, truth, limit, rescore=False)
+    handler.registry.remove(collection)
+
+    return {
+        "profile": name,
+        "recall": recall,
+        "recall_no_rescore": recall_no_rescore,
+        "ram_bytes_per_vector": profile.ram_bytes_per_vector(vectors.shape[1]),
+        "upload_seconds": upload_seconds,
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p99_ms": float(np.percentile(latencies, 99) * 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall, memory and latency of collection profiles.")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--scale", type=int, default=5_000_000, help="Extrapolate memory to this many vectors.")
+    parser.add_argument("--profiles", nargs="+", default=list(COLLECTION_PROFILES))
+    parser.add_argument("--url", default=None, help="Benchmark a Qdrant server instead of local mode.")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = clustered_vectors(args.points, args.dimension, rng)
+    sample = rng.choice(args.points, args.queries, replace=False)
+    queries = vectors[sample] + rng.standard_normal((args.queries, args.dimension)).astype(np.float32) * 0.02
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = top_k(queries @ vectors.T, args.limit)
+
+    mode = f"server {args.url}" if args.url else "local mode, quantized recall emulated"
+    print(f"{args.points} vectors x {args.dimension} dims, {args.queries} queries, recall@{args.limit} ({mode})")
+    print(f"{'profile':<10} {'recall':>7} {'no rescore':>11} {'B/vector':>9} "
+          f"{'RAM MB':>9} {'RAM GB @ scale':>15} {'p50 ms':>8} {'p99 ms':>8}")
+    for name in args.profiles:
+        result = bench_profile(name, vectors, queries, truth, args.limit, args.url, args.api_key)
+        no_rescore = f"{result['recall_no_rescore']:.3f}" if result["recall_no_rescore"] is not None else "-"
+        print(
+            f"{name:<10} {result['recall']:>7.3f} {no_rescore:>11} {result['ram_bytes_per_vector']:>9} "
+            f"{result['ram_bytes_per_vector'] * args.points / 2**20:>9.1f} "
+            f"{result['ram_bytes_per_vector'] * args.scale / 2**30:>15.2f} "
+            f"{result['latency_p50_ms']:>8.2f} {result['latency_p99_ms']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
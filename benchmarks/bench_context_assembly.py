@@ -0,0 +1,108 @@
+"""
+Benchmark the prompt context of general queries: the raw list of payload dicts that used to be
+interpolated into the prompt versus the spans built by ContextAssembler.
+
+Chunks come from the same splitters as ingestion: page-aware chunks with offsets, and the legacy
+`split_file` chunks with 100-character overlaps and no offsets. Retrieval is emulated offline with
+bag-of-words cosine similarity between a question and the chunks. The synthetic text has little
+topical locality, so fewer retrieved chunks are neighbours than with real documents and embeddings,
+and the measured reduction is a lower bound.
+
+Usage:
+    python -m benchmarks.bench_context_assembly --pages 40 --queries 50 --limit 10 --budget 2000
+"""
+import argparse
+import random
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+from benchmarks.synthetic_pdf import CLAUSES, page_lines
+from handler.context_assembler import ContextAssembler
+from handler.vector_generator import QdrantDocumentProcessor
+
+_WORD = re.compile(r"\w+")
+
+
+def bag_of_words(texts, vocabulary: dict) -> np.ndarray:
+    matrix = np.zeros((len(texts), len(vocabulary)), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word, count in Counter(_WORD.findall(text.lower())).items():
+            if word in vocabulary:
+                matrix[row, vocabulary[word]] = count
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-9)
+
+
+def retrieve(payloads: list, questions: list, limit: int) -> list:
+    """
+    Return the `limit` most similar payloads per question, formatted like `search_qdrant` results.
+    """
+    vocabulary = {}
+    for payload in payloads:
+        for word in _WORD.findall(payload["text"].lower()):
+            vocabulary.setdefault(word, len(vocabulary))
+    chunk_vectors = bag_of_words([payload["text"] for payload in payloads], vocabulary)
+    scores = bag_of_words(questions, vocabulary) @ chunk_vectors.T
+    return [
+        [{"id": int(index), "payload": payloads[index], "score": float(row[index])} for index in np.argsort(-row)[:limit]]
+        for row in scores
+    ]
+
+
+def measure(name: str, results_per_query: list, assembler: ContextAssembler) -> dict:
+    raw_tokens, packed_tokens, spans, seconds = [], [], [], []
+    for results in results_per_query:
+        raw_tokens.append(assembler.count_tokens(str([result["payload"] for result in results])))
+        start = time.perf_counter()
+        assembler.assemble(results)
+        seconds.append(time.perf_counter() - start)
+        packed_tokens.append(assembler.last_stats["tokens"])
+        spans.append(assembler.last_stats["spans"])
+    return {
+        "chunking": name,
+        "raw_tokens": float(np.mean(raw_tokens)),
+        "packed_tokens": float(np.mean(packed_tokens)),
+        "reduction": 1 - float(np.sum(packed_tokens)) / float(np.sum(raw_tokens)),
+        "spans_per_query": float(np.mean(spans)),
+        "assemble_ms": float(np.mean(seconds) * 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the token cost of assembled prompt contexts.")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=10, help="Chunks retrieved per query.")
+    parser.add_argument("--budget", type=int, default=2000, help="Token budget of the assembled context.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [{"page": number, "text": "\n".join(page_lines(number, rng))} for number in range(1, args.pages + 1)]
+    questions = [
+        f"{rng.choice(['What does', 'Where does', 'Does'])} the agreement say: {rng.choice(CLAUSES)}"
+        for _ in range(args.queries)
+    ]
+    processor = QdrantDocumentProcessor(None, None, "", "benchmark")
+    page_payloads = list(processor.iter_page_chunks(pages))
+    legacy_payloads = [
+        {"text": document.page_content}
+        for document in processor.split_file("\n\n".join(page["text"] for page in pages))
+    ]
+
+    assembler = ContextAssembler(token_budget=args.budget)
+    tokenizer = "tiktoken" if assembler.encoding is not None else "estimated (4 characters per token)"
+    print(f"{args.pages} pages, {args.queries} queries, top {args.limit} chunks, budget {args.budget}, tokens {tokenizer}")
+    print(f"{'chunking':<10} {'raw tokens':>11} {'packed':>8} {'reduction':>10} {'spans':>6} {'assemble ms':>12}")
+    for name, payloads in (("page", page_payloads), ("legacy", legacy_payloads)):
+        result = measure(name, retrieve(payloads, questions, args.limit), assembler)
+        print(
+            f"{name:<10} {result['raw_tokens']:>11.0f} {result['packed_tokens']:>8.0f} "
+            f"{result['reduction']:>9.1%} {result['spans_per_query']:>6.1f} {result['assemble_ms']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark embedding throughput of the available backends on synthetic contract chunks.
+
+Usage:
+    python -m benchmarks.bench_embedding_backends --chunks 512 --backends local openai
+
+The OpenAI backend needs OPENAI_API_KEY; the local backend needs sentence-transformers.
+"""
+import argparse
+import os
+import random
+import time
+
+from dotenv import load_dotenv
+
+from handler.embedding_engine import get_embedding_engine
+
+CLAUSES = [
+    "The Receiving Party shall hold the Confidential Information in strict confidence",
+    "This Agreement shall be governed by and construed in accordance with the laws of the State of Delaware",
+    "Either party may terminate this Agreement upon thirty (30) days prior written notice",
+    "The Supplier shall indemnify and hold harmless the Customer from any third-party claims",
+    "All invoices are payable within forty-five (45) days of receipt",
+]
+
+
+def synthetic_chunks(count: int, chunk_chars: int = 1000, seed: int = 0):
+    rng = random.Random(seed)
+    chunks = []
+    for idx in range(count):
+        text = f"Section {idx}. "
+        while len(text) < chunk_chars:
+            text += rng.choice(CLAUSES) + f" (ref {rng.randint(0, 10_000)}). "
+        chunks.append(text[:chunk_chars])
+    return chunks
+
+
+def bench_backend(backend: str, chunks, batch_size: int, queries: int):
+    engine = get_embedding_engine(backend, openai_api_key=os.getenv("OPENAI_API_KEY"))
+    engine.embed_documents(chunks[:2])
+
+    start = time.perf_counter()
+    for offset in range(0, len(chunks), batch_size):
+        vectors = engine.embed_documents(chunks[offset:offset + batch_size])
+    ingest_seconds = time.perf_counter() - start
+
+    latencies = []
+    for text in chunks[:queries]:
+        start = time.perf_counter()
+        engine.embed_query(text[:120])
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(
+        f"{backend:<8} {engine.model_name:<42} dim {vectors.shape[1]:>5}  "
+        f"{len(chunks) / ingest_seconds:9.1f} chunks/sec  "
+        f"query p50 {latencies[len(latencies) // 2] * 1000:8.1f} ms"
+    )
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends.")
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--backends", nargs="+", default=["local", "openai"])
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.chunks)
+    for backend in args.backends:
+        try:
+            bench_backend(backend, chunks, args.batch_size, args.queries)
+        except Exception as e:
+            print(f"{backend:<8} skipped: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark concurrent ingestions embedding against a rate-limited endpoint, with and without the
+EmbeddingScheduler.
+
+A local FakeOpenAIServer enforces the tokens- and requests-per-minute limits and answers with 429s
+beyond them. Each ingestion embeds the chunks of a synthetic contract:
+- unscheduled: requests of up to 1000 texts sent back to back, as the client did before; the first
+  429 fails the ingestion.
+- scheduled: batches of 256 chunks, as `QdrantDocumentProcessor.iter_payload_batches` sends them,
+  embedded through OpenAIEmbeddingEngine, so all ingestions share one scheduler.
+
+Utilization is the share of the tokens the server could have admitted during the run (its burst plus
+its per-minute rate over the elapsed time) that were embedded; it is not reported for runs with
+failed ingestions.
+
+Usage:
+    python -m benchmarks.bench_embedding_scheduler --ingestions 4 --pages 30 --tpm 600000 --rpm 600
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import openai
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from benchmarks.synthetic_pdf import page_lines
+from handler.embedding_engine import OpenAIEmbeddingEngine
+from handler.embedding_scheduler import configure_embedding_scheduler
+from handler.vector_generator import QdrantDocumentProcessor
+
+MODEL = "text-embedding-3-small"
+
+
+def document_chunks(document_index: int, pages: int) -> list:
+    rng = random.Random(document_index)
+    page_stream = (
+        {"page": number, "text": f"Contract {document_index}\n" + "\n".join(page_lines(number, rng))}
+        for number in range(1, pages + 1)
+    )
+    processor = QdrantDocumentProcessor(None, None, "", f"contract_{document_index}")
+    return [payload["text"] for payload in processor.iter_page_chunks(page_stream)]
+
+
+def ingest_unscheduled(texts: list) -> int:
+    for start in range(0, len(texts), 1000):
+        openai.Embedding.create(input=texts[start:start + 1000], model=MODEL, api_key="sk-fake")
+    return len(texts)
+
+
+def ingest_scheduled(texts: list) -> int:
+    engine = OpenAIEmbeddingEngine("sk-fake", model_name=MODEL)
+    embedded = 0
+    chunks = iter(texts)
+    while True:
+        batch = list(islice(chunks, 256))
+        if not batch:
+            return embedded
+        embedded += len(engine.embed_documents(batch))
+
+
+def run(name: str, ingest, documents: list, args) -> dict:
+    server = FakeOpenAIServer(tokens_per_minute=args.tpm, requests_per_minute=args.rpm,
+                              burst_seconds=args.burst, latency=args.latency).start()
+    openai.api_base = server.url
+    failed = 0
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=len(documents)) as executor:
+            futures = [executor.submit(ingest, texts) for texts in documents]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"  {name}: ingestion failed: {e}")
+    finally:
+        elapsed = time.perf_counter() - start
+        server.stop()
+    admissible = server.limiter.token_capacity + args.tpm / 60 * elapsed
+    return {
+        "mode": name,
+        "seconds": elapsed,
+        "tokens_per_second": server.stats["tokens"] / elapsed,
+        "utilization": server.stats["tokens"] / admissible if not failed else None,
+        "requests": server.stats["requests"],
+        "throttled": server.stats["throttled"],
+        "failed": failed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding throughput under rate limits.")
+    parser.add_argument("--ingestions", type=int, default=4, help="Documents ingested concurrently.")
+    parser.add_argument("--pages", type=int, default=30, help="Pages per document.")
+    parser.add_argument("--tpm", type=int, default=600_000, help="Tokens per minute enforced by the server.")
+    parser.add_argument("--rpm", type=int, default=600, help="Requests per minute enforced by the server.")
+    parser.add_argument("--burst", type=float, default=2.0, help="Seconds of budget the server admits at once.")
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per request.")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    args = parser.parse_args()
+
+    documents = [document_chunks(index, args.pages) for index in range(args.ingestions)]
+    # The scheduler is given the server's limits, as OPENAI_EMBEDDING_TPM/RPM would be set in production.
+    configure_embedding_scheduler(tokens_per_minute=args.tpm, requests_per_minute=args.rpm,
+                                  max_in_flight=args.max_in_flight, burst_seconds=args.burst, base_delay=0.25)
+    print(f"{args.ingestions} ingestions x {len(documents[0])} chunks, limits {args.tpm} TPM / {args.rpm} RPM")
+    print(f"{'mode':<12} {'seconds':>8} {'tokens/s':>9} {'utilization':>12} {'requests':>9} {'429s':>6} {'failed':>7}")
+    for name, ingest in (("unscheduled", ingest_unscheduled), ("scheduled", ingest_scheduled)):
+        result = run(name, ingest, documents, args)
+        utilization = f"{result['utilization']:.1%}" if result["utilization"] is not None else "n/a"
+        print(
+            f"{name:<12} {result['seconds']:>8.2f} {result['tokens_per_second']:>9.0f} {utilization:>12} "
+            f"{result['requests']:>9} {result['throttled']:>6} {result['failed']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark PDF text extraction: the original single-core loop versus the sequential
+and process-pool page scans of PDFToMarkdownConverter.
+
+Usage:
+    python -m benchmarks.bench_pdf_extraction path/to/contract.pdf --workers 8
+"""
+import argparse
+import os
+import time
+
+from pypdf import PdfReader
+
+from handler.layout_identifier import PDFToMarkdownConverter
+
+
+def legacy_extract(pdf_file: str):
+    """
+    The extraction path before page streaming: string concatenation plus a second
+    pass that decodes every image just to count them.
+    """
+    reader = PdfReader(pdf_file)
+    full_text = ""
+    for idx, page in enumerate(reader.pages):
+        text = page.extract_text()
+        if len(text) > 0:
+            full_text += f"### Page {idx + 1}\n\n{text}\n\n"
+    image_count = 0
+    for page in reader.pages:
+        image_count += len(page.images)
+    return full_text.strip(), image_count
+
+
+def streamed_extract(pdf_file: str, parallel: bool, workers: int, pages_per_task: int):
+    """
+    The page-streaming path of PDFToMarkdownConverter.
+    """
+    converter = PDFToMarkdownConverter(
+        pdf_file, parallel=parallel, max_workers=workers, pages_per_task=pages_per_task
+    )
+    return converter._extract_text_from_pdf(), converter._count_images()
+
+
+def run(label: str, fn, page_total: int, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{label:<22} best {best:8.3f}s  {page_total / best:10.1f} pages/sec")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction throughput.")
+    parser.add_argument("pdf_file", help="Path to the PDF file to extract.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pages-per-task", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    page_total = len(PdfReader(args.pdf_file).pages)
+    print(f"{args.pdf_file}: {page_total} pages, {args.workers} workers")
+    baseline = run("legacy", lambda: legacy_extract(args.pdf_file), page_total, args.repeat)
+    sequential = run(
+        "streamed (1 core)",
+        lambda: streamed_extract(args.pdf_file, False, 1, args.pages_per_task),
+        page_total,
+        args.repeat,
+    )
+    parallel = run(
+        f"streamed ({args.workers} procs)",
+        lambda: streamed_extract(args.pdf_file, True, args.workers, args.pages_per_task),
+        page_total,
+        args.repeat,
+    )
+    print(f"speedup vs legacy: sequential {baseline / sequential:.2f}x, parallel {baseline / parallel:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
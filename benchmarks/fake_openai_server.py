@@ -0,0 +1,190 @@
+"""
+A local stand-in for the OpenAI embeddings endpoint that enforces tokens- and requests-per-minute limits.
+
+Requests over the limits are rejected like the real API: HTTP 429 with a `rate_limit_exceeded` error
+and a Retry-After header. Embeddings are deterministic unit vectors seeded by the SHA-256 of each text,
+returned base64-encoded as the `openai` client requests them.
+
+Point the client at it with `openai.api_base = server.url`.
+
+Usage:
+    python -m benchmarks.fake_openai_server --port 8765 --tpm 600000 --rpm 600
+"""
+import argparse
+import base64
+import hashlib
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class RateLimiter:
+    """
+    Token buckets holding `burst_seconds` of the per-minute limits, as the API enforces them
+    over short windows rather than per calendar minute.
+    """
+
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int, burst_seconds: float = 10.0):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.token_capacity = tokens_per_minute * burst_seconds / 60
+        self.request_capacity = max(1.0, requests_per_minute * burst_seconds / 60)
+        self.tokens = self.token_capacity
+        self.requests = self.request_capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def admit(self, tokens: int) -> float:
+        """
+        Spend the budget of a request, or return the seconds until it would fit (0.0 when admitted).
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            self.tokens = min(self.token_capacity, self.tokens + elapsed * self.tokens_per_minute / 60)
+            self.requests = min(self.request_capacity, self.requests + elapsed * self.requests_per_minute / 60)
+            wait = max(
+                (min(tokens, self.token_capacity) - self.tokens) * 60 / self.tokens_per_minute,
+                (1 - self.requests) * 60 / self.requests_per_minute,
+            )
+            if wait > 0:
+                return wait
+            self.tokens -= tokens
+            self.requests -= 1
+            return 0.0
+
+
+class FakeOpenAIServer:
+    """
+    Serves `POST /v1/embeddings` on a background thread.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, tokens_per_minute: int = 600_000,
+                 requests_per_minute: int = 600, burst_seconds: float = 10.0, latency: float = 0.05,
+                 dimension: int = 256):
+        """
+        Args:
+            host (str): The interface to listen on.
+            port (int): The port to listen on (0 picks a free port).
+            tokens_per_minute (int): The enforced tokens-per-minute limit.
+            requests_per_minute (int): The enforced requests-per-minute limit.
+            burst_seconds (float): The seconds of budget that can be spent at once.
+            latency (float): The simulated processing time of a request in seconds.
+            dimension (int): The dimension of the returned embeddings.
+        """
+        self.limiter = RateLimiter(tokens_per_minute, requests_per_minute, burst_seconds=burst_seconds)
+        self.latency = latency
+        self.dimension = dimension
+        self.stats = {"requests": 0, "throttled": 0, "tokens": 0}
+        self._stats_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        return max(1, math.ceil(len(text) / 4))
+
+    def embed(self, text: str) -> str:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+        return base64.b64encode((vector / np.linalg.norm(vector)).tobytes()).decode("ascii")
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, body: dict, headers: dict = None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.rstrip("/").endswith("/embeddings"):
+                    self._reply(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+                    return
+                texts = body.get("input") or []
+                texts = [texts] if isinstance(texts, str) else texts
+                tokens = sum(server.count_tokens(text) for text in texts)
+                wait = server.limiter.admit(tokens)
+                if wait > 0:
+                    server._count(throttled=1)
+                    self._reply(
+                        429,
+                        {"error": {"message": f"Rate limit reached for {body.get('model')}. Please try again in "
+                                              f"{wait:.3f}s.", "type": "requests", "code": "rate_limit_exceeded"}},
+                        headers={"Retry-After": f"{wait:.3f}", "Retry-After-Ms": str(math.ceil(wait * 1000))},
+                    )
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                server._count(requests=1, tokens=tokens)
+                self._reply(200, {
+                    "object": "list",
+                    "data": [
+                        {"object": "embedding", "index": index, "embedding": server.embed(text)}
+                        for index, text in enumerate(texts)
+                    ],
+                    "model": body.get("model"),
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                })
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a rate-limited fake OpenAI embeddings endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tpm", type=int, default=600_000, help="Tokens per minute.")
+    parser.add_argument("--rpm", type=int, default=600, help="Requests per minute.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request.")
+    parser.add_argument("--dimension", type=int, default=256)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.host, args.port, tokens_per_minute=args.tpm, requests_per_minute=args.rpm,
+                              latency=args.latency, dimension=args.dimension)
+    print(f"Serving fake embeddings on {server.url} ({args.tpm} TPM, {args.rpm} RPM). Press Ctrl+C to stop.")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
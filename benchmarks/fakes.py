@@ -0,0 +1,79 @@
+"""
+Deterministic offline stand-ins for the OpenAI embedding and chat backends.
+"""
+import hashlib
+import time
+
+import numpy as np
+
+from handler.embedding_engine import EmbeddingEngine
+
+
+class FakeEmbeddingEngine(EmbeddingEngine):
+    """
+    Embeds each text as a unit vector seeded by its SHA-256, so identical texts always
+    get identical vectors. `latency_per_call` simulates the network round trip.
+    """
+    backend = "fake"
+
+    def __init__(self, dimension: int = 1536, latency_per_call: float = 0.0):
+        super().__init__(f"fake-{dimension}")
+        self.dimension = dimension
+        self.latency_per_call = latency_per_call
+
+    def _embed(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def embed_documents(self, texts):
+        if self.latency_per_call:
+            time.sleep(self.latency_per_call)
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.vstack([self._embed(text) for text in texts])
+
+
+class FakeChatCompletion:
+    """
+    A drop-in for `openai.ChatCompletion.create` that answers with a fixed-size, deterministic reply.
+
+    Supports `stream=True`, yielding the reply word by word.
+    """
+
+    def __init__(self, reply_words: int = 120, latency: float = 0.0):
+        self.reply_words = reply_words
+        self.latency = latency
+        self.calls = 0
+
+    def _reply(self, messages) -> str:
+        digest = hashlib.sha256(messages[-1]["content"].encode("utf-8")).hexdigest()
+        return " ".join(f"w{digest[idx % len(digest)]}{idx}" for idx in range(self.reply_words))
+
+    def __call__(self, model: str, messages: list, stream: bool = False, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        content = self._reply(messages)
+        if not stream:
+            return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+        return (
+            {"choices": [{"delta": {"content": word + " "}}]}
+            for word in content.split(" ")
+        )
+
+
+class NullVectorStore:
+    """
+    Stands in for QdrantHandler on the ingestion path and discards the uploaded batches, so a
+    benchmark measures the pipeline itself rather than the vectors kept by in-process Qdrant.
+    """
+    is_local = True
+
+    def __init__(self):
+        self.points = 0
+
+    def store_batches(self, batches, collection_name: str, upload_workers: int = 4, metadata: dict = None) -> int:
+        for payloads, vectors in batches:
+            self.points += len(payloads)
+        return self.points
@@ -0,0 +1,188 @@
+"""
+Offline benchmark suite for the ingestion and query hot paths.
+
+Runs without OpenAI or a Qdrant server: embeddings and chat completions come from the
+deterministic fakes in benchmarks.fakes, and Qdrant runs in-process (":memory:" or a local path).
+Results are written as JSON so runs can be compared between releases.
+
+Usage:
+    python -m benchmarks.run_suite --pages 10 100 400 --repeat 3 --output bench_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.fakes import FakeChatCompletion, FakeEmbeddingEngine
+from benchmarks.synthetic_pdf import write_pdf
+from handler.layout_identifier import PDFToMarkdownConverter, write_markdown_sections
+from handler.llm_invoker import GPT4Assistant
+from handler.qdrant_adapter import QdrantHandler
+from handler.query_retrieval import QdrantQueryHandler
+from handler.vector_generator import QdrantDocumentProcessor
+
+QUERIES = [
+    "What is the termination notice period?",
+    "Who are the parties to the agreement?",
+    "Which law governs the contract?",
+    "What are the payment terms?",
+    "Is there a change of control clause?",
+    "What are the confidentiality obligations?",
+    "Who indemnifies whom?",
+    "Is liability for consequential damages excluded?",
+]
+
+
+class StageRecorder:
+    """
+    Collects per-stage latency samples and item counts.
+    """
+
+    def __init__(self):
+        self.samples = {}
+
+    def time(self, stage: str, fn, items=1):
+        """
+        Time one call of `fn`. `items` is the number of items processed, or a callable
+        computing it from the result.
+        """
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        self.samples.setdefault(stage, []).append((elapsed, items(result) if callable(items) else items))
+        return result
+
+    def summary(self) -> dict:
+        stages = {}
+        for stage, samples in self.samples.items():
+            latencies = np.array([elapsed for elapsed, _ in samples])
+            items = sum(count for _, count in samples)
+            stages[stage] = {
+                "runs": len(samples),
+                "items": items,
+                "total_seconds": float(latencies.sum()),
+                "throughput_per_second": float(items / latencies.sum()) if latencies.sum() else None,
+                "latency_ms": {
+                    "p50": float(np.percentile(latencies, 50) * 1000),
+                    "p90": float(np.percentile(latencies, 90) * 1000),
+                    "p99": float(np.percentile(latencies, 99) * 1000),
+                    "max": float(latencies.max() * 1000),
+                },
+            }
+        return stages
+
+
+def bench_document(page_count: int, repeat: int, workdir: str, qdrant_path: str, dimension: int,
+                   batch_size: int, queries: int, parallel: bool) -> dict:
+    """
+    Benchmark every stage on one synthetic document of `page_count` pages.
+
+    Ingestion is timed as the job worker and the bulk ingestor run it: `iter_markdown_sections` into
+    `process_pages`, with the Markdown written to a file as the pages pass.
+    """
+    recorder = StageRecorder()
+    pdf_file = write_pdf(os.path.join(workdir, f"contract_{page_count}.pdf"), page_count)
+    engine = FakeEmbeddingEngine(dimension=dimension)
+    assistant = GPT4Assistant("offline", completion_fn=FakeChatCompletion())
+    qdrant_handler = QdrantHandler(location=None if qdrant_path else ":memory:", path=qdrant_path)
+    markdown_path = os.path.join(workdir, f"contract_{page_count}.md")
+
+    def ingest(document_id: str) -> int:
+        converter = PDFToMarkdownConverter(pdf_file, parallel=parallel)
+        processor = QdrantDocumentProcessor(
+            "offline", qdrant_handler, None, document_id, embedding_engine=engine, batch_size=batch_size,
+        )
+        with open(markdown_path, "w", encoding="utf-8") as markdown_file:
+            return processor.process_pages(write_markdown_sections(converter.iter_markdown_sections(), markdown_file))
+
+    # The splitter, the PDF reader, Qdrant's collection setup and the prompt templates load on first
+    # use; warm them up untimed so the first run is not an outlier.
+    ingest(f"bench_{page_count}_warmup")
+    qdrant_handler.delete_document(f"bench_{page_count}_warmup")
+    assistant.build_prompt("general_query", [], QUERIES[0])
+
+    for run in range(repeat):
+        document_id = f"bench_{page_count}_{run}"
+        chunk_count = recorder.time("ingest_pages", lambda: ingest(document_id), items=page_count)
+
+        query_client = QdrantQueryHandler(document_id, "offline", qdrant_handler, embedding_engine=engine)
+        for query in (QUERIES * (queries // len(QUERIES) + 1))[:queries]:
+            query_vector = query_client.generate_vector_embedding(query)
+            results = recorder.time(
+                "search_qdrant",
+                lambda: qdrant_handler.search_qdrant(document_id, query_vector, limit=10, score_threshold=0.0),
+            )
+            context_chunks = [result["payload"] for result in results]
+            recorder.time(
+                "prompt_formatting",
+                lambda: assistant.build_prompt("general_query", context_chunks, query),
+            )
+            recorder.time(
+                "llm_fake_completion",
+                lambda: assistant.get_response("general_query", context_chunks, query),
+            )
+
+    return {
+        "pages": page_count,
+        "chunks": chunk_count,
+        "markdown_bytes": os.path.getsize(markdown_path),
+        "stages": recorder.summary(),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline ClauseAI benchmark suite.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--parallel", action="store_true", help="Use the process-pool PDF extraction.")
+    parser.add_argument("--qdrant-path", default=None, help="Run Qdrant local mode on disk instead of in memory.")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "documents": [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for page_count in args.pages:
+            qdrant_path = os.path.join(args.qdrant_path, str(page_count)) if args.qdrant_path else None
+            result = bench_document(
+                page_count, args.repeat, workdir, qdrant_path, args.dimension,
+                args.batch_size, args.queries, args.parallel,
+            )
+            report["documents"].append(result)
+            print(f"\n{page_count} pages, {result['chunks']} chunks")
+            for stage, stats in result["stages"].items():
+                print(
+                    f"  {stage:<20} {stats['throughput_per_second']:12.1f} items/s  "
+                    f"p50 {stats['latency_ms']['p50']:9.2f} ms  p99 {stats['latency_ms']['p99']:9.2f} ms"
+                )
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Generate synthetic contract PDFs of a configurable page count without extra dependencies.
+
+Usage:
+    python -m benchmarks.synthetic_pdf out.pdf --pages 400
+"""
+import argparse
+import random
+
+CLAUSES = [
+    "The Receiving Party shall hold all Confidential Information in strict confidence and shall not disclose it",
+    "to any third party without the prior written consent of the Disclosing Party.",
+    "This Agreement shall be governed by and construed in accordance with the laws of the State of Delaware.",
+    "Either party may terminate this Agreement for convenience upon thirty (30) days prior written notice.",
+    "The Supplier shall indemnify, defend and hold harmless the Customer against all third-party claims.",
+    "All undisputed invoices are payable within forty-five (45) days of receipt by the Customer.",
+    "Neither party shall be liable for any indirect, incidental or consequential damages.",
+    "This Agreement constitutes the entire agreement between the parties and supersedes all prior agreements.",
+    "Any amendment to this Agreement must be made in writing and signed by both parties.",
+    "A change of control of either party shall require notice to the other party within ten (10) business days.",
+]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def page_lines(page_number: int, rng: random.Random, lines_per_page: int = 48):
+    lines = [f"MASTER SERVICES AGREEMENT - Section {page_number}"]
+    while len(lines) < lines_per_page:
+        lines.append(f"{page_number}.{len(lines)} {rng.choice(CLAUSES)}")
+    return lines
+
+
+def build_pdf(page_count: int, seed: int = 0) -> bytes:
+    """
+    Build a PDF with `page_count` pages of contract-like text in Helvetica.
+
+    Args:
+        page_count (int): The number of pages.
+        seed (int): The seed of the clause sequence, so output is reproducible.
+
+    Returns:
+        bytes: The PDF file content.
+    """
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Title (Synthetic Master Services Agreement) /Author (ClauseAI benchmarks) >>",
+    ]
+    page_ids = []
+    for page_number in range(1, page_count + 1):
+        text_ops = ["BT", "/F1 9 Tf", "11 TL", "50 760 Td"]
+        for line in page_lines(page_number, rng):
+            text_ops.append(f"({_escape(line)}) Tj T*")
+        text_ops.append("ET")
+        stream = "\n".join(text_ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, page_count)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R /Info 4 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref_offset
+    )
+    return bytes(output)
+
+
+def write_pdf(path: str, page_count: int, seed: int = 0) -> str:
+    """
+    Write a synthetic contract PDF to `path` and return the path.
+    """
+    with open(path, "wb") as f:
+        f.write(build_pdf(page_count, seed))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic contract PDF.")
+    parser.add_argument("path")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_pdf(args.path, args.pages, args.seed)
+    print(f"Wrote {args.pages} pages to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
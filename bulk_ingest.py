@@ -0,0 +1,98 @@
+"""
+Headless bulk ingestion of a directory or manifest of PDF files.
+
+Usage:
+    python bulk_ingest.py /data/archive --convert-workers 8 --upload-concurrency 4
+    python bulk_ingest.py manifest.txt --checkpoint archive.checkpoint.jsonl
+
+Re-running the same command resumes an interrupted run: files recorded as finished in the
+checkpoint are skipped, failed files are retried.
+"""
+import argparse
+import json
+import os
+
+from dotenv import load_dotenv
+
+from handler.bulk_ingestion import BulkIngestor, collect_pdf_paths
+from handler.collection_profiles import COLLECTION_PROFILES
+from handler.embedding_cache import EmbeddingCache
+from handler.embedding_engine import get_embedding_engine
+from handler.embedding_scheduler import configure_embedding_scheduler
+from handler.ingestion_cache import IngestionCache
+from handler.instrumentation import configure_instrumentation
+from handler.qdrant_adapter import QdrantHandler
+
+load_dotenv()
+
+QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+QDRANT_STORAGE_MODE = os.getenv("QDRANT_STORAGE_MODE", "per_document")
+QDRANT_COLLECTION_PROFILE = os.getenv("QDRANT_COLLECTION_PROFILE", "default")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL") or None
+OPENAI_EMBEDDING_TPM = int(os.getenv("OPENAI_EMBEDDING_TPM", "0")) or None
+OPENAI_EMBEDDING_RPM = int(os.getenv("OPENAI_EMBEDDING_RPM", "0")) or None
+OPENAI_EMBEDDING_CONCURRENCY = int(os.getenv("OPENAI_EMBEDDING_CONCURRENCY", "0")) or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a directory or manifest of PDF files into Qdrant.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories, or manifests with one path per line.")
+    parser.add_argument("--checkpoint", default="bulk_ingest.checkpoint.jsonl",
+                        help="The JSON lines file recording finished files.")
+    parser.add_argument("--convert-workers", type=int, default=None,
+                        help="Processes converting PDFs (defaults to the CPU count).")
+    parser.add_argument("--upload-concurrency", type=int, default=4,
+                        help="Documents embedded and uploaded at once.")
+    parser.add_argument("--ocr-jobs", type=int, default=1, help="OCR jobs per conversion process.")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks embedded and uploaded per batch.")
+    parser.add_argument("--profile", default=QDRANT_COLLECTION_PROFILE, choices=sorted(COLLECTION_PROFILES),
+                        help="The storage profile of new collections.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-ingest documents already in the ingestion cache.")
+    parser.add_argument("--summary", default=None, help="Also write the throughput summary to this JSON file.")
+    args = parser.parse_args()
+
+    configure_instrumentation(
+        os.getenv("CLAUSEAI_METRICS", "").split(","),
+        json_log_path=os.getenv("CLAUSEAI_METRICS_LOG") or None,
+    )
+    configure_embedding_scheduler(
+        tokens_per_minute=OPENAI_EMBEDDING_TPM,
+        requests_per_minute=OPENAI_EMBEDDING_RPM,
+        max_in_flight=OPENAI_EMBEDDING_CONCURRENCY,
+    )
+    pdf_paths = collect_pdf_paths(args.inputs)
+    print(f"Found {len(pdf_paths)} PDF files.")
+
+    qdrant_handler = QdrantHandler(
+        url=QDRANT_URL, api_key=QDRANT_API_KEY, storage_mode=QDRANT_STORAGE_MODE, collection_profile=args.profile
+    )
+    ingestor = BulkIngestor(
+        OPENAI_API_KEY,
+        qdrant_handler,
+        checkpoint_path=args.checkpoint,
+        embedding_engine=get_embedding_engine(
+            EMBEDDING_BACKEND, model_name=EMBEDDING_MODEL, openai_api_key=OPENAI_API_KEY
+        ),
+        embedding_cache=EmbeddingCache(),
+        ingestion_cache=None if args.no_cache else IngestionCache(),
+        convert_workers=args.convert_workers,
+        upload_concurrency=args.upload_concurrency,
+        ocr_jobs=args.ocr_jobs,
+        batch_size=args.batch_size,
+    )
+    summary = ingestor.run(pdf_paths)
+
+    print("\nSummary")
+    for key, value in summary.items():
+        print(f"  {key:<22} {value}")
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict
+
+import numpy as np
+
+from handler.ingestion_cache import DEFAULT_CACHE_DIR
+
+
+class SemanticAnswerCache:
+    """
+    A per-document cache of LLM answers keyed by query embedding.
+
+    A new query hits the cache when its cosine similarity to a cached query of the same
+    document reaches `similarity_threshold`. Entries expire after `ttl_seconds`, each document
+    keeps at most `max_entries_per_document` least-recently-used entries, and entries
+    recorded for an older version of the document (see `QdrantHandler.get_document_version`)
+    are dropped, so re-ingesting a document invalidates its answers.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, similarity_threshold: float = 0.95,
+                 ttl_seconds: float = 7 * 24 * 3600, max_entries_per_document: int = 256):
+        """
+        Initialize the cache, creating its database if needed.
+
+        Args:
+            cache_dir (str): Directory holding the cache database.
+            similarity_threshold (float): The minimum cosine similarity for a cache hit.
+            ttl_seconds (float): How long an answer stays valid.
+            max_entries_per_document (int): The maximum number of answers kept per document.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, "answers.sqlite")
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_document = max_entries_per_document
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS answers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    document_id TEXT NOT NULL,
+                    version TEXT,
+                    query TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    answer TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS answers_document ON answers (document_id)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def lookup(self, document_id: str, query_vector, version: str = None) -> Optional[Dict]:
+        """
+        Find a cached answer for a query similar enough to the given one.
+
+        Args:
+            document_id (str): The ID of the queried document.
+            query_vector: The embedding of the query.
+            version (str): The current version of the document.
+
+        Returns:
+            Optional[Dict]: The cached query, answer and similarity, or None on a miss.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM answers WHERE document_id = ? AND (created_at < ? OR version IS NOT ?)",
+                (document_id, now - self.ttl_seconds, version),
+            )
+            rows = connection.execute(
+                "SELECT id, query, vector, answer FROM answers WHERE document_id = ?", (document_id,)
+            ).fetchall()
+            best = None
+            if rows:
+                matrix = np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+                query = np.asarray(query_vector, dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+                similarities = matrix @ query / np.where(norms == 0, 1.0, norms)
+                idx = int(np.argmax(similarities))
+                if similarities[idx] >= self.similarity_threshold:
+                    best = rows[idx]
+                    connection.execute("UPDATE answers SET last_access = ? WHERE id = ?", (now, best[0]))
+        with self._lock:
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if best is None:
+            return None
+        return {"query": best[1], "answer": best[3], "similarity": float(similarities[idx])}
+
+    def store(self, document_id: str, query: str, query_vector, answer: str, version: str = None):
+        """
+        Cache the answer to a query and evict the least recently used answers of the document if over capacity.
+
+        Args:
+            document_id (str): The ID of the queried document.
+            query (str): The query text.
+            query_vector: The embedding of the query.
+            answer (str): The answer to cache.
+            version (str): The current version of the document.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO answers (document_id, version, query, vector, answer, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (document_id, version, query, np.asarray(query_vector, dtype=np.float32).tobytes(), answer, now, now),
+            )
+            connection.execute(
+                "DELETE FROM answers WHERE document_id = ? AND id NOT IN "
+                "(SELECT id FROM answers WHERE document_id = ? ORDER BY last_access DESC LIMIT ?)",
+                (document_id, document_id, self.max_entries_per_document),
+            )
+
+    def invalidate(self, document_id: str):
+        """
+        Drop every cached answer of a document.
+        """
+        with self._connect() as connection:
+            connection.execute("DELETE FROM answers WHERE document_id = ?", (document_id,))
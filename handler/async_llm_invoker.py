@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import aiohttp
+import openai
+
+from handler.instrumentation import instrumentation
+from handler.llm_invoker import GPT4Assistant
+
+
+def create_openai_session(max_connections: int = 100) -> aiohttp.ClientSession:
+    """
+    Create a pooled HTTP session for async OpenAI requests.
+
+    Must be called from a running event loop. Pass the session to AsyncGPT4Assistant and
+    AsyncQdrantQueryHandler so every request reuses the same keep-alive connections.
+
+    Args:
+        max_connections (int): The maximum number of open connections in the pool.
+    """
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=max_connections))
+
+
+def use_openai_session(http_session: aiohttp.ClientSession = None):
+    """
+    Route the OpenAI requests of the current task through the given pooled session.
+    """
+    if http_session is not None:
+        openai.aiosession.set(http_session)
+
+
+class AsyncGPT4Assistant(GPT4Assistant):
+    """
+    An asyncio-native variant of GPT4Assistant using the async OpenAI client.
+
+    Any number of queries can be in flight at once, bounded by `max_concurrency`.
+    Cancelling the calling task cancels the pending request.
+    """
+
+    def __init__(self, api_key: str, http_session: aiohttp.ClientSession = None, max_concurrency: int = 64):
+        """
+        Initialize the AsyncGPT4Assistant with the OpenAI API key.
+
+        Args:
+            api_key (str): The OpenAI API key for authentication.
+            http_session (aiohttp.ClientSession): Pooled HTTP session, see `create_openai_session`.
+            max_concurrency (int): The maximum number of in-flight completions.
+        """
+        self.api_key = api_key
+        self.http_session = http_session
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.last_latency = {}
+
+    async def get_response(self, task_type: str, context_chunks: str, query: str, entities: list = None) -> str:
+        """
+        Generate a response from GPT-4 for the specified task using the relevant prompt template.
+
+        Args:
+            task_type (str): The type of task, e.g., "entity_extraction" or "general_query".
+            context_chunks (str): The context chunks to provide to the prompt.
+            query (str): The user query, required for "general_query".
+            entities (list): The entities to extract or merge (defaults to `get_entities()`).
+
+        Returns:
+            str: The assistant's response.
+        """
+        try:
+            prompt = self.build_prompt(task_type, context_chunks, query, entities)
+            async with self._semaphore:
+                use_openai_session(self.http_session)
+                with instrumentation.span("llm.completion", task_type=task_type, model="gpt-4"):
+                    response = await openai.ChatCompletion.acreate(
+                        model="gpt-4",
+                        messages=self.build_messages(prompt),
+                        api_key=self.api_key,
+                    )
+                    self.record_usage(response)
+            return response['choices'][0]['message']['content']
+        except Exception as e:
+            return f"An error occurred: {str(e)}"
+
+    async def stream_response(self, task_type: str, context_chunks: str, query: str, latency: dict = None):
+        """
+        Stream a response from GPT-4 for the specified task as it is generated.
+
+        Args:
+            task_type (str): The type of task, e.g., "entity_extraction" or "general_query".
+            context_chunks (str): The context chunks to provide to the prompt.
+            query (str): The user query, required for "general_query".
+            latency (dict): Filled with the time to first token, the total latency in seconds and the
+                error that ended the stream early, as `last_latency` in `GPT4Assistant.stream_response`.
+                Pass one dict per request when several streams run concurrently.
+
+        Token usage is counted as in `GPT4Assistant.stream_response`.
+
+        Yields:
+            str: The content deltas of the assistant's response.
+        """
+        start = time.perf_counter()
+        if latency is None:
+            latency = self.last_latency = {}
+        latency.update({"time_to_first_token": None, "total_latency": None, "error": None})
+        span = instrumentation.start_span("llm.stream", task_type=task_type, model="gpt-4")
+        messages, completion = None, []
+        try:
+            messages = self.build_messages(self.build_prompt(task_type, context_chunks, query))
+            async with self._semaphore:
+                use_openai_session(self.http_session)
+                response = await openai.ChatCompletion.acreate(
+                    model="gpt-4",
+                    messages=messages,
+                    api_key=self.api_key,
+                    stream=True,
+                )
+                async for chunk in response:
+                    delta = chunk['choices'][0]['delta'].get('content')
+                    if delta:
+                        completion.append(delta)
+                        if latency["time_to_first_token"] is None:
+                            latency["time_to_first_token"] = time.perf_counter() - start
+                        yield delta
+        except Exception as e:
+            span.status, span.error = "error", str(e)
+            latency["error"] = str(e)
+            yield f"An error occurred: {str(e)}"
+        finally:
+            latency["total_latency"] = time.perf_counter() - start
+            span.set(time_to_first_token=latency["time_to_first_token"])
+            self.record_stream_usage(messages, "".join(completion), span=span)
+            instrumentation.end_span(span)
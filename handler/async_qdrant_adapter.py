@@ -0,0 +1,181 @@
+from qdrant_client import AsyncQdrantClient, models
+
+from handler.collection_profiles import PROFILE_DEFAULT, CollectionProfile, get_collection_profile, resolve_profile
+from handler.document_registry import DocumentRegistry, REGISTRY_COLLECTION
+from handler.instrumentation import instrumentation
+from handler.qdrant_adapter import STORAGE_PER_DOCUMENT, STORAGE_SHARED, SHARED_COLLECTION, build_document_filter
+
+
+class AsyncQdrantHandler:
+    """
+    An asyncio-native variant of QdrantHandler for the query path, built on AsyncQdrantClient.
+
+    Supports the same "per_document" and "shared" storage modes.
+    """
+    def __init__(
+        self,
+        url: str,
+        api_key: str,
+        storage_mode: str = STORAGE_PER_DOCUMENT,
+        shared_collection: str = SHARED_COLLECTION,
+        collection_profile=PROFILE_DEFAULT,
+    ):
+        """
+        Initialize the AsyncQdrantHandler with connection details.
+
+        Args:
+            url (str): The Qdrant URL.
+            api_key (str): The Qdrant API key.
+            storage_mode (str): "per_document" or "shared".
+            shared_collection (str): The collection holding all documents in "shared" mode.
+            collection_profile: The name of a collection profile or a CollectionProfile, whose
+                search parameters are used by default.
+        """
+        if storage_mode not in (STORAGE_PER_DOCUMENT, STORAGE_SHARED):
+            raise ValueError("Invalid storage mode. Supported modes: 'per_document', 'shared'.")
+        self.qdrant_client = AsyncQdrantClient(url=url, api_key=api_key, timeout=300)
+        self.storage_mode = storage_mode
+        self.shared_collection = shared_collection
+        self.collection_profile = (
+            collection_profile if isinstance(collection_profile, CollectionProfile)
+            else get_collection_profile(collection_profile)
+        )
+        self._collection_profiles = {}
+
+    def load_qdrant_connection(self):
+        """
+        Get the initialized async Qdrant client.
+        """
+        return self.qdrant_client
+
+    async def close(self):
+        """
+        Close the underlying connections.
+        """
+        await self.qdrant_client.close()
+
+    def _target(self, document_id: str):
+        """
+        Resolve a document ID to the collection holding it and the filter selecting its points.
+        """
+        if self.storage_mode == STORAGE_SHARED:
+            return self.shared_collection, build_document_filter(document_id)
+        return document_id, None
+
+    async def get_document_entry(self, document_id: str):
+        """
+        Return the registry entry of a document, or None if it is not registered.
+        """
+        try:
+            records = await self.qdrant_client.retrieve(
+                collection_name=REGISTRY_COLLECTION,
+                ids=[DocumentRegistry.point_id(document_id)],
+                with_payload=True,
+                with_vectors=False,
+            )
+        except Exception as e:
+            print(f"Error fetching registry entry of '{document_id}': {e}")
+            return None
+        return records[0].payload if records else None
+
+    async def resolve_collection_profile(self, document_id: str) -> CollectionProfile:
+        """
+        Return the profile the collection of a document was created with, as recorded in the registry.
+
+        Documents without a registry entry, or with an unknown profile, use the handler's profile.
+        """
+        target_collection, _ = self._target(document_id)
+        profile = self._collection_profiles.get(target_collection)
+        if profile is not None:
+            return profile
+        entry = await self.get_document_entry(document_id)
+        if not entry or not entry.get("collection_profile"):
+            return self.collection_profile
+        profile = resolve_profile(entry["collection_profile"], self.collection_profile)
+        self._collection_profiles[target_collection] = profile
+        return profile
+
+    async def get_document_version(self, document_id: str):
+        """
+        Return the version of a document, which changes every time it is (re-)ingested.
+
+        Returns None for documents that are not in the registry.
+        """
+        document = await self.get_document_entry(document_id)
+        return str(document.get("updated_at")) if document else None
+
+    async def search_qdrant(self, collection_name: str, query_vector: list, limit: int = 10, score_threshold: float = 0.5,
+                            search_params: models.SearchParams = None):
+        """
+        Search for similar vectors of a document.
+
+        Args:
+            collection_name (str): The ID of the document to search, which is its collection in "per_document" mode.
+            query_vector (list): The query vector to search for.
+            limit (int): The maximum number of results to retrieve.
+            score_threshold (float): The minimum similarity score threshold for results.
+            search_params (models.SearchParams): HNSW `ef` and quantization oversampling/rescoring
+                (defaults to those of the profile the collection was created with).
+
+        Returns:
+            list: A list of search results with their payloads and similarity scores.
+        """
+        try:
+            target_collection, document_filter = self._target(collection_name)
+            if search_params is None:
+                search_params = (await self.resolve_collection_profile(collection_name)).search_params()
+            with instrumentation.span("qdrant.search", collection=target_collection, limit=limit) as span:
+                results = await self.qdrant_client.search(
+                    collection_name=target_collection,
+                    query_vector=query_vector,
+                    query_filter=document_filter,
+                    search_params=search_params,
+                    limit=limit,
+                    score_threshold=score_threshold,
+                )
+                span.set(results=len(results))
+            return [
+                {
+                    "id": result.id,
+                    "payload": result.payload,
+                    "score": result.score,
+                }
+                for result in results
+            ]
+        except Exception as e:
+            print(f"Error during search in Qdrant: {e}")
+            return []
+
+    async def get_collection_names(self):
+        """
+        Retrieve and return a list of all document IDs.
+
+        Returns:
+            list: A list of collection names.
+        """
+        try:
+            if self.storage_mode == STORAGE_SHARED:
+                documents = []
+                next_offset = None
+                while True:
+                    points, next_offset = await self.qdrant_client.scroll(
+                        collection_name=REGISTRY_COLLECTION,
+                        limit=1000,
+                        offset=next_offset,
+                        with_payload=True,
+                        with_vectors=False,
+                    )
+                    documents.extend(point.payload for point in points)
+                    if next_offset is None:
+                        break
+                documents.sort(key=lambda document: document.get("created_at", 0))
+                return [document["document_id"] for document in documents]
+            collections = await self.qdrant_client.get_collections()
+            return [
+                collection.name
+                for collection in collections.collections
+                if collection.name not in (REGISTRY_COLLECTION, self.shared_collection)
+            ]
+        except Exception as e:
+            print(f"Error fetching collection names: {e}")
+            return []
@@ -0,0 +1,124 @@
+import asyncio
+from typing import List, Dict
+
+import numpy as np
+import openai
+
+from handler.async_llm_invoker import use_openai_session
+from handler.embedding_cache import CachedEmbeddings
+from handler.embedding_engine import BACKEND_OPENAI, DEFAULT_MODELS, get_embedding_engine
+from handler.instrumentation import instrumentation
+
+EMBEDDING_MODEL = DEFAULT_MODELS[BACKEND_OPENAI]
+
+
+class AsyncQdrantQueryHandler:
+    """
+    An asyncio-native variant of QdrantQueryHandler built on AsyncQdrantHandler and the async OpenAI client.
+    """
+    def __init__(self, document_id: str, openai_api_key: str, qdrant_client, embedding_cache=None,
+                 http_session=None, embedding_engine=None):
+        """
+        Initialize the AsyncQdrantQueryHandler with required parameters.
+
+        Args:
+            document_id (str): The ID of the document in Qdrant.
+            openai_api_key (str): The OpenAI API key for generating vector embeddings.
+            qdrant_client (AsyncQdrantHandler): The async Qdrant handler instance.
+            embedding_cache (EmbeddingCache): Optional on-disk cache checked before calling the API.
+            http_session (aiohttp.ClientSession): Pooled HTTP session for OpenAI requests.
+            embedding_engine (EmbeddingEngine): A non-OpenAI embedding backend. By default the backend
+                and model recorded for the document at ingest time are used.
+        """
+        self.document_id = document_id
+        self.qdrant_client = qdrant_client
+        self.openai_api_key = openai_api_key
+        self.embedding_cache = embedding_cache
+        self.http_session = http_session
+        self.embedding_engine = embedding_engine
+        self.embedding_model = None
+
+    async def query_response(self, prompt: str, limit: int = 10, score_threshold: float = 0.1,
+                             query_vector: list = None, search_params=None) -> List[Dict]:
+        """
+        Generate a query response by searching the Qdrant collection.
+
+        Args:
+            prompt (str): The user input or query prompt to generate embeddings.
+            limit (int): The maximum number of results to retrieve (default is 10).
+            score_threshold (float): The minimum similarity score threshold for results.
+            query_vector (list): The embedding of the prompt, if already computed.
+            search_params (models.SearchParams): Overrides the search parameters of the collection profile.
+
+        Returns:
+            List[Dict]: A list of search results with payloads and similarity scores.
+        """
+        with instrumentation.span("query.retrieve", document_id=self.document_id) as span:
+            if query_vector is None:
+                with instrumentation.span("query.embed"):
+                    query_vector = await self.generate_vector_embedding(prompt)
+
+            query_results = await self.qdrant_client.search_qdrant(
+                collection_name=self.document_id,
+                query_vector=query_vector,
+                limit=limit,
+                score_threshold=score_threshold,
+                search_params=search_params,
+            )
+            span.set(results=len(query_results))
+        return query_results
+
+    async def _resolve_embedding_backend(self):
+        """
+        Look up the embedding backend the document was ingested with, once.
+
+        OpenAI models are embedded through the async client; other backends get an engine
+        that runs on a worker thread.
+        """
+        if self.embedding_engine is not None or self.embedding_model is not None:
+            return
+        document = await self.qdrant_client.get_document_entry(self.document_id) or {}
+        backend = document.get("embedding_backend") or BACKEND_OPENAI
+        if backend == BACKEND_OPENAI:
+            self.embedding_model = document.get("embedding_model") or EMBEDDING_MODEL
+        else:
+            self.embedding_engine = await asyncio.to_thread(
+                get_embedding_engine, backend, document.get("embedding_model")
+            )
+
+    async def generate_vector_embedding(self, text: str):
+        """
+        Generate a vector embedding for a given string with the document's embedding backend.
+
+        The embedding cache, if any, is checked on a worker thread so the event loop is never blocked.
+
+        Args:
+            text (str): The text or string for which the embedding needs to be generated.
+
+        Returns:
+            List[float]: The generated vector embedding.
+        """
+        await self._resolve_embedding_backend()
+        if self.embedding_engine is not None:
+            embeddings = self.embedding_engine
+            if self.embedding_cache is not None:
+                embeddings = CachedEmbeddings(embeddings, self.embedding_cache)
+            vector = await asyncio.to_thread(embeddings.embed_query, text)
+            return vector.tolist()
+
+        if self.embedding_cache is not None:
+            (cached,) = await asyncio.to_thread(self.embedding_cache.get_many, self.embedding_model, [text])
+            if cached is not None:
+                return cached.tolist()
+
+        use_openai_session(self.http_session)
+        response = await openai.Embedding.acreate(
+            model=self.embedding_model, input=[text], api_key=self.openai_api_key
+        )
+        vector = response["data"][0]["embedding"]
+
+        if self.embedding_cache is not None:
+            await asyncio.to_thread(
+                self.embedding_cache.put_many, self.embedding_model, [text], [np.asarray(vector, dtype=np.float32)]
+            )
+        return vector
@@ -0,0 +1,359 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from handler.ingestion_cache import IngestionCache
+from handler.instrumentation import instrumentation
+from handler.layout_identifier import PDFToMarkdownConverter, write_markdown_sections
+from handler.vector_generator import QdrantDocumentProcessor
+
+STATUS_DONE = "done"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+
+
+def collect_pdf_paths(inputs: list) -> list:
+    """
+    Expand directories and manifests into a sorted, de-duplicated list of PDF paths.
+
+    Directories are searched recursively for `.pdf` files. Any other file is read as a manifest
+    with one path per line; blank lines and lines starting with `#` are ignored, and relative
+    paths are resolved against the manifest's directory.
+
+    Args:
+        inputs (list): Paths of PDF files, directories or manifests.
+
+    Returns:
+        list: The absolute paths of the PDF files.
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+        elif item.lower().endswith(".pdf"):
+            paths.append(item)
+        else:
+            base_dir = os.path.dirname(os.path.abspath(item))
+            with open(item, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        paths.append(os.path.join(base_dir, line))
+    return sorted({os.path.abspath(path) for path in paths})
+
+
+def convert_pdf(pdf_path: str, content_hash: str, spool_dir: str, ocr_jobs: int = 1) -> dict:
+    """
+    Convert one PDF file to Markdown sections spooled to disk. Runs inside a worker process.
+
+    The sections are written to a JSON lines file as the converter streams them, so neither
+    this process nor the uploader holds the whole document in memory.
+
+    The document ID gets a content-hash suffix, because archives often hold files with the same
+    name that are converted within the same second.
+
+    Args:
+        pdf_path (str): The path of the PDF file.
+        content_hash (str): The SHA-256 of the file, passed through to the result.
+        spool_dir (str): The directory the sections are spooled to.
+        ocr_jobs (int): The number of OCR jobs of this worker.
+
+    Returns:
+        dict: The path, content hash, document ID, spool file, page count and conversion time.
+    """
+    start = time.perf_counter()
+    converter = PDFToMarkdownConverter(pdf_path, ocr_jobs=ocr_jobs)
+    spool_path = os.path.join(spool_dir, f"{content_hash}.jsonl")
+    try:
+        with open(spool_path, "w", encoding="utf-8") as f:
+            for section in converter.iter_markdown_sections():
+                f.write(json.dumps(section) + "\n")
+    except BaseException:
+        os.remove(spool_path)
+        raise
+    return {
+        "path": pdf_path,
+        "content_hash": content_hash,
+        "document_id": f"{converter.generate_document_id()}_{content_hash[:8]}",
+        "spool_path": spool_path,
+        "pages": len(converter.reader.pages),
+        "ocr_pages": len(converter.ocr_pages),
+        "convert_seconds": time.perf_counter() - start,
+    }
+
+
+def iter_spooled_sections(spool_path: str):
+    """
+    Read back the sections spooled by `convert_pdf`, one line at a time.
+    """
+    with open(spool_path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+class IngestionCheckpoint:
+    """
+    An append-only JSON lines log of finished files, so an interrupted run resumes where it stopped.
+
+    Each line is flushed and synced as soon as a file is done. Failed files are retried on the next run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.records = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # A torn last line of an interrupted run.
+                    self.records[record["path"]] = record
+
+    def is_finished(self, pdf_path: str) -> bool:
+        record = self.records.get(pdf_path)
+        return record is not None and record["status"] in (STATUS_DONE, STATUS_SKIPPED)
+
+    def record(self, **record):
+        with self._lock:
+            self.records[record["path"]] = record
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class BulkIngestor:
+    """
+    Ingests many PDF files through PDFToMarkdownConverter, QdrantDocumentProcessor and QdrantHandler.
+
+    Conversion and OCR are CPU-bound and run on a process pool. Embedding and upload are
+    network-bound and run on a thread pool with its own concurrency limit. Converted pages are
+    spooled to disk and streamed into the uploader, and at most `max_pending` converted documents
+    wait for upload, so memory stays bounded whatever the size of the archive or its documents.
+    """
+
+    def __init__(
+        self,
+        openai_api_key: str,
+        qdrant_handler,
+        checkpoint_path: str,
+        embedding_engine=None,
+        embedding_cache=None,
+        ingestion_cache=None,
+        convert_workers: int = None,
+        upload_concurrency: int = 4,
+        ocr_jobs: int = 1,
+        batch_size: int = 256,
+        upload_workers: int = 2,
+        max_pending: int = None,
+    ):
+        """
+        Args:
+            openai_api_key (str): The OpenAI API key.
+            qdrant_handler (QdrantHandler): The Qdrant handler documents are stored with.
+            checkpoint_path (str): The JSON lines file recording finished files.
+            embedding_engine (EmbeddingEngine): The embedding backend (defaults to OpenAI).
+            embedding_cache (EmbeddingCache): Optional on-disk embedding cache.
+            ingestion_cache (IngestionCache): Optional content-hash index; known documents are skipped.
+            convert_workers (int): The number of conversion processes (defaults to the CPU count).
+            upload_concurrency (int): The number of documents embedded and uploaded at once.
+            ocr_jobs (int): The number of OCR jobs per conversion process.
+            batch_size (int): The number of chunks embedded and uploaded per batch.
+            upload_workers (int): The number of parallel Qdrant upload workers per document.
+            max_pending (int): The maximum number of converted documents waiting for upload.
+        """
+        self.openai_api_key = openai_api_key
+        self.qdrant_handler = qdrant_handler
+        self.checkpoint = IngestionCheckpoint(checkpoint_path)
+        self.embedding_engine = embedding_engine
+        self.embedding_cache = embedding_cache
+        self.ingestion_cache = ingestion_cache
+        self.convert_workers = convert_workers or os.cpu_count() or 1
+        self.upload_concurrency = 1 if qdrant_handler.is_local else upload_concurrency
+        self.ocr_jobs = ocr_jobs
+        self.batch_size = batch_size
+        self.upload_workers = upload_workers
+        self.max_pending = max_pending or self.upload_concurrency * 2
+
+    def _is_known(self, content_hash: str):
+        if self.ingestion_cache is None:
+            return None
+        cached_document = self.ingestion_cache.lookup(content_hash)
+        if cached_document and self.qdrant_handler.collection_exists(cached_document["document_id"]):
+            return cached_document
+        return None
+
+    def ingest_converted(self, converted: dict) -> dict:
+        """
+        Embed and upload one converted document. A document that fails or is interrupted partway
+        is deleted again.
+
+        Returns:
+            dict: The checkpoint record of the document.
+        """
+        start = time.perf_counter()
+        processor = QdrantDocumentProcessor(
+            self.openai_api_key,
+            self.qdrant_handler,
+            None,
+            converted["document_id"],
+            embedding_cache=self.embedding_cache,
+            embedding_engine=self.embedding_engine,
+            batch_size=self.batch_size,
+            upload_workers=self.upload_workers,
+        )
+        sections = iter_spooled_sections(converted["spool_path"])
+        try:
+            if self.ingestion_cache is None:
+                chunks = processor.process_pages(sections)
+            else:
+                with self.ingestion_cache.open_markdown(converted["content_hash"]) as markdown_file:
+                    chunks = processor.process_pages(write_markdown_sections(sections, markdown_file))
+        except BaseException:
+            # A partially stored document would be listed as a real one and stored again on resume.
+            self.qdrant_handler.delete_document(converted["document_id"])
+            raise
+        if self.ingestion_cache is not None:
+            self.ingestion_cache.store(converted["content_hash"], converted["document_id"])
+        return {
+            "path": converted["path"],
+            "status": STATUS_DONE,
+            "content_hash": converted["content_hash"],
+            "document_id": converted["document_id"],
+            "pages": converted["pages"],
+            "chunks": chunks,
+            "convert_seconds": round(converted["convert_seconds"], 3),
+            "ingest_seconds": round(time.perf_counter() - start, 3),
+        }
+
+    def run(self, pdf_paths: list, progress=print) -> dict:
+        """
+        Ingest the given PDF files, skipping those the checkpoint records as finished.
+
+        Files are hashed before conversion, so content that is already ingested, or that
+        appears twice in the run, is skipped without being converted. A copy found in the run
+        is only recorded as skipped once its original is done; if the original fails, the
+        copies are queued again and the next one is ingested in its place.
+
+        Args:
+            pdf_paths (list): The PDF files to ingest.
+            progress: Called with a one-line status message after every file.
+
+        Returns:
+            dict: The throughput summary of the run.
+        """
+        todo = deque(path for path in pdf_paths if not self.checkpoint.is_finished(path))
+        summary = {
+            "files": len(pdf_paths),
+            "resumed": len(pdf_paths) - len(todo),
+            STATUS_DONE: 0,
+            STATUS_SKIPPED: 0,
+            STATUS_FAILED: 0,
+            "pages": 0,
+            "chunks": 0,
+        }
+        total = len(todo)
+        start = time.perf_counter()
+
+        def finish(record):
+            self.checkpoint.record(**record)
+            summary[record["status"]] += 1
+            summary["pages"] += record.get("pages", 0)
+            summary["chunks"] += record.get("chunks", 0)
+            finished = summary[STATUS_DONE] + summary[STATUS_SKIPPED] + summary[STATUS_FAILED]
+            message = f"[{finished}/{total}] {record['status']}: {record['path']}"
+            if record["status"] == STATUS_FAILED:
+                message += f" ({record['error']})"
+            progress(message)
+
+        with instrumentation.span("bulk_ingest", files=total), \
+                tempfile.TemporaryDirectory(prefix="clauseai_spool_") as spool_dir, \
+                ProcessPoolExecutor(max_workers=self.convert_workers) as convert_pool, \
+                ThreadPoolExecutor(max_workers=self.upload_concurrency) as upload_pool:
+            converting, uploading = {}, {}
+            # Copies waiting for the original of their content, and the documents ingested in this run.
+            waiting_copies, ingested = {}, {}
+
+            def finish_original(content_hash, record):
+                finish(record)
+                copies = waiting_copies.pop(content_hash, [])
+                if record["status"] == STATUS_DONE:
+                    ingested[content_hash] = record["document_id"]
+                    for path in copies:
+                        finish({
+                            "path": path,
+                            "status": STATUS_SKIPPED,
+                            "content_hash": content_hash,
+                            "duplicate_of": record["document_id"],
+                        })
+                else:
+                    todo.extendleft(reversed(copies))
+
+            while todo or converting or uploading:
+                while todo and len(converting) < self.convert_workers and \
+                        len(converting) + len(uploading) < self.convert_workers + self.max_pending:
+                    path = todo.popleft()
+                    try:
+                        content_hash = IngestionCache.compute_file_hash(path)
+                    except OSError as e:
+                        finish({"path": path, "status": STATUS_FAILED, "stage": "read", "error": str(e)})
+                        continue
+                    known_document = self._is_known(content_hash)
+                    duplicate_of = known_document["document_id"] if known_document else ingested.get(content_hash)
+                    if duplicate_of:
+                        finish({
+                            "path": path,
+                            "status": STATUS_SKIPPED,
+                            "content_hash": content_hash,
+                            "duplicate_of": duplicate_of,
+                        })
+                        continue
+                    if content_hash in waiting_copies:
+                        waiting_copies[content_hash].append(path)
+                        continue
+                    waiting_copies[content_hash] = []
+                    future = convert_pool.submit(convert_pdf, path, content_hash, spool_dir, self.ocr_jobs)
+                    converting[future] = (path, content_hash)
+
+                if not converting and not uploading:
+                    continue
+
+                done, _ = wait(list(converting) + list(uploading), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in converting:
+                        path, content_hash = converting.pop(future)
+                        try:
+                            converted = future.result()
+                        except Exception as e:
+                            finish_original(content_hash, {
+                                "path": path, "status": STATUS_FAILED, "stage": "convert", "error": str(e),
+                            })
+                            continue
+                        uploading[upload_pool.submit(self.ingest_converted, converted)] = converted
+                    else:
+                        converted = uploading.pop(future)
+                        os.remove(converted["spool_path"])
+                        try:
+                            record = future.result()
+                        except Exception as e:
+                            record = {
+                                "path": converted["path"],
+                                "status": STATUS_FAILED,
+                                "stage": "ingest",
+                                "error": str(e),
+                            }
+                        finish_original(converted["content_hash"], record)
+
+        elapsed = time.perf_counter() - start
+        documents = summary[STATUS_DONE] + summary[STATUS_SKIPPED]
+        summary["elapsed_seconds"] = round(elapsed, 3)
+        for name, count in (("documents", documents), ("pages", summary["pages"]), ("chunks", summary["chunks"])):
+            summary[f"{name}_per_second"] = round(count / elapsed, 3) if elapsed else None
+        return summary
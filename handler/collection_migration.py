@@ -0,0 +1,113 @@
+"""
+Move documents stored one-per-collection into the shared multi-tenant collection.
+
+Usage:
+    python -m handler.collection_migration [COLLECTION ...] [--delete-source]
+
+Without collection names every per-document collection is migrated. Connection details
+are read from the QDRANT_URL and QDRANT_API_KEY environment variables.
+"""
+import argparse
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+
+from handler.collection_profiles import COLLECTION_PROFILES
+from handler.qdrant_adapter import QdrantHandler, STORAGE_SHARED
+
+
+def _iter_collection_batches(client, collection_name: str, batch_size: int):
+    """
+    Scroll a collection as (payloads, vectors) batches, the input of `QdrantHandler.store_batches`.
+    """
+    next_offset = None
+    while True:
+        points, next_offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=next_offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if points:
+            payloads = [point.payload or {} for point in points]
+            vectors = np.asarray([point.vector for point in points], dtype=np.float32)
+            yield payloads, vectors
+        if next_offset is None:
+            break
+
+
+def migrate_collection(qdrant_handler: QdrantHandler, collection_name: str, batch_size: int = 256,
+                       delete_source: bool = False) -> int:
+    """
+    Copy the points of one per-document collection into the shared collection.
+
+    Vectors are copied as-is, so nothing is re-embedded. The collection name becomes the
+    document ID of the migrated points.
+
+    Args:
+        qdrant_handler (QdrantHandler): A handler in "shared" storage mode.
+        collection_name (str): The per-document collection to migrate.
+        batch_size (int): The number of points copied per request.
+        delete_source (bool): Delete the per-document collection once it is copied.
+
+    Returns:
+        int: The number of points migrated.
+    """
+    if qdrant_handler.storage_mode != STORAGE_SHARED:
+        raise ValueError("Migration requires a QdrantHandler in 'shared' storage mode.")
+    client = qdrant_handler.load_qdrant_connection()
+    vector_size = client.get_collection(collection_name).config.params.vectors.size
+    qdrant_handler.ensure_collection_exists(qdrant_handler.shared_collection, vector_size)
+
+    migrated = qdrant_handler.store_batches(
+        _iter_collection_batches(client, collection_name, batch_size), collection_name=collection_name
+    )
+    if delete_source:
+        client.delete_collection(collection_name)
+    print(f"Migrated {migrated} points from '{collection_name}' to '{qdrant_handler.shared_collection}'.")
+    return migrated
+
+
+def migrate_all(qdrant_handler: QdrantHandler, collection_names: list = None, batch_size: int = 256,
+                delete_source: bool = False) -> dict:
+    """
+    Migrate several per-document collections, by default all of them.
+
+    Returns:
+        dict: The number of points migrated per collection.
+    """
+    if not collection_names:
+        collection_names = [
+            collection.name
+            for collection in qdrant_handler.load_qdrant_connection().get_collections().collections
+            if collection.name not in (qdrant_handler.shared_collection, qdrant_handler.registry.collection_name)
+        ]
+    return {
+        name: migrate_collection(qdrant_handler, name, batch_size=batch_size, delete_source=delete_source)
+        for name in collection_names
+    }
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Migrate per-document collections into the shared collection.")
+    parser.add_argument("collections", nargs="*", help="Collections to migrate (default: all).")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--delete-source", action="store_true", help="Delete each collection once migrated.")
+    parser.add_argument("--profile", default=os.getenv("QDRANT_COLLECTION_PROFILE", "default"),
+                        choices=sorted(COLLECTION_PROFILES),
+                        help="The storage profile of the shared collection, if it does not exist yet.")
+    args = parser.parse_args()
+
+    qdrant_handler = QdrantHandler(
+        url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"), storage_mode=STORAGE_SHARED,
+        collection_profile=args.profile,
+    )
+    results = migrate_all(qdrant_handler, args.collections, args.batch_size, args.delete_source)
+    print(f"Migrated {len(results)} documents, {sum(results.values())} points in total.")
+
+
+if __name__ == "__main__":
+    main()
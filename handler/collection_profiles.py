@@ -0,0 +1,207 @@
+from qdrant_client import models
+
+PROFILE_DEFAULT = "default"
+PROFILE_ON_DISK = "on_disk"
+PROFILE_SCALAR = "scalar"
+PROFILE_BINARY = "binary"
+
+
+class CollectionProfile:
+    """
+    The storage settings of a Qdrant collection and the matching search parameters.
+
+    Combines three independent options:
+    - quantization: None, "scalar" (int8, 4x smaller) or "binary" (1 bit per dimension, 32x smaller).
+      Quantized vectors stay in RAM and results are rescored with the original vectors.
+    - on_disk: keep the original float32 vectors (and optionally the HNSW graph) on disk.
+    - HNSW `m` / `ef_construct`: graph degree and build-time beam width.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        quantization: str = None,
+        on_disk: bool = False,
+        hnsw_on_disk: bool = False,
+        hnsw_m: int = None,
+        hnsw_ef_construct: int = None,
+        hnsw_ef: int = None,
+        rescore: bool = True,
+        oversampling: float = None,
+        scalar_quantile: float = 0.99,
+    ):
+        """
+        Args:
+            name (str): The profile name recorded with each document.
+            quantization (str): None, "scalar" or "binary".
+            on_disk (bool): Store the original vectors on disk instead of in RAM.
+            hnsw_on_disk (bool): Store the HNSW graph on disk.
+            hnsw_m (int): Edges per node of the HNSW graph (Qdrant default: 16).
+            hnsw_ef_construct (int): Beam width while building the graph (Qdrant default: 100).
+            hnsw_ef (int): Beam width at search time (Qdrant default: the result limit, at least 128 with quantization).
+            rescore (bool): Rescore quantized candidates with the original vectors.
+            oversampling (float): Fetch `limit * oversampling` quantized candidates before rescoring.
+            scalar_quantile (float): The quantile of values used to calibrate scalar quantization.
+        """
+        if quantization not in (None, PROFILE_SCALAR, PROFILE_BINARY):
+            raise ValueError("Invalid quantization. Supported quantizations: None, 'scalar', 'binary'.")
+        self.name = name
+        self.quantization = quantization
+        self.on_disk = on_disk
+        self.hnsw_on_disk = hnsw_on_disk
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+        self.hnsw_ef = hnsw_ef
+        self.rescore = rescore
+        self.oversampling = oversampling
+        self.scalar_quantile = scalar_quantile
+
+    def vectors_config(self, vector_size: int) -> models.VectorParams:
+        return models.VectorParams(size=vector_size, distance=models.Distance.COSINE, on_disk=self.on_disk or None)
+
+    def hnsw_config(self):
+        if self.hnsw_m is None and self.hnsw_ef_construct is None and not self.hnsw_on_disk:
+            return None
+        return models.HnswConfigDiff(
+            m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.hnsw_on_disk or None
+        )
+
+    def quantization_config(self):
+        if self.quantization == PROFILE_SCALAR:
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8, quantile=self.scalar_quantile, always_ram=True
+                )
+            )
+        if self.quantization == PROFILE_BINARY:
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def collection_kwargs(self, vector_size: int) -> dict:
+        """
+        Build the `create_collection` arguments of the profile.
+        """
+        return {
+            "vectors_config": self.vectors_config(vector_size),
+            "hnsw_config": self.hnsw_config(),
+            "quantization_config": self.quantization_config(),
+        }
+
+    def search_params(self, hnsw_ef: int = None, oversampling: float = None, rescore: bool = None):
+        """
+        Build the search parameters matching the profile, optionally overriding its defaults.
+
+        Returns:
+            models.SearchParams: The parameters, or None when every setting is Qdrant's default.
+        """
+        hnsw_ef = hnsw_ef or self.hnsw_ef
+        quantization = None
+        if self.quantization:
+            quantization = models.QuantizationSearchParams(
+                rescore=self.rescore if rescore is None else rescore,
+                oversampling=oversampling or self.oversampling,
+            )
+        if hnsw_ef is None and quantization is None:
+            return None
+        return models.SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
+
+    def ram_bytes_per_vector(self, vector_size: int) -> int:
+        """
+        Estimate the RAM each vector takes under this profile: quantized codes, in-RAM originals
+        and HNSW links (two layers' worth of 4-byte neighbour IDs).
+        """
+        total = 0
+        if self.quantization == PROFILE_SCALAR:
+            total += vector_size
+        elif self.quantization == PROFILE_BINARY:
+            total += (vector_size + 7) // 8
+        if not self.on_disk:
+            total += vector_size * 4
+        if not self.hnsw_on_disk:
+            total += (self.hnsw_m or 16) * 2 * 4
+        return total
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "quantization": self.quantization,
+            "on_disk": self.on_disk,
+            "hnsw_on_disk": self.hnsw_on_disk,
+            "hnsw_m": self.hnsw_m,
+            "hnsw_ef_construct": self.hnsw_ef_construct,
+            "hnsw_ef": self.hnsw_ef,
+            "rescore": self.rescore,
+            "oversampling": self.oversampling,
+            "scalar_quantile": self.scalar_quantile,
+        }
+
+
+COLLECTION_PROFILES = {
+    PROFILE_DEFAULT: CollectionProfile(PROFILE_DEFAULT),
+    PROFILE_ON_DISK: CollectionProfile(PROFILE_ON_DISK, on_disk=True, hnsw_on_disk=True),
+    PROFILE_SCALAR: CollectionProfile(
+        PROFILE_SCALAR, quantization=PROFILE_SCALAR, on_disk=True, hnsw_m=16, hnsw_ef_construct=128,
+        hnsw_ef=128, oversampling=2.0,
+    ),
+    PROFILE_BINARY: CollectionProfile(
+        PROFILE_BINARY, quantization=PROFILE_BINARY, on_disk=True, hnsw_m=16, hnsw_ef_construct=128,
+        hnsw_ef=128, oversampling=3.0,
+    ),
+}
+
+
+def get_collection_profile(name: str = PROFILE_DEFAULT, **overrides) -> CollectionProfile:
+    """
+    Look up a predefined collection profile, optionally overriding some of its settings.
+
+    Args:
+        name (str): "default", "on_disk", "scalar" or "binary".
+        overrides: CollectionProfile settings to change, e.g. `hnsw_m=32` or `oversampling=4.0`.
+
+    Returns:
+        CollectionProfile: The profile.
+    """
+    name = name or PROFILE_DEFAULT
+    if name not in COLLECTION_PROFILES:
+        raise ValueError(
+            "Invalid collection profile. Supported profiles: 'default', 'on_disk', 'scalar', 'binary'."
+        )
+    if not overrides:
+        return COLLECTION_PROFILES[name]
+    return CollectionProfile(**{**COLLECTION_PROFILES[name].to_dict(), **overrides})
+
+
+def infer_profile_name(collection_config) -> str:
+    """
+    Name the predefined profile matching the storage settings of an existing collection.
+
+    Only the settings that change the search parameters are compared: the quantization, then
+    whether the vectors are on disk. Overrides such as `hnsw_m` cannot be told apart.
+
+    Args:
+        collection_config: The `config` of the collection's `CollectionInfo`.
+
+    Returns:
+        str: "default", "on_disk", "scalar" or "binary".
+    """
+    quantization = collection_config.quantization_config
+    if isinstance(quantization, models.BinaryQuantization):
+        return PROFILE_BINARY
+    if isinstance(quantization, models.ScalarQuantization):
+        return PROFILE_SCALAR
+    if getattr(collection_config.params.vectors, "on_disk", None):
+        return PROFILE_ON_DISK
+    return PROFILE_DEFAULT
+
+
+def resolve_profile(name: str, default_profile: CollectionProfile) -> CollectionProfile:
+    """
+    Look up the profile recorded for a collection, keeping `default_profile` and its overrides when the
+    names match. Unknown or missing names fall back to `default_profile`.
+    """
+    if not name or name == default_profile.name:
+        return default_profile
+    try:
+        return get_collection_profile(name)
+    except ValueError:
+        return default_profile
@@ -0,0 +1,269 @@
+import math
+import re
+import threading
+from typing import Dict, List
+
+from handler.instrumentation import instrumentation
+
+_WORD = re.compile(r"\w+")
+# Longest repeated text looked for between chunks without offsets, well above the 100-character
+# overlap of `QdrantDocumentProcessor.split_file`.
+MAX_TEXT_OVERLAP = 400
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def load_encoding(encoding_name: str):
+    """
+    Load a tiktoken encoding once per process. Threads asking for it at the same time wait for
+    the first one, so the encoding file is downloaded only once.
+
+    Returns None when tiktoken is not installed or the encoding file cannot be downloaded,
+    in which case token counts are estimated from the text length.
+    """
+    if encoding_name in _encodings:
+        return _encodings[encoding_name]
+    with _encodings_lock:
+        if encoding_name not in _encodings:
+            try:
+                import tiktoken
+                _encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+            except Exception as e:
+                print(f"Tokenizer '{encoding_name}' unavailable, estimating token counts instead: {e}")
+                _encodings[encoding_name] = None
+        return _encodings[encoding_name]
+
+
+class ContextAssembler:
+    """
+    Turns retrieved chunks into a compact prompt context within a token budget.
+
+    Steps:
+    1. Merge chunks that overlap or touch within the same page back into contiguous spans, using the
+       `page`/`char_start`/`char_end` payload fields; chunks without offsets (documents ingested before
+       page-aware chunking) are merged where the end of one repeats the start of another.
+    2. Drop spans that are near-duplicates of a higher-scoring span.
+    3. Keep the best-scoring spans that fit in the token budget, truncating one more if enough budget is left;
+       a truncated span keeps its best-scoring chunk and the text around it.
+    4. Order the kept spans by document position and label each with its page.
+    """
+
+    def __init__(self, token_budget: int = 2000, encoding_name: str = "cl100k_base",
+                 duplicate_threshold: float = 0.8, merge_gap: int = 2, min_overlap: int = 20,
+                 min_truncated_tokens: int = 64):
+        """
+        Args:
+            token_budget (int): The maximum number of tokens of the assembled context.
+            encoding_name (str): The tiktoken encoding used to count tokens.
+            duplicate_threshold (float): The word-trigram Jaccard similarity above which a span is a near-duplicate.
+            merge_gap (int): Chunks of a page separated by at most this many characters are merged.
+            min_overlap (int): The minimum repeated text, in characters, to merge chunks without offsets.
+            min_truncated_tokens (int): A span is only truncated to fit if at least this many tokens remain.
+        """
+        self.token_budget = token_budget
+        self.encoding = load_encoding(encoding_name)
+        self.duplicate_threshold = duplicate_threshold
+        self.merge_gap = merge_gap
+        self.min_overlap = min_overlap
+        self.min_truncated_tokens = min_truncated_tokens
+        self.last_stats = {}
+
+    def count_tokens(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return math.ceil(len(text) / 4)
+
+    def truncate(self, text: str, max_tokens: int, focus: tuple = None) -> str:
+        """
+        Cut the text down to `max_tokens`. With `focus`, a (start, end) character range, the tokens
+        kept are that range and the text around it, rather than the start of the text.
+        """
+        start, end = focus or (0, 0)
+        if self.encoding is not None:
+            encode, decode, size = self.encoding.encode, self.encoding.decode, max_tokens
+        else:
+            encode, decode, size = list, "".join, max_tokens * 4
+        before, inner, after = encode(text[:start]), encode(text[start:end]), encode(text[end:])
+        if len(inner) >= size:
+            return decode(inner[:size])
+        left = size - len(inner)
+        after_kept = min(len(after), max(left // 2, left - len(before)))
+        before_kept = min(len(before), left - after_kept)
+        return decode(before[len(before) - before_kept:] + inner + after[:after_kept])
+
+    @staticmethod
+    def _to_span(result: Dict) -> Dict:
+        payload = result.get("payload") or result
+        return {
+            "document_id": result.get("document_id") or payload.get("document_id"),
+            "page": payload.get("page"),
+            "char_start": payload.get("char_start"),
+            "char_end": payload.get("char_end"),
+            "text": payload.get("text", ""),
+            "score": result.get("score", 0.0),
+            "chunks": 1,
+            # The character range of the best-scoring chunk within the text, kept when truncating.
+            "best": (0, len(payload.get("text", ""))),
+        }
+
+    @staticmethod
+    def _join(first: Dict, second: Dict, text: str, offset: int) -> Dict:
+        """
+        Merge two spans into `text`, in which the text of `second` starts at `offset`.
+        """
+        best = first["best"]
+        if second["score"] > first["score"]:
+            best = tuple(min(max(0, offset + position), len(text)) for position in second["best"])
+        return {
+            **first,
+            "char_end": max(first["char_end"], second["char_end"]) if first["char_end"] is not None else None,
+            "text": text,
+            "score": max(first["score"], second["score"]),
+            "chunks": first["chunks"] + second["chunks"],
+            "best": best,
+        }
+
+    def _merge_positioned(self, spans: List[Dict]) -> List[Dict]:
+        """
+        Merge spans of the same document page whose character ranges overlap or touch.
+        """
+        spans = sorted(spans, key=lambda span: (str(span["document_id"]), span["page"] or 0, span["char_start"]))
+        merged = []
+        for span in spans:
+            previous = merged[-1] if merged else None
+            if previous is None or (previous["document_id"], previous["page"]) != (span["document_id"], span["page"]) \
+                    or span["char_start"] > previous["char_end"] + self.merge_gap:
+                merged.append(span)
+                continue
+            if span["char_end"] <= previous["char_end"]:
+                merged[-1] = self._join(
+                    previous, span, previous["text"], span["char_start"] - previous["char_start"]
+                )
+            elif span["char_start"] >= previous["char_end"]:
+                merged[-1] = self._join(
+                    previous, span, previous["text"] + "\n" + span["text"], len(previous["text"]) + 1
+                )
+            else:
+                overlap = previous["char_end"] - span["char_start"]
+                merged[-1] = self._join(
+                    previous, span, previous["text"] + span["text"][overlap:], len(previous["text"]) - overlap
+                )
+        return merged
+
+    def _text_overlap(self, first: str, second: str) -> int:
+        """
+        Return the length of the longest end of `first` that repeats the start of `second`.
+        """
+        for size in range(min(len(first), len(second), MAX_TEXT_OVERLAP), self.min_overlap - 1, -1):
+            if first.endswith(second[:size]):
+                return size
+        return 0
+
+    def _merge_unpositioned(self, spans: List[Dict]) -> List[Dict]:
+        """
+        Chain spans without offsets whose text overlaps, as produced by a splitter with chunk overlap.
+        """
+        spans = list(spans)
+        merged_any = True
+        while merged_any:
+            merged_any = False
+            for i, first in enumerate(spans):
+                for j, second in enumerate(spans):
+                    if i == j or first["document_id"] != second["document_id"]:
+                        continue
+                    overlap = self._text_overlap(first["text"], second["text"])
+                    if overlap:
+                        spans[i] = self._join(
+                            first, second, first["text"] + second["text"][overlap:], len(first["text"]) - overlap
+                        )
+                        del spans[j]
+                        merged_any = True
+                        break
+                if merged_any:
+                    break
+        return spans
+
+    @staticmethod
+    def _shingles(text: str) -> set:
+        words = _WORD.findall(text.lower())
+        return {tuple(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+    def _drop_duplicates(self, spans: List[Dict]) -> List[Dict]:
+        """
+        Keep the best-scoring span of every group of near-identical spans.
+        """
+        kept = []
+        for span in sorted(spans, key=lambda span: span["score"], reverse=True):
+            shingles = self._shingles(span["text"])
+            duplicate = False
+            for other, other_shingles in kept:
+                common = len(shingles & other_shingles)
+                # Containment catches a short span repeated inside a longer one.
+                if common / max(1, len(shingles | other_shingles)) >= self.duplicate_threshold \
+                        or common / max(1, len(shingles)) >= self.duplicate_threshold:
+                    duplicate = True
+                    break
+            if not duplicate:
+                kept.append((span, shingles))
+        return [span for span, _ in kept]
+
+    @staticmethod
+    def _label(span: Dict) -> str:
+        parts = []
+        if span["document_id"]:
+            parts.append(f"Document {span['document_id']}")
+        if span["page"] is not None:
+            parts.append(f"page {span['page']}")
+        return f"[{', '.join(parts)}]" if parts else "[Excerpt]"
+
+    def assemble(self, results: List[Dict]) -> str:
+        """
+        Build the prompt context from search results.
+
+        Args:
+            results (List[Dict]): Search results (`{"payload", "score"}`), or bare payloads.
+
+        Returns:
+            str: The labelled spans in document order, separated by blank lines.
+        """
+        with instrumentation.span("context.assemble", chunks=len(results)) as span:
+            spans = [self._to_span(result) for result in results if (result.get("payload") or result).get("text")]
+            positioned = [item for item in spans if item["char_start"] is not None and item["char_end"] is not None]
+            unpositioned = [item for item in spans if item["char_start"] is None or item["char_end"] is None]
+            merged = self._merge_positioned(positioned) + self._merge_unpositioned(unpositioned)
+            unique = self._drop_duplicates(merged)
+
+            selected, used, truncated = [], 0, 0
+            for item in unique:
+                label = self._label(item)
+                tokens = self.count_tokens(f"{label}\n{item['text']}\n\n")
+                if used + tokens <= self.token_budget:
+                    selected.append((item, label))
+                    used += tokens
+                    continue
+                remaining = self.token_budget - used - self.count_tokens(f"{label}\n\n\n")
+                if remaining >= self.min_truncated_tokens:
+                    text = self.truncate(item["text"], remaining, focus=item["best"])
+                    selected.append(({**item, "text": text}, label))
+                    truncated += 1
+                    break
+
+            # Spans without offsets keep their score order after the positioned ones.
+            selected.sort(key=lambda pair: (
+                pair[0]["char_start"] is None,
+                str(pair[0]["document_id"]),
+                pair[0]["page"] or 0,
+                pair[0]["char_start"] or 0,
+            ))
+            context = "\n\n".join(f"{label}\n{item['text']}" for item, label in selected)
+
+            self.last_stats = {
+                "chunks": len(spans),
+                "merged_spans": len(merged),
+                "duplicates_dropped": len(merged) - len(unique),
+                "spans": len(selected),
+                "truncated": truncated,
+                "tokens": self.count_tokens(context),
+            }
+            span.set(**self.last_stats)
+        return context
@@ -0,0 +1,128 @@
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from qdrant_client import models
+
+REGISTRY_COLLECTION = "clauseai_registry"
+
+
+class DocumentRegistry:
+    """
+    A lightweight registry of ingested documents, kept in a vector-less Qdrant collection.
+
+    Listing documents scrolls this small collection instead of enumerating every
+    Qdrant collection or the chunks of the shared collection.
+    """
+
+    def __init__(self, qdrant_client, collection_name: str = REGISTRY_COLLECTION):
+        """
+        Args:
+            qdrant_client: The raw Qdrant client instance.
+            collection_name (str): The name of the registry collection.
+        """
+        self.qdrant_client = qdrant_client
+        self.collection_name = collection_name
+        self._ready = False
+
+    def _ensure_collection(self):
+        if self._ready:
+            return
+        if not self.qdrant_client.collection_exists(self.collection_name):
+            self.qdrant_client.create_collection(collection_name=self.collection_name, vectors_config={})
+        self._ready = True
+
+    @staticmethod
+    def point_id(document_id: str) -> str:
+        """
+        Build the registry point ID of a document.
+        """
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"clauseai-registry/{document_id}"))
+
+    def register(self, document_id: str, **metadata):
+        """
+        Add or update a document entry. `updated_at` changes on every call and serves as the document version.
+
+        Args:
+            document_id (str): The ID of the document.
+            metadata: Additional fields to store, e.g. collection name or chunk count.
+        """
+        self._ensure_collection()
+        existing = self.get(document_id) or {}
+        payload = {
+            **existing,
+            **metadata,
+            "document_id": document_id,
+            "created_at": existing.get("created_at", time.time()),
+            "updated_at": time.time(),
+        }
+        self.qdrant_client.upsert(
+            collection_name=self.collection_name,
+            points=[models.PointStruct(id=self.point_id(document_id), vector={}, payload=payload)],
+            wait=True,
+        )
+
+    def get(self, document_id: str) -> Optional[Dict]:
+        """
+        Fetch the entry of a document, or None if it is not registered.
+        """
+        self._ensure_collection()
+        records = self.qdrant_client.retrieve(
+            collection_name=self.collection_name,
+            ids=[self.point_id(document_id)],
+            with_payload=True,
+            with_vectors=False,
+        )
+        return records[0].payload if records else None
+
+    def remove(self, document_id: str):
+        """
+        Remove a document entry.
+        """
+        self._ensure_collection()
+        self.qdrant_client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.PointIdsList(points=[self.point_id(document_id)]),
+        )
+
+    def find_by_collection(self, collection: str) -> Optional[Dict]:
+        """
+        Fetch the entry of any document stored in a Qdrant collection, or None if there is none.
+        """
+        self._ensure_collection()
+        points, _ = self.qdrant_client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=models.Filter(
+                must=[models.FieldCondition(key="collection", match=models.MatchValue(value=collection))]
+            ),
+            limit=1,
+            with_payload=True,
+            with_vectors=False,
+        )
+        return points[0].payload if points else None
+
+    def list_documents(self) -> List[Dict]:
+        """
+        Return the entries of all registered documents, oldest first.
+        """
+        self._ensure_collection()
+        documents = []
+        next_offset = None
+        while True:
+            points, next_offset = self.qdrant_client.scroll(
+                collection_name=self.collection_name,
+                limit=1000,
+                offset=next_offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+            documents.extend(point.payload for point in points)
+            if next_offset is None:
+                break
+        return sorted(documents, key=lambda document: document.get("created_at", 0))
+
+    def list_document_ids(self) -> List[str]:
+        """
+        Return the IDs of all registered documents, oldest first.
+        """
+        return [document["document_id"] for document in self.list_documents()]
@@ -0,0 +1,202 @@
+"""
+Export documents to compact snapshots and load them back without re-embedding.
+
+A snapshot is a directory holding:
+- payloads.jsonl: one chunk payload (text, page, character offsets) per line.
+- vectors.npy: the float32 vectors, one row per line of payloads.jsonl, loadable with `np.load(mmap_mode="r")`.
+- manifest.json: the document ID, point count, dimension and registry metadata (embedding backend and model).
+
+The manifest is written last, so an interrupted export is never mistaken for a complete one.
+
+Usage:
+    python -m handler.document_snapshot export snapshots/ [DOCUMENT_ID ...]
+    python -m handler.document_snapshot import snapshots/contract_20240101 [--document-id NEW_ID]
+
+Without document IDs every document is exported. Connection details are read from the QDRANT_URL,
+QDRANT_API_KEY and QDRANT_STORAGE_MODE environment variables unless given as options, so the
+same snapshot can be loaded into another Qdrant instance.
+"""
+import argparse
+import json
+import os
+import time
+from itertools import islice
+
+import numpy as np
+from dotenv import load_dotenv
+
+from handler.qdrant_adapter import QdrantHandler
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_FILE = "manifest.json"
+PAYLOADS_FILE = "payloads.jsonl"
+VECTORS_FILE = "vectors.npy"
+
+# Registry fields that describe where a document is stored rather than how it was embedded.
+_STORAGE_FIELDS = ("document_id", "collection", "storage_mode", "chunk_count", "collection_profile",
+                   "created_at", "updated_at")
+
+
+def export_document(qdrant_handler: QdrantHandler, document_id: str, directory: str, batch_size: int = 1000) -> dict:
+    """
+    Stream the chunks and vectors of a document into a snapshot directory.
+
+    Args:
+        qdrant_handler (QdrantHandler): The handler the document is read from.
+        document_id (str): The ID of the document.
+        directory (str): The snapshot directory, created if needed.
+        batch_size (int): The number of points fetched per scroll request.
+
+    Returns:
+        dict: The manifest of the snapshot.
+    """
+    target_collection, document_filter = qdrant_handler._target(document_id)
+    client = qdrant_handler.load_qdrant_connection()
+    if not qdrant_handler.collection_exists(document_id):
+        raise ValueError(f"Document '{document_id}' does not exist.")
+    count = client.count(collection_name=target_collection, count_filter=document_filter, exact=True).count
+
+    os.makedirs(directory, exist_ok=True)
+    vectors_out = None
+    written = 0
+    with open(os.path.join(directory, PAYLOADS_FILE), "w", encoding="utf-8") as payloads_out:
+        for payloads, vectors in qdrant_handler.iter_points(document_id, batch_size=batch_size, with_vectors=True):
+            if vectors_out is None:
+                vectors_out = np.lib.format.open_memmap(
+                    os.path.join(directory, VECTORS_FILE), mode="w+", dtype=np.float32,
+                    shape=(count, vectors.shape[1]),
+                )
+            if written + len(payloads) > count:
+                raise ValueError(f"Document '{document_id}' changed during the export.")
+            vectors_out[written:written + len(payloads)] = vectors
+            payloads_out.writelines(json.dumps(payload, ensure_ascii=False) + "\n" for payload in payloads)
+            written += len(payloads)
+    if written != count:
+        raise ValueError(f"Document '{document_id}' changed during the export.")
+    dimension = vectors_out.shape[1] if vectors_out is not None else 0
+    if vectors_out is not None:
+        vectors_out.flush()
+        del vectors_out
+    else:
+        np.save(os.path.join(directory, VECTORS_FILE), np.empty((0, 0), dtype=np.float32))
+
+    entry = qdrant_handler.get_document_entry(document_id) or {}
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "document_id": document_id,
+        "points": written,
+        "dimension": int(dimension),
+        "metadata": {key: value for key, value in entry.items() if key not in _STORAGE_FIELDS},
+        "exported_at": time.time(),
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Exported {written} points of '{document_id}' to {directory}")
+    return manifest
+
+
+def load_snapshot(directory: str):
+    """
+    Open a snapshot without reading it into memory.
+
+    Returns:
+        tuple: The manifest and the memory-mapped vectors array.
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"'{directory}' is not a complete snapshot: {MANIFEST_FILE} is missing.")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format')}.")
+    vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+    if vectors.shape[0] != manifest["points"]:
+        raise ValueError(f"Snapshot '{directory}' holds {vectors.shape[0]} vectors, expected {manifest['points']}.")
+    return manifest, vectors
+
+
+def iter_snapshot_batches(directory: str, batch_size: int = 256):
+    """
+    Stream a snapshot as (payloads, vectors) batches, the input of `QdrantHandler.store_batches`.
+
+    Vectors are slices of the memory-mapped file, so only the current batch is paged in.
+    """
+    _, vectors = load_snapshot(directory)
+    start = 0
+    with open(os.path.join(directory, PAYLOADS_FILE), "r", encoding="utf-8") as f:
+        while True:
+            payloads = [json.loads(line) for line in islice(f, batch_size)]
+            if not payloads:
+                break
+            yield payloads, vectors[start:start + len(payloads)]
+            start += len(payloads)
+    if start != vectors.shape[0]:
+        raise ValueError(f"Snapshot '{directory}' holds {vectors.shape[0]} vectors but {start} payloads.")
+
+
+def import_document(qdrant_handler: QdrantHandler, directory: str, document_id: str = None,
+                    batch_size: int = 256, upload_workers: int = 4) -> int:
+    """
+    Load a snapshot into Qdrant as a new document, keeping its embedding metadata. A snapshot
+    without points is skipped, so no document without chunks is registered.
+
+    Args:
+        qdrant_handler (QdrantHandler): The handler the document is stored with.
+        directory (str): The snapshot directory.
+        document_id (str): The ID of the loaded document (defaults to the exported ID).
+        batch_size (int): The number of points uploaded per request.
+        upload_workers (int): The number of parallel upload workers.
+
+    Returns:
+        int: The number of points loaded.
+    """
+    manifest, _ = load_snapshot(directory)
+    document_id = document_id or manifest["document_id"]
+    if qdrant_handler.collection_exists(document_id):
+        raise ValueError(f"Document '{document_id}' already exists.")
+    if not manifest["points"]:
+        print(f"Skipped '{directory}': the snapshot holds no points.")
+        return 0
+    return qdrant_handler.store_batches(
+        iter_snapshot_batches(directory, batch_size=batch_size),
+        collection_name=document_id,
+        upload_workers=upload_workers,
+        metadata=manifest["metadata"],
+    )
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Export documents to snapshots or load snapshots into Qdrant.")
+    parser.add_argument("--url", default=os.getenv("QDRANT_URL"))
+    parser.add_argument("--api-key", default=os.getenv("QDRANT_API_KEY"))
+    parser.add_argument("--storage-mode", default=os.getenv("QDRANT_STORAGE_MODE", "per_document"))
+    parser.add_argument("--profile", default=os.getenv("QDRANT_COLLECTION_PROFILE", "default"),
+                        help="The storage profile of collections created by an import.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write one snapshot directory per document.")
+    export_parser.add_argument("output_dir")
+    export_parser.add_argument("documents", nargs="*", help="Documents to export (default: all).")
+    export_parser.add_argument("--batch-size", type=int, default=1000)
+    import_parser = subparsers.add_parser("import", help="Load snapshot directories as new documents.")
+    import_parser.add_argument("snapshots", nargs="+")
+    import_parser.add_argument("--document-id", default=None, help="Load a single snapshot under another ID.")
+    import_parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    qdrant_handler = QdrantHandler(
+        url=args.url, api_key=args.api_key, storage_mode=args.storage_mode, collection_profile=args.profile
+    )
+    if args.command == "export":
+        for document_id in args.documents or qdrant_handler.get_collection_names():
+            export_document(qdrant_handler, document_id, os.path.join(args.output_dir, document_id),
+                            batch_size=args.batch_size)
+    else:
+        if args.document_id and len(args.snapshots) > 1:
+            parser.error("--document-id needs a single snapshot.")
+        for directory in args.snapshots:
+            import_document(qdrant_handler, directory, document_id=args.document_id, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from handler.ingestion_cache import DEFAULT_CACHE_DIR
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text before hashing so whitespace-only differences share one embedding.
+    """
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    A size-bounded on-disk store of embeddings keyed by (model, normalized text hash).
+
+    Vectors are stored as float32 blobs and evicted least-recently-used once the
+    number of entries exceeds `max_entries`.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_entries: int = 500_000):
+        """
+        Initialize the cache, creating its database if needed.
+
+        Args:
+            cache_dir (str): Directory holding the cache database.
+            max_entries (int): Maximum number of embeddings kept on disk.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, "embeddings.sqlite")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """
+        Build the cache key for a text embedded with the given model.
+        """
+        return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Fetch cached embeddings for a list of texts.
+
+        Args:
+            model (str): The embedding model name.
+            texts (List[str]): The texts to look up.
+
+        Returns:
+            List[Optional[np.ndarray]]: The float32 vector for each text, or None on a miss.
+        """
+        keys = [self.make_key(model, text) for text in texts]
+        found = {}
+        with self._connect() as connection:
+            for start in range(0, len(keys), 500):
+                batch = list(set(keys[start:start + 500]))
+                placeholders = ",".join("?" * len(batch))
+                rows = connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update({key: np.frombuffer(vector, dtype=np.float32) for key, vector in rows})
+            if found:
+                now = time.time()
+                connection.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+        vectors = [found.get(key) for key in keys]
+        hits = sum(vector is not None for vector in vectors)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, model: str, texts: List[str], vectors):
+        """
+        Store embeddings for a list of texts and evict the least recently used entries if over capacity.
+
+        Args:
+            model (str): The embedding model name.
+            texts (List[str]): The embedded texts.
+            vectors: The embeddings, one per text.
+        """
+        now = time.time()
+        rows = [
+            (self.make_key(model, text), model, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, last_access) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            (count,) = connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                connection.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def stats(self) -> dict:
+        """
+        Return the hit and miss counters of this process and the number of stored entries.
+        """
+        with self._connect() as connection:
+            (entries,) = connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+class CachedEmbeddings:
+    """
+    Wraps an embeddings client so texts already in the EmbeddingCache are never embedded again.
+
+    Exposes the same `embed_documents` / `embed_query` interface as the wrapped client,
+    returning float32 NumPy arrays.
+    """
+
+    def __init__(self, embeddings, cache: EmbeddingCache, model_name: str = None):
+        """
+        Args:
+            embeddings: The embeddings client to call on cache misses.
+            cache (EmbeddingCache): The embedding store to check first.
+            model_name (str): The model name used in cache keys (read from the client if omitted).
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = (
+            model_name
+            or getattr(embeddings, "model_name", None)
+            or getattr(embeddings, "model", None)
+            or type(embeddings).__name__
+        )
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a list of texts, calling the wrapped client only for cache misses.
+        """
+        vectors = self.cache.get_many(self.model_name, texts)
+        missing = {}
+        for idx, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(normalize_text(texts[idx]), []).append(idx)
+        if missing:
+            missing_texts = [texts[indices[0]] for indices in missing.values()]
+            new_vectors = self.embeddings.embed_documents(missing_texts)
+            self.cache.put_many(self.model_name, missing_texts, new_vectors)
+            for indices, vector in zip(missing.values(), new_vectors):
+                for idx in indices:
+                    vectors[idx] = np.asarray(vector, dtype=np.float32)
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(vectors)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """
+        Embed a single query, calling the wrapped client only on a cache miss.
+        """
+        (vector,) = self.cache.get_many(self.model_name, [text])
+        if vector is None:
+            vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+            self.cache.put_many(self.model_name, [text], [vector])
+        return vector
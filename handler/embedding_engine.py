@@ -0,0 +1,128 @@
+import threading
+from typing import List
+
+import numpy as np
+
+from handler.embedding_scheduler import get_embedding_scheduler
+
+BACKEND_OPENAI = "openai"
+BACKEND_LOCAL = "local"
+DEFAULT_MODELS = {
+    BACKEND_OPENAI: "text-embedding-ada-002",
+    BACKEND_LOCAL: "sentence-transformers/all-MiniLM-L6-v2",
+}
+
+
+class EmbeddingEngine:
+    """
+    The interface every embedding backend implements.
+
+    `embed_documents` returns a float32 array of shape (len(texts), dimension) and
+    `embed_query` a float32 array of shape (dimension,).
+    """
+    backend = None
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed_documents([text])[0]
+
+
+class OpenAIEmbeddingEngine(EmbeddingEngine):
+    """
+    Embeds texts through the OpenAI embeddings API.
+
+    Requests go through the EmbeddingScheduler of the API key and model, which keeps them within
+    the rate limits shared by every ingestion and query of the process.
+    """
+    backend = BACKEND_OPENAI
+
+    def __init__(self, openai_api_key: str, model_name: str = None, chunk_size: int = 1000):
+        """
+        Args:
+            openai_api_key (str): The OpenAI API key.
+            model_name (str): The OpenAI embedding model.
+            chunk_size (int): The maximum number of texts sent per API request.
+        """
+        super().__init__(model_name or DEFAULT_MODELS[BACKEND_OPENAI])
+        self.chunk_size = chunk_size
+        self.scheduler = get_embedding_scheduler(openai_api_key, self.model_name)
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        return self.scheduler.embed(list(texts), max_inputs=self.chunk_size)
+
+
+class LocalEmbeddingEngine(EmbeddingEngine):
+    """
+    Embeds texts on the local CPU with a sentence-transformers model, in batches.
+
+    Needs the optional `sentence-transformers` package; pass `onnx=True` to run the model
+    through ONNX Runtime (requires `sentence-transformers[onnx]`).
+    """
+    backend = BACKEND_LOCAL
+
+    def __init__(self, model_name: str = None, batch_size: int = 64, onnx: bool = False, device: str = "cpu"):
+        """
+        Args:
+            model_name (str): The sentence-transformers model name or local path.
+            batch_size (int): The number of texts encoded per forward pass.
+            onnx (bool): Run the model with the ONNX backend.
+            device (str): The device to run inference on.
+        """
+        super().__init__(model_name or DEFAULT_MODELS[BACKEND_LOCAL])
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "The local embedding backend requires 'sentence-transformers'. "
+                "Install it with: pip install sentence-transformers"
+            ) from e
+        model_kwargs = {"backend": "onnx"} if onnx else {}
+        self.model = SentenceTransformer(self.model_name, device=device, **model_kwargs)
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+_local_engines = {}
+_local_engines_lock = threading.Lock()
+
+
+def get_embedding_engine(backend: str = BACKEND_OPENAI, model_name: str = None, openai_api_key: str = None,
+                         **kwargs) -> EmbeddingEngine:
+    """
+    Build the embedding engine for a backend.
+
+    Local models are loaded once per process and shared.
+
+    Args:
+        backend (str): "openai" or "local".
+        model_name (str): The model of the backend (defaults per backend).
+        openai_api_key (str): The OpenAI API key, required for the "openai" backend.
+        kwargs: Additional backend options, e.g. `batch_size` or `onnx` for the local backend.
+
+    Returns:
+        EmbeddingEngine: The engine.
+    """
+    backend = backend or BACKEND_OPENAI
+    if backend == BACKEND_OPENAI:
+        return OpenAIEmbeddingEngine(openai_api_key, model_name=model_name, **kwargs)
+    if backend == BACKEND_LOCAL:
+        key = (model_name or DEFAULT_MODELS[BACKEND_LOCAL], tuple(sorted(kwargs.items())))
+        with _local_engines_lock:
+            if key not in _local_engines:
+                _local_engines[key] = LocalEmbeddingEngine(model_name=model_name, **kwargs)
+            return _local_engines[key]
+    raise ValueError("Invalid embedding backend. Supported backends: 'openai', 'local'.")
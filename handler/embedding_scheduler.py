@@ -0,0 +1,394 @@
+"""
+Schedules OpenAI embedding requests within the tokens-per-minute and requests-per-minute limits of the account.
+
+Every OpenAI embedding engine of a process embeds through the scheduler of its API key and model, so
+concurrent ingestions share one budget instead of each one running into 429 responses:
+- Texts are packed into requests by token count rather than by number of texts.
+- Requests wait for both budgets before being sent, and several are kept in flight.
+- A throttled request is retried after the server's Retry-After delay, or an exponential backoff, plus
+  random jitter; the whole budget pauses for that delay and the number of requests in flight is halved,
+  then grows back by one request per window of successes.
+
+The limits are set per process with `configure_embedding_scheduler`, e.g. from the OPENAI_EMBEDDING_TPM
+and OPENAI_EMBEDDING_RPM environment variables in the entry scripts.
+"""
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+from handler.context_assembler import load_encoding
+from handler.instrumentation import instrumentation
+
+# The default limits of the first usage tier for text-embedding-ada-002.
+DEFAULT_TOKENS_PER_MINUTE = 1_000_000
+DEFAULT_REQUESTS_PER_MINUTE = 3_000
+# The API accepts at most 2048 inputs of at most 8191 tokens per request.
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_INPUT_TOKENS = 8191
+
+_scheduler_settings = {}
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    Tell whether a failed embedding request can be sent again: rate limits, timeouts,
+    connection errors and 5xx responses.
+    """
+    import openai.error
+    if isinstance(error, (openai.error.RateLimitError, openai.error.Timeout, openai.error.APIConnectionError,
+                          openai.error.ServiceUnavailableError, openai.error.TryAgain)):
+        return True
+    return isinstance(error, openai.error.APIError) and (error.http_status or 500) >= 500
+
+
+def retry_after_seconds(error: BaseException):
+    """
+    Read the delay requested by the server from the Retry-After header of an error, if any.
+    """
+    headers = getattr(error, "headers", None) or {}
+    for name in ("retry-after-ms", "Retry-After-Ms"):
+        if headers.get(name):
+            try:
+                return float(headers[name]) / 1000
+            except ValueError:
+                pass
+    for name in ("retry-after", "Retry-After"):
+        if headers.get(name):
+            try:
+                return float(headers[name])
+            except ValueError:
+                pass
+    return None
+
+
+class RateLimitBudget:
+    """
+    Token buckets for the requests and tokens sent per minute, shared by the threads of a process.
+
+    Each bucket holds at most `burst_seconds` worth of its per-minute limit and refills continuously,
+    so requests are spread over the minute instead of being sent in one burst at its start. When the
+    server throttles requests sent within the budget, the configured limits are higher than the real ones
+    (or another process shares them): the refill rate is cut by a fifth, and recovers by 1% per success.
+    """
+
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int, burst_seconds: float = 10.0):
+        """
+        Args:
+            tokens_per_minute (int): The tokens-per-minute limit.
+            requests_per_minute (int): The requests-per-minute limit.
+            burst_seconds (float): The seconds of budget that can be spent at once.
+        """
+        if tokens_per_minute <= 0 or requests_per_minute <= 0:
+            raise ValueError("Invalid rate limit. Tokens and requests per minute must be positive.")
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.token_capacity = max(1.0, tokens_per_minute * burst_seconds / 60)
+        self.request_capacity = max(1.0, requests_per_minute * burst_seconds / 60)
+        self.tokens = self.token_capacity
+        self.requests = self.request_capacity
+        self.rate_factor = 1.0
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        self.tokens = min(self.token_capacity, self.tokens + elapsed * self.rate_factor * self.tokens_per_minute / 60)
+        self.requests = min(
+            self.request_capacity, self.requests + elapsed * self.rate_factor * self.requests_per_minute / 60
+        )
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Block until one request of `tokens` tokens fits in both budgets, then spend it.
+
+        Requests larger than the token bucket wait for a full bucket and leave it in debt.
+
+        Returns:
+            float: The seconds waited.
+        """
+        start = time.monotonic()
+        tokens = min(tokens, self.token_capacity)
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    wait = max(
+                        (tokens - self.tokens) * 60 / (self.rate_factor * self.tokens_per_minute),
+                        (1 - self.requests) * 60 / (self.rate_factor * self.requests_per_minute),
+                    )
+                if wait <= 0:
+                    self.tokens -= tokens
+                    self.requests -= 1
+                    return now - start
+                self._condition.wait(wait)
+
+    def settle(self, estimated: int, actual: int):
+        """
+        Correct the token budget with the usage reported by the API for a request spent as `estimated`.
+        """
+        with self._condition:
+            self.rate_factor = min(1.0, self.rate_factor + 0.01)
+            self.tokens = min(self.token_capacity, self.tokens + estimated - actual)
+            self._condition.notify_all()
+
+    def pause(self, seconds: float):
+        """
+        Hold back every request for `seconds`, after the server reported the limits as exceeded.
+        """
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            # Several requests in flight are often throttled at once; cut the rate once per pause.
+            if now >= self.paused_until:
+                self.rate_factor = max(0.1, self.rate_factor * 0.8)
+            self.paused_until = max(self.paused_until, now + seconds)
+            # The server's view of the budget is exhausted; start refilling from empty.
+            self.tokens = min(self.tokens, 0.0)
+            self.requests = min(self.requests, 0.0)
+
+
+class EmbeddingScheduler:
+    """
+    Sends the embedding requests of one API key and model within a shared RateLimitBudget.
+
+    Use `get_embedding_scheduler` to get the scheduler shared by the process rather than creating one.
+    """
+
+    def __init__(
+        self,
+        openai_api_key: str,
+        model_name: str,
+        tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE,
+        requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+        max_in_flight: int = 8,
+        max_batch_tokens: int = 20_000,
+        max_retries: int = 8,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        request_timeout: float = 60.0,
+        burst_seconds: float = 10.0,
+        encoding_name: str = "cl100k_base",
+    ):
+        """
+        Args:
+            openai_api_key (str): The OpenAI API key.
+            model_name (str): The OpenAI embedding model.
+            tokens_per_minute (int): The tokens-per-minute limit of the model.
+            requests_per_minute (int): The requests-per-minute limit of the model.
+            max_in_flight (int): The maximum number of requests in flight.
+            max_batch_tokens (int): The maximum number of tokens per request.
+            max_retries (int): The number of times a throttled or failed request is sent again.
+            base_delay (float): The first backoff delay in seconds, doubled on every retry.
+            max_delay (float): The maximum backoff delay in seconds.
+            request_timeout (float): The timeout of a request in seconds.
+            burst_seconds (float): The seconds of budget that can be spent at once.
+            encoding_name (str): The tiktoken encoding used to count tokens.
+        """
+        self.openai_api_key = openai_api_key
+        self.model_name = model_name
+        self.budget = RateLimitBudget(tokens_per_minute, requests_per_minute, burst_seconds=burst_seconds)
+        self.max_in_flight = max_in_flight
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.request_timeout = request_timeout
+        self.encoding_name = encoding_name
+        self.concurrency = float(max_in_flight)
+        self.in_flight = 0
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0, "tokens": 0, "wait_seconds": 0.0}
+        self._gate = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="embedding-scheduler")
+
+    @property
+    def encoding(self):
+        """
+        The tiktoken encoding, loaded when the first texts are counted rather than with the engine.
+        """
+        return load_encoding(self.encoding_name)
+
+    def count_tokens(self, text: str) -> int:
+        encoding = self.encoding
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return max(1, math.ceil(len(text) / 4))
+
+    def _prepare(self, text: str):
+        """
+        Return the text as sent to the API, cut to the input limit of the model, and its token count.
+        """
+        if self.model_name.endswith("001"):
+            # First-generation models embed newlines poorly.
+            text = text.replace("\n", " ")
+        text = text or " "
+        tokens = self.count_tokens(text)
+        if tokens > MAX_INPUT_TOKENS:
+            if self.encoding is not None:
+                text = self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:MAX_INPUT_TOKENS])
+            else:
+                text = text[:MAX_INPUT_TOKENS * 4]
+            tokens = MAX_INPUT_TOKENS
+        return text, tokens
+
+    def batch_token_target(self) -> int:
+        """
+        The tokens per request: enough that the requests budget runs out no sooner than the tokens budget,
+        and few enough that the requests currently allowed in flight all fit in the token bucket at once.
+        """
+        budget = self.budget
+        floor = math.ceil(budget.tokens_per_minute / budget.requests_per_minute)
+        share = int(budget.token_capacity / max(1, int(self.concurrency)))
+        return max(1, min(self.max_batch_tokens, max(floor, share)))
+
+    def make_batches(self, texts: List[str], max_inputs: int = MAX_INPUTS_PER_REQUEST) -> List[Dict]:
+        """
+        Pack texts, in order, into requests of about `batch_token_target()` tokens.
+
+        Returns:
+            List[Dict]: The requests, with the "start" index of their first text, the "texts" and their "tokens".
+        """
+        target = self.batch_token_target()
+        max_inputs = min(max_inputs, MAX_INPUTS_PER_REQUEST)
+        batches, current = [], None
+        for index, text in enumerate(texts):
+            prepared, tokens = self._prepare(text)
+            if current is None or current["tokens"] + tokens > target or len(current["texts"]) >= max_inputs:
+                current = {"start": index, "texts": [], "tokens": 0}
+                batches.append(current)
+            current["texts"].append(prepared)
+            current["tokens"] += tokens
+        return batches
+
+    def _enter(self):
+        with self._gate:
+            while self.in_flight >= int(self.concurrency):
+                self._gate.wait()
+            self.in_flight += 1
+
+    def _leave(self, throttled: bool):
+        """
+        Release a request slot, halving the allowed concurrency on throttling and growing it
+        by one request per `concurrency` successful requests otherwise.
+        """
+        with self._gate:
+            self.in_flight -= 1
+            if throttled:
+                self.concurrency = max(1.0, self.concurrency / 2)
+            else:
+                self.concurrency = min(float(self.max_in_flight), self.concurrency + 1 / self.concurrency)
+            self._gate.notify_all()
+
+    def backoff_delay(self, attempt: int, retry_after: float = None) -> float:
+        """
+        The delay before retry number `attempt` (from 1): the server's Retry-After plus up to one base delay
+        of jitter, or otherwise an exponential backoff with full jitter.
+        """
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(self.base_delay / 2, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _send(self, batch: Dict) -> np.ndarray:
+        """
+        Send one request, waiting for the budget and retrying while the error is retryable.
+        """
+        import openai
+        import openai.error
+
+        attempt = 0
+        while True:
+            waited = self.budget.acquire(batch["tokens"])
+            self._enter()
+            throttled = False
+            try:
+                with instrumentation.span("embedding.request", model=self.model_name, inputs=len(batch["texts"]),
+                                          tokens=batch["tokens"], attempt=attempt, budget_wait=waited):
+                    response = openai.Embedding.create(
+                        input=batch["texts"], model=self.model_name, api_key=self.openai_api_key,
+                        request_timeout=self.request_timeout,
+                    )
+                usage = (response.get("usage") or {}).get("total_tokens")
+                if usage is not None:
+                    self.budget.settle(batch["tokens"], usage)
+                with self._gate:
+                    self.stats["requests"] += 1
+                    self.stats["tokens"] += usage if usage is not None else batch["tokens"]
+                    self.stats["wait_seconds"] += waited
+                data = sorted(response["data"], key=lambda item: item["index"])
+                return np.asarray([item["embedding"] for item in data], dtype=np.float32)
+            except Exception as e:
+                attempt += 1
+                if not is_retryable_error(e) or attempt > self.max_retries:
+                    raise
+                throttled = isinstance(e, openai.error.RateLimitError)
+                retry_after = retry_after_seconds(e)
+                delay = self.backoff_delay(attempt, retry_after)
+                with self._gate:
+                    self.stats["retries"] += 1
+                    self.stats["throttled"] += int(throttled)
+                instrumentation.add("embedding_requests_throttled" if throttled else "embedding_requests_retried")
+                if throttled or retry_after is not None:
+                    self.budget.pause(retry_after if retry_after is not None else delay)
+                print(f"Embedding request failed ({type(e).__name__}), retry {attempt} in {delay:.1f}s: {e}")
+            finally:
+                self._leave(throttled)
+            time.sleep(delay)
+
+    def embed(self, texts: List[str], max_inputs: int = MAX_INPUTS_PER_REQUEST) -> np.ndarray:
+        """
+        Embed texts, sending their requests concurrently within the shared budget.
+
+        Args:
+            texts (List[str]): The texts to embed.
+            max_inputs (int): The maximum number of texts per request.
+
+        Returns:
+            np.ndarray: The float32 embeddings, one row per text, in the order of `texts`.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        batches = self.make_batches(texts, max_inputs=max_inputs)
+        futures = [self._executor.submit(self._send, batch) for batch in batches]
+        return np.vstack([future.result() for future in futures])
+
+
+def configure_embedding_scheduler(tokens_per_minute: int = None, requests_per_minute: int = None,
+                                  max_in_flight: int = None, **settings):
+    """
+    Set the rate limits of the embedding schedulers of this process.
+
+    Call it at startup: schedulers already created keep their settings. When several processes share
+    an API key, give each one its share of the limits.
+
+    Args:
+        tokens_per_minute (int): The tokens-per-minute limit per model.
+        requests_per_minute (int): The requests-per-minute limit per model.
+        max_in_flight (int): The maximum number of requests in flight per model.
+        settings: Other EmbeddingScheduler options, e.g. `max_batch_tokens` or `max_retries`.
+    """
+    settings.update(
+        tokens_per_minute=tokens_per_minute, requests_per_minute=requests_per_minute, max_in_flight=max_in_flight
+    )
+    with _schedulers_lock:
+        _scheduler_settings.update({key: value for key, value in settings.items() if value is not None})
+
+
+def get_embedding_scheduler(openai_api_key: str, model_name: str) -> EmbeddingScheduler:
+    """
+    Return the scheduler of an API key and model, created on first use and shared by the whole process.
+    """
+    key = (openai_api_key, model_name)
+    with _schedulers_lock:
+        if key not in _schedulers:
+            _schedulers[key] = EmbeddingScheduler(openai_api_key, model_name, **_scheduler_settings)
+        return _schedulers[key]
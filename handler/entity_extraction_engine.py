@@ -0,0 +1,156 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from handler.context_assembler import ContextAssembler
+from handler.prompt_entity_extractor import get_entities
+
+NOT_FOUND = "None"
+
+
+def parse_extracted_entities(response: str) -> Dict:
+    """
+    Parse the `extracted_entities` object out of an LLM response.
+
+    Tolerates surrounding prose or code fences. Returns an empty dict if the response holds no valid JSON.
+    """
+    start, end = response.find("{"), response.rfind("}")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        parsed = json.loads(response[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    extracted = parsed.get("extracted_entities", parsed)
+    return extracted if isinstance(extracted, dict) else {}
+
+
+class ChunkedEntityExtractor:
+    """
+    A map-reduce entity extractor whose prompts stay bounded as documents grow.
+
+    The map stage runs either one retrieval-backed extraction per entity against the
+    document's Qdrant vectors ("retrieval" mode), or one extraction per batch of document
+    text ("map" mode), with bounded concurrency. The reduce stage merges the partial
+    results into a single `extracted_entities` JSON and asks the LLM to reconcile only
+    the entities that received conflicting values.
+    """
+
+    def __init__(self, assistant, query_handler=None, max_concurrency: int = 8, top_k: int = 5,
+                 batch_chars: int = 12000, context_tokens: int = 2000):
+        """
+        Initialize the ChunkedEntityExtractor.
+
+        Args:
+            assistant (GPT4Assistant): The assistant used for the map and merge prompts.
+            query_handler (QdrantQueryHandler): The query handler of the document, required for "retrieval" mode.
+            max_concurrency (int): The maximum number of concurrent LLM calls in the map stage.
+            top_k (int): The number of chunks retrieved per entity in "retrieval" mode.
+            batch_chars (int): The size of each text batch in "map" mode.
+            context_tokens (int): The token budget of the retrieved context per entity in "retrieval" mode.
+        """
+        self.assistant = assistant
+        self.query_handler = query_handler
+        self.max_concurrency = max_concurrency
+        self.top_k = top_k
+        self.batch_chars = batch_chars
+        self.context_tokens = context_tokens
+        self.errors = []
+
+    def _extract_from_context(self, context_chunks, entities: List[str]) -> Dict:
+        response = self.assistant.get_response(
+            task_type="entity_extraction", context_chunks=context_chunks, query="", entities=entities
+        )
+        if response.startswith("An error occurred"):
+            self.errors.append(response)
+        return parse_extracted_entities(response)
+
+    def _map_entity(self, entity: str) -> Dict:
+        """
+        Retrieve the chunks most similar to one entity and extract it from them.
+        """
+        try:
+            results = self.query_handler.query_response(entity, limit=self.top_k)
+        except Exception as e:
+            self.errors.append(f"An error occurred: {str(e)}")
+            return {}
+        context_chunks = ContextAssembler(token_budget=self.context_tokens).assemble(results)
+        if not context_chunks:
+            return {}
+        return self._extract_from_context(context_chunks, [entity])
+
+    def map_by_retrieval(self, entities: List[str]) -> List[Dict]:
+        """
+        Run the per-entity retrieval map stage.
+        """
+        if self.query_handler is None:
+            raise ValueError("Retrieval mode requires a query handler for the document.")
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(self._map_entity, entities))
+
+    def map_by_batches(self, document_content: str, entities: List[str]) -> List[Dict]:
+        """
+        Run the per-batch map stage over the document text.
+        """
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        splitter = RecursiveCharacterTextSplitter(chunk_size=self.batch_chars, chunk_overlap=min(200, self.batch_chars // 10))
+        batches = splitter.split_text(document_content)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(lambda batch: self._extract_from_context(batch, entities), batches))
+
+    def merge(self, partial_results: List[Dict], entities: List[str]) -> Dict:
+        """
+        Reconcile the partial results into one value per entity.
+
+        Entities with a single distinct value are merged locally; only conflicting
+        entities are sent to the LLM in one merge prompt.
+        """
+        candidates = {entity: [] for entity in entities}
+        for partial in partial_results:
+            for entity in entities:
+                value = partial.get(entity)
+                if value is None or str(value).strip() in ("", NOT_FOUND):
+                    continue
+                if str(value).strip().lower() not in (str(seen).strip().lower() for seen in candidates[entity]):
+                    candidates[entity].append(value)
+
+        merged = {entity: values[0] if values else NOT_FOUND for entity, values in candidates.items()}
+        conflicts = {entity: values for entity, values in candidates.items() if len(values) > 1}
+        if conflicts:
+            response = self.assistant.get_response(
+                task_type="entity_merge",
+                context_chunks=json.dumps(conflicts, indent=2, default=str),
+                query="",
+                entities=list(conflicts),
+            )
+            if response.startswith("An error occurred"):
+                self.errors.append(response)
+            reconciled = parse_extracted_entities(response)
+            merged.update({entity: reconciled[entity] for entity in conflicts if entity in reconciled})
+        return merged
+
+    def extract(self, document_content: str = None, mode: str = "retrieval") -> str:
+        """
+        Extract the entities of a document.
+
+        Args:
+            document_content (str): The document text, required for "map" mode.
+            mode (str): "retrieval" or "map".
+
+        Returns:
+            str: The `extracted_entities` JSON. Failed LLM calls are collected in `errors`.
+        """
+        self.errors = []
+        entities = get_entities()
+        if mode == "retrieval":
+            partial_results = self.map_by_retrieval(entities)
+        elif mode == "map":
+            if not document_content:
+                raise ValueError("For 'map' mode, 'document_content' must be provided.")
+            partial_results = self.map_by_batches(document_content, entities)
+        else:
+            raise ValueError("Invalid mode. Supported modes: 'retrieval', 'map'.")
+        return json.dumps({"extracted_entities": self.merge(partial_results, entities)}, indent=4)
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict
+
+DEFAULT_CACHE_DIR = os.getenv("CLAUSEAI_CACHE_DIR", ".clauseai_cache")
+
+
+class IngestionCache:
+    """
+    A content-addressed index of ingested documents.
+
+    Maps the SHA-256 of a PDF's bytes to the Qdrant collection it was stored in, its
+    converted markdown and its extracted entities, so identical uploads are not reprocessed.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        """
+        Initialize the cache, creating its directory and index if needed.
+
+        Args:
+            cache_dir (str): Directory holding the index database and the cached markdown files.
+        """
+        self.cache_dir = os.path.join(cache_dir, "ingestion")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.index_path = os.path.join(self.cache_dir, "index.sqlite")
+        with self._connect() as connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS documents (
+                    content_hash TEXT PRIMARY KEY,
+                    document_id TEXT NOT NULL,
+                    entities TEXT,
+                    created_at REAL NOT NULL
+                )"""
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.index_path, timeout=30)
+
+    def _markdown_path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{content_hash}.md")
+
+    @staticmethod
+    def compute_bytes_hash(data) -> str:
+        """
+        Compute the SHA-256 hex digest of in-memory PDF bytes.
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def compute_file_hash(pdf_file: str, block_size: int = 1 << 20) -> str:
+        """
+        Compute the SHA-256 hex digest of a PDF file, reading it in blocks.
+        """
+        digest = hashlib.sha256()
+        with open(pdf_file, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def lookup(self, content_hash: str) -> Optional[Dict]:
+        """
+        Look up a previously ingested document by its content hash.
+
+        Args:
+            content_hash (str): The SHA-256 hex digest of the PDF bytes.
+
+        Returns:
+            Optional[Dict]: The document ID, markdown content and entities, or None if unknown.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT document_id, entities, created_at FROM documents WHERE content_hash = ?",
+                (content_hash,),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            markdown_content = self.read_markdown(content_hash)
+        except FileNotFoundError:
+            self.remove(content_hash)
+            return None
+        return {
+            "content_hash": content_hash,
+            "document_id": row[0],
+            "markdown_content": markdown_content,
+            "entities": row[1],
+            "created_at": row[2],
+        }
+
+    def read_markdown(self, content_hash: str, length: int = -1) -> str:
+        """
+        Read the cached markdown of a document, or only its first `length` characters.
+        """
+        with open(self._markdown_path(content_hash), "r", encoding="utf-8") as f:
+            return f.read(length)
+
+    @contextmanager
+    def open_markdown(self, content_hash: str):
+        """
+        Open the cached markdown of a document for writing, so it can be written as it is converted.
+
+        The file replaces the cached markdown only if the block exits without an error.
+
+        Yields:
+            The text file to write the markdown to.
+        """
+        markdown_path = self._markdown_path(content_hash)
+        tmp_path = f"{markdown_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                yield f
+            os.replace(tmp_path, markdown_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def store(self, content_hash: str, document_id: str, markdown_content: str = None, entities: str = None):
+        """
+        Record an ingested document under its content hash.
+
+        Args:
+            content_hash (str): The SHA-256 hex digest of the PDF bytes.
+            document_id (str): The Qdrant collection the document was stored in.
+            markdown_content (str): The converted markdown of the document, or None if it was
+                already written with `open_markdown`.
+            entities (str): The extracted entities response, if available.
+        """
+        if markdown_content is not None:
+            with self.open_markdown(content_hash) as f:
+                f.write(markdown_content)
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO documents (content_hash, document_id, entities, created_at) VALUES (?, ?, ?, ?)",
+                (content_hash, document_id, entities, time.time()),
+            )
+
+    def update_entities(self, content_hash: str, entities: str):
+        """
+        Attach the extracted entities response to a cached document.
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE documents SET entities = ? WHERE content_hash = ?",
+                (entities, content_hash),
+            )
+
+    def remove(self, content_hash: str):
+        """
+        Forget a cached document.
+        """
+        with self._connect() as connection:
+            connection.execute("DELETE FROM documents WHERE content_hash = ?", (content_hash,))
+        try:
+            os.remove(self._markdown_path(content_hash))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,732 @@
+"""
+A local queue of ingestion jobs, backed by SQLite, and the worker processes that run them.
+
+Each job runs the converter, the vector processor and the entity extraction for one PDF, reporting
+its stage and progress to the queue, which the UI polls. Jobs can be cancelled, and jobs failing with
+a transient error (rate limits, timeouts, connection errors) are retried with exponential backoff.
+
+Run standalone workers with:
+    python -m handler.ingestion_jobs --workers 4
+
+Connection details are read from the same environment variables as workflow.py.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from handler.embedding_cache import EmbeddingCache
+from handler.embedding_engine import get_embedding_engine
+from handler.embedding_scheduler import (
+    DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE, configure_embedding_scheduler,
+)
+from handler.entity_extraction_engine import ChunkedEntityExtractor
+from handler.ingestion_cache import DEFAULT_CACHE_DIR, IngestionCache
+from handler.layout_identifier import PDFToMarkdownConverter, write_markdown_sections
+from handler.llm_invoker import GPT4Assistant
+from handler.qdrant_adapter import QdrantHandler
+from handler.query_retrieval import QdrantQueryHandler
+from handler.vector_generator import QdrantDocumentProcessor
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+STAGE_CONVERT = "convert"
+STAGE_EMBED = "embed"
+STAGE_EXTRACT = "extract"
+STAGES = (STAGE_CONVERT, STAGE_EMBED, STAGE_EXTRACT)
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a worker when the running job was cancelled.
+    """
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Tell whether an error, or any error it was raised from, is worth retrying:
+    rate limits, timeouts, connection errors and 5xx responses of OpenAI or Qdrant.
+    """
+    while error is not None:
+        if isinstance(error, JobCancelled):
+            return False
+        if isinstance(error, (ConnectionError, TimeoutError)):
+            return True
+        try:
+            import openai.error
+            if isinstance(error, (openai.error.RateLimitError, openai.error.Timeout, openai.error.APIConnectionError,
+                                  openai.error.ServiceUnavailableError, openai.error.TryAgain)):
+                return True
+            if isinstance(error, openai.error.APIError) and (error.http_status or 500) >= 500:
+                return True
+        except ImportError:
+            pass
+        try:
+            from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+            if isinstance(error, ResponseHandlingException):
+                return True
+            if isinstance(error, UnexpectedResponse) and (error.status_code == 429 or error.status_code >= 500):
+                return True
+        except ImportError:
+            pass
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _is_cancellation(error: BaseException) -> bool:
+    while error is not None:
+        if isinstance(error, JobCancelled):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class JobQueue:
+    """
+    A durable queue of ingestion jobs shared by the UI and the worker processes.
+
+    Uploaded files are copied into the queue directory, so workers in other processes can read
+    them, and removed once their job is finished.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, retry_delay: float = 5.0):
+        """
+        Initialize the queue, creating its directory and database if needed.
+
+        Args:
+            cache_dir (str): Directory holding the job database and the uploaded files.
+            retry_delay (float): The delay before the first retry, doubled on every further attempt.
+        """
+        self.cache_dir = cache_dir
+        self.jobs_dir = os.path.join(cache_dir, "jobs")
+        self.uploads_dir = os.path.join(self.jobs_dir, "uploads")
+        os.makedirs(self.uploads_dir, exist_ok=True)
+        self.db_path = os.path.join(self.jobs_dir, "jobs.sqlite")
+        self.retry_delay = retry_delay
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    pdf_path TEXT NOT NULL,
+                    file_name TEXT NOT NULL,
+                    uploaded INTEGER NOT NULL,
+                    force_reprocess INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    not_before REAL NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    heartbeat_at REAL,
+                    finished_at REAL
+                )"""
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    @staticmethod
+    def _row_to_job(cursor, row) -> Dict:
+        job = {column[0]: value for column, value in zip(cursor.description, row)}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["force_reprocess"] = bool(job["force_reprocess"])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def _insert(self, job_id: str, pdf_path: str, file_name: str, uploaded: bool, force_reprocess: bool,
+                max_attempts: int):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (job_id, pdf_path, file_name, uploaded, force_reprocess, status, message, "
+                "max_attempts, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, pdf_path, file_name, int(uploaded), int(force_reprocess), JOB_QUEUED, "Waiting for a worker",
+                 max_attempts, time.time()),
+            )
+        return job_id
+
+    def submit(self, pdf_path: str, force_reprocess: bool = False, max_attempts: int = 3) -> str:
+        """
+        Queue a PDF file that stays on disk.
+
+        Args:
+            pdf_path (str): The path of the PDF file, readable by the workers.
+            force_reprocess (bool): Ingest the file again even if its content is in the ingestion cache.
+            max_attempts (int): The number of attempts before a transient failure becomes final.
+
+        Returns:
+            str: The job ID.
+        """
+        job_id = uuid.uuid4().hex
+        return self._insert(job_id, os.path.abspath(pdf_path), os.path.basename(pdf_path), False,
+                            force_reprocess, max_attempts)
+
+    def submit_upload(self, file_name: str, data, force_reprocess: bool = False, max_attempts: int = 3) -> str:
+        """
+        Copy uploaded PDF bytes into the queue directory and queue them.
+
+        Args:
+            file_name (str): The name of the uploaded file, which the document ID is derived from.
+            data: The PDF bytes.
+            force_reprocess (bool): Ingest the file again even if its content is in the ingestion cache.
+            max_attempts (int): The number of attempts before a transient failure becomes final.
+
+        Returns:
+            str: The job ID.
+        """
+        job_id = uuid.uuid4().hex
+        upload_dir = os.path.join(self.uploads_dir, job_id)
+        os.makedirs(upload_dir, exist_ok=True)
+        pdf_path = os.path.join(upload_dir, os.path.basename(file_name))
+        with open(pdf_path, "wb") as f:
+            f.write(data)
+        return self._insert(job_id, pdf_path, os.path.basename(file_name), True, force_reprocess, max_attempts)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Return a job with its status, stage, progress and result, or None if it does not exist.
+        """
+        with self._connect() as connection:
+            cursor = connection.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+            row = cursor.fetchone()
+            return self._row_to_job(cursor, row) if row else None
+
+    def list_jobs(self, limit: int = 50) -> List[Dict]:
+        """
+        Return the most recent jobs, newest first.
+        """
+        with self._connect() as connection:
+            cursor = connection.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+            return [self._row_to_job(cursor, row) for row in cursor.fetchall()]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job. Queued jobs are cancelled at once; running jobs stop at the next page or stage.
+
+        Returns:
+            bool: Whether the job was still active.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            cancelled = connection.execute(
+                "UPDATE jobs SET status = ?, message = ?, finished_at = ? WHERE job_id = ? AND status = ?",
+                (JOB_CANCELLED, "Cancelled", now, job_id, JOB_QUEUED),
+            ).rowcount
+            requested = connection.execute(
+                "UPDATE jobs SET cancel_requested = 1, message = ? WHERE job_id = ? AND status = ?",
+                ("Cancelling...", job_id, JOB_RUNNING),
+            ).rowcount
+        if cancelled:
+            self._remove_upload(job_id)
+        return bool(cancelled or requested)
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """
+        Atomically take the oldest queued job that is due and mark it as running.
+
+        Returns:
+            Optional[Dict]: The job, or None if nothing is queued.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT job_id FROM jobs WHERE status = ? AND not_before <= ? ORDER BY created_at LIMIT 1",
+                    (JOB_QUEUED, now),
+                ).fetchone()
+                if row is not None:
+                    connection.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, started_at = ?, "
+                        "heartbeat_at = ?, error = NULL WHERE job_id = ?",
+                        (JOB_RUNNING, worker, now, now, row[0]),
+                    )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return self.get(row[0]) if row else None
+
+    def heartbeat(self, job_id: str):
+        with self._connect() as connection:
+            connection.execute("UPDATE jobs SET heartbeat_at = ? WHERE job_id = ?", (time.time(), job_id))
+
+    def update_progress(self, job_id: str, stage: str, stage_progress: float, message: str = None):
+        """
+        Record the current stage of a job and its progress within that stage (0 to 1).
+        The overall progress weighs the three stages equally.
+        """
+        progress = (STAGES.index(stage) + min(max(stage_progress, 0.0), 1.0)) / len(STAGES)
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, message = ?, heartbeat_at = ? WHERE job_id = ?",
+                (stage, progress, message, time.time(), job_id),
+            )
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as connection:
+            row = connection.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def _finish(self, job_id: str, status: str, message: str, result: Dict = None, error: str = None):
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, message = ?, result = ?, error = ?, finished_at = ?, "
+                "progress = CASE WHEN ? THEN 1.0 ELSE progress END WHERE job_id = ?",
+                (status, message, json.dumps(result) if result is not None else None, error, time.time(),
+                 status == JOB_DONE, job_id),
+            )
+        self._remove_upload(job_id)
+
+    def complete(self, job_id: str, result: Dict):
+        self._finish(job_id, JOB_DONE, "Done", result=result)
+
+    def mark_cancelled(self, job_id: str):
+        self._finish(job_id, JOB_CANCELLED, "Cancelled")
+
+    def fail(self, job_id: str, error: str, retry: bool = False) -> str:
+        """
+        Record a failed attempt. Transient failures are queued again with exponential backoff
+        until the job runs out of attempts.
+
+        Returns:
+            str: The new status of the job.
+        """
+        job = self.get(job_id)
+        if retry and job["attempts"] < job["max_attempts"] and not job["cancel_requested"]:
+            delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+            with self._connect() as connection:
+                connection.execute(
+                    "UPDATE jobs SET status = ?, message = ?, error = ?, not_before = ?, worker = NULL "
+                    "WHERE job_id = ?",
+                    (JOB_QUEUED, f"Retrying in {delay:.0f}s (attempt {job['attempts']} failed)", error,
+                     time.time() + delay, job_id),
+                )
+            return JOB_QUEUED
+        self._finish(job_id, JOB_FAILED, "Failed", error=error)
+        return JOB_FAILED
+
+    def requeue_stale(self, stale_seconds: float = 120.0) -> int:
+        """
+        Queue again the running jobs whose worker stopped sending heartbeats, e.g. after a crash.
+
+        Returns:
+            int: The number of jobs recovered.
+        """
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "SELECT job_id FROM jobs WHERE status = ? AND heartbeat_at < ?",
+                (JOB_RUNNING, time.time() - stale_seconds),
+            )
+            stale_jobs = [row[0] for row in cursor.fetchall()]
+        for job_id in stale_jobs:
+            self.fail(job_id, "The worker running this job stopped responding.", retry=True)
+        return len(stale_jobs)
+
+    def _remove_upload(self, job_id: str):
+        shutil.rmtree(os.path.join(self.uploads_dir, job_id), ignore_errors=True)
+
+
+class IngestionJobWorker:
+    """
+    Runs queued jobs one at a time: convert the PDF, embed and store its pages, then extract its entities.
+
+    Documents already in the ingestion cache skip conversion and embedding. A document that was
+    partially stored when its job was cancelled or failed is deleted again.
+    """
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        openai_api_key: str,
+        qdrant_url: str = None,
+        qdrant_api_key: str = None,
+        storage_mode: str = "per_document",
+        collection_profile: str = "default",
+        embedding_backend: str = "openai",
+        embedding_model: str = None,
+        embedding_rate_limits: Dict = None,
+        heartbeat_interval: float = 10.0,
+        worker_name: str = None,
+    ):
+        """
+        Args:
+            job_queue (JobQueue): The queue to take jobs from.
+            openai_api_key (str): The OpenAI API key.
+            qdrant_url (str): The Qdrant URL.
+            qdrant_api_key (str): The Qdrant API key.
+            storage_mode (str): "per_document" or "shared".
+            collection_profile (str): The storage profile of new collections.
+            embedding_backend (str): "openai" or "local".
+            embedding_model (str): The embedding model (defaults per backend).
+            embedding_rate_limits (Dict): The OpenAI embedding limits of this process, the keyword
+                arguments of `configure_embedding_scheduler`.
+            heartbeat_interval (float): Seconds between heartbeats of a running job.
+            worker_name (str): The name recorded on claimed jobs (defaults to host and process ID).
+        """
+        self.job_queue = job_queue
+        self.openai_api_key = openai_api_key
+        self.qdrant_handler = QdrantHandler(
+            url=qdrant_url, api_key=qdrant_api_key, storage_mode=storage_mode, collection_profile=collection_profile
+        )
+        self.ingestion_cache = IngestionCache(job_queue.cache_dir)
+        self.embedding_cache = EmbeddingCache(job_queue.cache_dir)
+        if embedding_rate_limits:
+            configure_embedding_scheduler(**embedding_rate_limits)
+        self.embedding_engine = get_embedding_engine(
+            embedding_backend, model_name=embedding_model, openai_api_key=openai_api_key
+        )
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_name = worker_name or f"{socket.gethostname()}:{os.getpid()}"
+
+    def _check_cancelled(self, job_id: str):
+        if self.job_queue.is_cancel_requested(job_id):
+            raise JobCancelled(f"Job {job_id} was cancelled.")
+
+    def _track_pages(self, job_id: str, pages, page_total: int):
+        """
+        Pass the pages streamed by the converter through to the processor, reporting the conversion
+        progress and stopping on cancellation after each page.
+
+        The processor pulls pages batch by batch as it embeds them, so once the converter is done
+        only the last batches are left to embed.
+        """
+        done = 0
+        for page in pages:
+            self._check_cancelled(job_id)
+            if page["page"] is not None:
+                done += 1
+                self.job_queue.update_progress(
+                    job_id, STAGE_CONVERT, done / max(page_total, 1), f"Converted page {done} of {page_total}"
+                )
+            yield page
+        self._check_cancelled(job_id)
+        self.job_queue.update_progress(job_id, STAGE_EMBED, 0.0, "Embedding the last pages")
+
+    def _heartbeat(self, job_id: str, stopped: threading.Event):
+        while not stopped.wait(self.heartbeat_interval):
+            try:
+                self.job_queue.heartbeat(job_id)
+            except Exception as e:
+                print(f"Error sending heartbeat of job {job_id}: {e}")
+
+    def run_job(self, job: Dict) -> Dict:
+        """
+        Run the pipeline of one claimed job.
+
+        Returns:
+            Dict: The document ID, a Markdown preview, the entities and whether a cached document was reused.
+        """
+        job_id = job["job_id"]
+        content_hash = IngestionCache.compute_file_hash(job["pdf_path"])
+        cached_document = None if job["force_reprocess"] else self.ingestion_cache.lookup(content_hash)
+        if cached_document and not self.qdrant_handler.collection_exists(cached_document["document_id"]):
+            cached_document = None
+
+        if cached_document:
+            document_id = cached_document["document_id"]
+            markdown_content = cached_document["markdown_content"]
+            entities = cached_document["entities"]
+        else:
+            converter = PDFToMarkdownConverter(job["pdf_path"])
+            document_id = converter.generate_document_id()
+            page_total = len(converter.reader.pages)
+            self.job_queue.update_progress(
+                job_id, STAGE_CONVERT, 0.0, f"Converting and embedding {page_total} pages"
+            )
+            processor = QdrantDocumentProcessor(
+                self.openai_api_key, self.qdrant_handler, None, document_id,
+                embedding_cache=self.embedding_cache,
+                embedding_engine=self.embedding_engine,
+            )
+            try:
+                # Pages are embedded as the converter yields them and written to the cached markdown on the way.
+                with self.ingestion_cache.open_markdown(content_hash) as markdown_file:
+                    sections = write_markdown_sections(converter.iter_markdown_sections(), markdown_file)
+                    processor.process_pages(self._track_pages(job_id, sections, page_total))
+                    self._check_cancelled(job_id)
+            except BaseException:
+                self.qdrant_handler.delete_document(document_id)
+                raise
+            self.ingestion_cache.store(content_hash, document_id)
+            markdown_content = self.ingestion_cache.read_markdown(content_hash, 500)
+            entities = None
+
+        if not entities:
+            self.job_queue.update_progress(job_id, STAGE_EXTRACT, 0.0, "Extracting entities")
+            query_client = QdrantQueryHandler(
+                document_id=document_id,
+                openai_api_key=self.openai_api_key,
+                qdrant_client=self.qdrant_handler,
+                embedding_cache=self.embedding_cache,
+            )
+            extractor = ChunkedEntityExtractor(GPT4Assistant(self.openai_api_key), query_handler=query_client)
+            entities = extractor.extract(mode="retrieval")
+            if not extractor.errors:
+                self.ingestion_cache.update_entities(content_hash, entities)
+
+        return {
+            "document_id": document_id,
+            "markdown_preview": markdown_content[:500],
+            "entities": entities,
+            "reused": cached_document is not None,
+        }
+
+    def process_next(self) -> bool:
+        """
+        Claim and run the next queued job, recording its outcome.
+
+        Returns:
+            bool: Whether a job was run.
+        """
+        job = self.job_queue.claim(self.worker_name)
+        if job is None:
+            return False
+        job_id = job["job_id"]
+        print(f"Worker {self.worker_name} started job {job_id} ({job['file_name']}, attempt {job['attempts']})")
+        stopped = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job_id, stopped), daemon=True).start()
+        try:
+            self._check_cancelled(job_id)
+            result = self.run_job(job)
+            self.job_queue.complete(job_id, result)
+            print(f"Worker {self.worker_name} finished job {job_id}: {result['document_id']}")
+        except Exception as e:
+            if _is_cancellation(e):
+                self.job_queue.mark_cancelled(job_id)
+                print(f"Worker {self.worker_name} cancelled job {job_id}")
+            else:
+                status = self.job_queue.fail(job_id, str(e), retry=is_transient_error(e))
+                print(f"Error in job {job_id} ({status}): {e}")
+        finally:
+            stopped.set()
+        return True
+
+    def run(self, stop_event=None, poll_interval: float = 1.0):
+        """
+        Run jobs until `stop_event` is set, polling the queue when it is empty.
+        """
+        while stop_event is None or not stop_event.is_set():
+            if not self.process_next():
+                if stop_event is not None:
+                    stop_event.wait(poll_interval)
+                else:
+                    time.sleep(poll_interval)
+
+
+def run_worker(cache_dir: str, worker_settings: Dict, stop_event=None, poll_interval: float = 1.0):
+    """
+    The entry point of a worker process.
+
+    Args:
+        cache_dir (str): The cache directory holding the job queue.
+        worker_settings (Dict): The keyword arguments of IngestionJobWorker, e.g. the API keys.
+        stop_event: A multiprocessing event that stops the worker after its current job.
+        poll_interval (float): Seconds between polls of an empty queue.
+    """
+    worker = IngestionJobWorker(JobQueue(cache_dir), **worker_settings)
+    worker.run(stop_event=stop_event, poll_interval=poll_interval)
+
+
+def split_embedding_rate_limits(rate_limits: Dict, workers: int, reserved_share: float = 0.0):
+    """
+    Split the per-minute embedding limits of an API key between the ingestion workers and the
+    process starting them, e.g. the UI, which embeds the queries. Unset limits are the scheduler
+    defaults, so together the processes stay within them.
+
+    Args:
+        rate_limits (Dict): The keyword arguments of `configure_embedding_scheduler` for the whole key.
+        workers (int): The number of worker processes.
+        reserved_share (float): The share of the limits kept for the starting process. Without
+            a share, the starting process keeps the limits of the whole key.
+
+    Returns:
+        tuple: The limits of each worker and the limits of the starting process.
+    """
+    worker_limits, reserved_limits = dict(rate_limits or {}), dict(rate_limits or {})
+    for name, default in (("tokens_per_minute", DEFAULT_TOKENS_PER_MINUTE),
+                          ("requests_per_minute", DEFAULT_REQUESTS_PER_MINUTE)):
+        total = worker_limits.get(name) or default
+        reserved = int(total * reserved_share)
+        reserved_limits[name] = max(1, reserved) if reserved_share else total
+        worker_limits[name] = max(1, (total - reserved) // max(1, workers))
+    return worker_limits, reserved_limits
+
+
+class JobWorkerPool:
+    """
+    Starts and stops a configurable number of worker processes for a job queue.
+
+    Workers are spawned rather than forked, so they do not inherit the threads of a web server,
+    and they are not daemonic, so the converter can still start its own process pool. A supervisor
+    thread restarts workers that exit, e.g. after a crash, and queues again the jobs whose worker
+    stopped sending heartbeats.
+    """
+
+    def __init__(self, cache_dir: str, worker_settings: Dict, workers: int = 2, stale_seconds: float = 120.0,
+                 supervise_interval: float = 5.0, reserved_share: float = 0.0):
+        """
+        Args:
+            cache_dir (str): The cache directory holding the job queue.
+            worker_settings (Dict): The keyword arguments of IngestionJobWorker, e.g. the API keys. The
+                per-minute limits of `embedding_rate_limits`, or the scheduler defaults, are split evenly
+                between the workers, see `split_embedding_rate_limits`.
+            workers (int): The number of worker processes.
+            stale_seconds (float): Running jobs without a heartbeat for this long are queued again.
+            supervise_interval (float): Seconds between checks of the workers and their jobs.
+            reserved_share (float): The share of the embedding limits left to the process starting the pool.
+        """
+        self.cache_dir = cache_dir
+        self.worker_settings = worker_settings
+        self.workers = workers
+        self.stale_seconds = stale_seconds
+        self.supervise_interval = supervise_interval
+        self.reserved_share = reserved_share
+        self.job_queue = JobQueue(cache_dir)
+        self._context = multiprocessing.get_context("spawn")
+        # Every worker gets its own stop event: a worker killed while waiting on an event can leave
+        # its lock held, which would block setting an event shared with the other workers.
+        self._stop_events = []
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._supervisor = None
+        self._worker_settings = None
+        self.processes = []
+
+    def _spawn(self, index: int):
+        stop_event = self._context.Event()
+        process = self._context.Process(target=run_worker, args=(self.cache_dir, self._worker_settings, stop_event))
+        process.start()
+        self.processes[index] = process
+        self._stop_events[index] = stop_event
+
+    def start(self):
+        recovered = self.job_queue.requeue_stale(self.stale_seconds)
+        if recovered:
+            print(f"Re-queued {recovered} jobs of stopped workers.")
+        worker_settings = dict(self.worker_settings)
+        worker_settings["embedding_rate_limits"], _ = split_embedding_rate_limits(
+            worker_settings.get("embedding_rate_limits"), self.workers, self.reserved_share
+        )
+        self._worker_settings = worker_settings
+        with self._lock:
+            self.processes = [None] * self.workers
+            self._stop_events = [None] * self.workers
+            for index in range(self.workers):
+                self._spawn(index)
+        self._supervisor = threading.Thread(target=self._supervise, daemon=True)
+        self._supervisor.start()
+        return self
+
+    def check_workers(self) -> int:
+        """
+        Restart the worker processes that exited and queue again the jobs without a recent heartbeat.
+
+        Returns:
+            int: The number of workers restarted.
+        """
+        restarted = 0
+        with self._lock:
+            for index, process in enumerate(self.processes):
+                if self._stopped.is_set():
+                    break
+                if not process.is_alive():
+                    process.join()
+                    print(f"Ingestion worker {process.pid} exited with code {process.exitcode}, restarting it.")
+                    self._spawn(index)
+                    restarted += 1
+        recovered = self.job_queue.requeue_stale(self.stale_seconds)
+        if recovered:
+            print(f"Re-queued {recovered} jobs of stopped workers.")
+        return restarted
+
+    def _supervise(self):
+        while not self._stopped.wait(self.supervise_interval):
+            try:
+                self.check_workers()
+            except Exception as e:
+                print(f"Error supervising the ingestion workers: {e}")
+
+    def join(self):
+        """
+        Block until the pool is stopped.
+        """
+        if self._supervisor is not None:
+            self._supervisor.join()
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Ask the workers to stop after their current job, terminating those still busy after `timeout`.
+        """
+        self._stopped.set()
+        deadline = time.time() + timeout
+        with self._lock:
+            for process, stop_event in zip(self.processes, self._stop_events):
+                if process.is_alive():
+                    stop_event.set()
+            for process in self.processes:
+                process.join(max(0.0, deadline - time.time()))
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            self.processes = []
+            self._stop_events = []
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Run ingestion job workers.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("INGESTION_WORKERS", "2")))
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    worker_settings = {
+        "openai_api_key": os.getenv("OPENAI_API_KEY"),
+        "qdrant_url": os.getenv("QDRANT_URL"),
+        "qdrant_api_key": os.getenv("QDRANT_API_KEY"),
+        "storage_mode": os.getenv("QDRANT_STORAGE_MODE", "per_document"),
+        "collection_profile": os.getenv("QDRANT_COLLECTION_PROFILE", "default"),
+        "embedding_backend": os.getenv("EMBEDDING_BACKEND", "openai"),
+        "embedding_model": os.getenv("EMBEDDING_MODEL") or None,
+        "embedding_rate_limits": {
+            "tokens_per_minute": int(os.getenv("OPENAI_EMBEDDING_TPM", "0")) or None,
+            "requests_per_minute": int(os.getenv("OPENAI_EMBEDDING_RPM", "0")) or None,
+            "max_in_flight": int(os.getenv("OPENAI_EMBEDDING_CONCURRENCY", "0")) or None,
+        },
+    }
+    # The app, started with INGESTION_WORKERS=0, keeps the same share of the embedding limits for its queries.
+    pool = JobWorkerPool(
+        args.cache_dir, worker_settings, workers=args.workers,
+        reserved_share=float(os.getenv("OPENAI_EMBEDDING_UI_SHARE", "0.1")),
+    ).start()
+    print(f"Started {args.workers} ingestion workers. Press Ctrl+C to stop.")
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import contextvars
+import json
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+_current_span = contextvars.ContextVar("clauseai_current_span", default=None)
+
+
+class Span:
+    """
+    A timed stage of the document or query pipeline.
+
+    Spans nest: a span started while another one is active becomes its child and shares its
+    trace ID. Attributes hold the stage's counts, e.g. chunks, vectors or bytes uploaded.
+    """
+
+    def __init__(self, name: str, parent=None, attributes: dict = None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.error = None
+        self.start_time = time.time()
+        self.end_time = None
+        self.duration = None
+        self._start = time.perf_counter()
+        self.sink_state = {}
+
+    def set(self, **attributes):
+        """
+        Set attributes of the span.
+        """
+        self.attributes.update(attributes)
+
+    def add(self, name: str, value=1):
+        """
+        Increment a numeric attribute of the span.
+        """
+        self.attributes[name] = self.attributes.get(name, 0) + value
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+        self.end_time = self.start_time + self.duration
+
+    def to_dict(self) -> dict:
+        return {
+            "type": "span",
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "start_time": self.start_time,
+            "duration_seconds": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class JSONLogSink:
+    """
+    Writes every finished span and metric as one JSON line. Needs no extra packages.
+    """
+
+    def __init__(self, path: str = None, stream=None):
+        """
+        Args:
+            path (str): The file to append JSON lines to.
+            stream: The stream to write to when no path is given (defaults to stderr).
+        """
+        self.path = path
+        self.stream = stream or sys.stderr
+        self._lock = threading.Lock()
+
+    def _write(self, record: dict):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(line + "\n")
+            else:
+                self.stream.write(line + "\n")
+                self.stream.flush()
+
+    def on_span_start(self, span: Span):
+        pass
+
+    def on_span_end(self, span: Span):
+        self._write(span.to_dict())
+
+    def on_metric(self, name: str, value, labels: dict, span: Span = None):
+        self._write({
+            "type": "metric",
+            "name": name,
+            "value": value,
+            "labels": labels,
+            "span_id": span.span_id if span else None,
+            "time": time.time(),
+        })
+
+
+class PrometheusSink:
+    """
+    Exports stage durations as a histogram and counts as counters through `prometheus_client`.
+
+    Needs the optional `prometheus-client` package. Metrics are served by
+    `prometheus_client.start_http_server` (see `port`) or `generate_latest`.
+    """
+
+    def __init__(self, namespace: str = "clauseai", port: int = None, registry=None):
+        """
+        Args:
+            namespace (str): The prefix of all metric names.
+            port (int): Serve the metrics over HTTP on this port.
+            registry: The Prometheus registry (defaults to the global one).
+        """
+        try:
+            import prometheus_client
+        except ImportError as e:
+            raise ImportError(
+                "The Prometheus sink requires 'prometheus-client'. Install it with: pip install prometheus-client"
+            ) from e
+        self.prometheus_client = prometheus_client
+        self.namespace = namespace
+        self.registry = registry or prometheus_client.REGISTRY
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.stage_duration = prometheus_client.Histogram(
+            f"{namespace}_stage_duration_seconds",
+            "Duration of pipeline stages.",
+            ["stage", "status"],
+            buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+            registry=self.registry,
+        )
+        if port:
+            prometheus_client.start_http_server(port, registry=self.registry)
+
+    def _counter(self, name: str, label_names: tuple):
+        with self._lock:
+            if name not in self._counters:
+                self._counters[name] = self.prometheus_client.Counter(
+                    f"{self.namespace}_{name}", f"Total {name.replace('_', ' ')}.", list(label_names),
+                    registry=self.registry,
+                )
+            return self._counters[name]
+
+    def on_span_start(self, span: Span):
+        pass
+
+    def on_span_end(self, span: Span):
+        self.stage_duration.labels(stage=span.name, status=span.status).observe(span.duration)
+
+    def on_metric(self, name: str, value, labels: dict, span: Span = None):
+        counter = self._counter(name, tuple(sorted(labels)))
+        if labels:
+            counter = counter.labels(**labels)
+        counter.inc(value)
+
+
+class OpenTelemetrySink:
+    """
+    Mirrors spans to OpenTelemetry, keeping their nesting, and records metrics as span events.
+
+    Needs the optional `opentelemetry-api` package; exporters are configured on the tracer provider.
+    """
+
+    def __init__(self, tracer_provider=None, instrumentation_name: str = "clauseai"):
+        """
+        Args:
+            tracer_provider: The OpenTelemetry tracer provider (defaults to the global one).
+            instrumentation_name (str): The name of the OpenTelemetry tracer.
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "The OpenTelemetry sink requires 'opentelemetry-api'. Install it with: pip install opentelemetry-sdk"
+            ) from e
+        self.trace = trace
+        self.tracer = trace.get_tracer(instrumentation_name, tracer_provider=tracer_provider)
+
+    def on_span_start(self, span: Span):
+        parent = span.parent.sink_state.get(id(self)) if span.parent else None
+        context = self.trace.set_span_in_context(parent) if parent is not None else None
+        span.sink_state[id(self)] = self.tracer.start_span(
+            span.name, context=context, start_time=int(span.start_time * 1e9)
+        )
+
+    def on_span_end(self, span: Span):
+        otel_span = span.sink_state.pop(id(self), None)
+        if otel_span is None:
+            return
+        otel_span.set_attributes(
+            {key: value for key, value in span.attributes.items() if isinstance(value, (str, bool, int, float))}
+        )
+        if span.status == "error":
+            otel_span.set_status(self.trace.Status(self.trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int(span.end_time * 1e9))
+
+    def on_metric(self, name: str, value, labels: dict, span: Span = None):
+        otel_span = span.sink_state.get(id(self)) if span else None
+        if otel_span is not None:
+            otel_span.add_event(name, {"value": value, **labels})
+
+
+class Instrumentation:
+    """
+    Records timing spans and counters of the pipelines and forwards them to the configured sinks.
+
+    Per-stage totals are also aggregated in memory, see `snapshot`. Sink errors are printed and
+    never interrupt the pipeline.
+    """
+
+    def __init__(self, sinks: list = None):
+        self.sinks = list(sinks or [])
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+
+    def configure(self, sinks: list):
+        """
+        Replace the sinks spans and metrics are forwarded to.
+        """
+        self.sinks = list(sinks)
+
+    def current_span(self):
+        """
+        Return the active span of the current thread or task, or None.
+        """
+        return _current_span.get()
+
+    def _emit(self, method: str, *args):
+        for sink in self.sinks:
+            try:
+                getattr(sink, method)(*args)
+            except Exception as e:
+                print(f"Error in metrics sink {type(sink).__name__}: {e}")
+
+    def start_span(self, name: str, parent: Span = None, **attributes) -> Span:
+        """
+        Start a span without making it the active one, for stages that run across generator yields.
+
+        Args:
+            name (str): The stage name, e.g. "llm.stream".
+            parent (Span): The parent span (defaults to the active span).
+            attributes: Initial attributes of the span.
+
+        Returns:
+            Span: The started span, to be passed to `end_span`.
+        """
+        span = Span(name, parent=parent or _current_span.get(), attributes=attributes)
+        self._emit("on_span_start", span)
+        return span
+
+    def end_span(self, span: Span):
+        """
+        Finish a span, aggregate its duration and forward it to the sinks.
+        """
+        span.finish()
+        with self._lock:
+            stage = self._stages.setdefault(span.name, {"count": 0, "errors": 0, "total_seconds": 0.0})
+            stage["count"] += 1
+            stage["errors"] += span.status == "error"
+            stage["total_seconds"] += span.duration
+        self._emit("on_span_end", span)
+
+    @contextmanager
+    def span(self, name: str, parent: Span = None, **attributes):
+        """
+        Time a pipeline stage. The span is the active one while the block runs.
+
+        Args:
+            name (str): The stage name, e.g. "pdf.convert" or "qdrant.upsert".
+            parent (Span): The parent span, for work handed to another thread (defaults to the active span).
+            attributes: Initial attributes of the span.
+
+        Yields:
+            Span: The span, whose attributes can be set while the stage runs.
+        """
+        span = self.start_span(name, parent=parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.error = str(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def add(self, name: str, value=1, span: Span = None, **labels):
+        """
+        Increment a counter, e.g. "vectors_uploaded" or "llm_prompt_tokens", and the matching attribute
+        of `span` (defaults to the active span).
+        """
+        if not value:
+            return
+        span = span or _current_span.get()
+        if span is not None:
+            span.add(name, value)
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        self._emit("on_metric", name, value, labels, span)
+
+    def snapshot(self) -> dict:
+        """
+        Return the per-stage counts and durations and the counter totals recorded in this process.
+        """
+        with self._lock:
+            return {
+                "stages": {name: dict(stage) for name, stage in self._stages.items()},
+                "counters": dict(self._counters),
+            }
+
+    def reset(self):
+        """
+        Clear the in-memory aggregates.
+        """
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+
+instrumentation = Instrumentation()
+
+_prometheus_sink = None
+
+
+def configure_instrumentation(sink_names, json_log_path: str = None, prometheus_port: int = None) -> Instrumentation:
+    """
+    Configure the process-wide instrumentation from a list of sink names.
+
+    Safe to call repeatedly: Prometheus metrics are registered and served only once per process.
+
+    Args:
+        sink_names: Names among "json", "prometheus" and "otel". Empty names are ignored.
+        json_log_path (str): The file of the JSON sink (defaults to stderr).
+        prometheus_port (int): Serve Prometheus metrics over HTTP on this port.
+
+    Returns:
+        Instrumentation: The configured instrumentation.
+    """
+    global _prometheus_sink
+    sinks = []
+    for name in (name.strip().lower() for name in sink_names):
+        if not name:
+            continue
+        if name == "json":
+            sinks.append(JSONLogSink(path=json_log_path))
+        elif name == "prometheus":
+            if _prometheus_sink is None:
+                _prometheus_sink = PrometheusSink(port=prometheus_port)
+            sinks.append(_prometheus_sink)
+        elif name in ("otel", "opentelemetry"):
+            sinks.append(OpenTelemetrySink())
+        else:
+            raise ValueError("Invalid metrics sink. Supported sinks: 'json', 'prometheus', 'otel'.")
+    instrumentation.configure(sinks)
+    return instrumentation
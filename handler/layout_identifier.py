@@ -1,19 +1,182 @@
-from pypdf import PdfReader
-import ocrmypdf
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
 import os
+import re
+import tempfile
 import warnings
 from datetime import datetime
+from handler.instrumentation import instrumentation
 
 warnings.filterwarnings("ignore")
 
+
+def _collect_image_names(resources, names=None, call_stack=None):
+    """
+    Collect the names of all image XObjects reachable from a resources dictionary.
+
+    Only the XObject dictionaries are inspected, the image streams are never decoded.
+    """
+    if names is None:
+        names = set()
+    if call_stack is None:
+        call_stack = []
+    if not resources or "/XObject" not in resources:
+        return names
+    x_objects = resources["/XObject"].get_object()
+    for name in x_objects:
+        x_object = x_objects[name].get_object()
+        subtype = x_object.get("/Subtype")
+        if subtype == "/Image":
+            names.add(name)
+        elif subtype == "/Form" and id(x_object) not in call_stack:
+            call_stack.append(id(x_object))
+            form_resources = x_object.get("/Resources")
+            _collect_image_names(form_resources.get_object() if form_resources else None, names, call_stack)
+    return names
+
+
+def _scan_page(page, page_number: int) -> dict:
+    """
+    Extract the text of a single page and detect its images in the same pass.
+
+    The area each image is drawn at is taken from the transformation matrix in effect
+    when it is painted, which gives the fraction of the page covered by images.
+
+    Args:
+        page: The pypdf page object.
+        page_number (int): The 1-based number of the page.
+
+    Returns:
+        dict: The page number, its text, the number of images drawn on it and their page coverage.
+    """
+    resources = page.get("/Resources")
+    image_names = _collect_image_names(resources.get_object() if resources else None)
+    stats = {"images": 0, "image_area": 0.0}
+
+    def visit_operator(operator, operands, cm_matrix, tm_matrix):
+        if (operator == b"Do" and operands and operands[0] in image_names) or operator == b"INLINE IMAGE":
+            stats["images"] += 1
+            stats["image_area"] += abs(cm_matrix[0] * cm_matrix[3] - cm_matrix[1] * cm_matrix[2])
+
+    text = page.extract_text(visitor_operand_before=visit_operator)
+    page_area = abs(float(page.mediabox.width) * float(page.mediabox.height)) or 1.0
+    return {
+        "page": page_number,
+        "text": text,
+        "images": stats["images"],
+        "image_coverage": min(1.0, stats["image_area"] / page_area),
+    }
+
+
+_PAGE_HEADER = re.compile(r"^### Page (\d+)\n\n", re.MULTILINE)
+
+
+def iter_markdown_pages(markdown_content: str):
+    """
+    Split the Markdown produced by `PDFToMarkdownConverter.convert` back into its pages, lazily.
+
+    The metadata section is yielded last with no page number. Markdown without page headers
+    is yielded as a single section with no page number.
+
+    Args:
+        markdown_content (str): The converted Markdown.
+
+    Yields:
+        dict: The page number and the page text.
+    """
+    metadata_start = markdown_content.rfind("\n# Metadata\n")
+    body_end = metadata_start if metadata_start != -1 else len(markdown_content)
+    previous = None
+    for match in _PAGE_HEADER.finditer(markdown_content, 0, body_end):
+        if previous is not None:
+            yield {"page": int(previous.group(1)), "text": markdown_content[previous.end():match.start()]}
+        previous = match
+    if previous is not None:
+        yield {"page": int(previous.group(1)), "text": markdown_content[previous.end():body_end]}
+    elif markdown_content[:body_end].strip():
+        yield {"page": None, "text": markdown_content[:body_end]}
+    if metadata_start != -1:
+        yield {"page": None, "text": markdown_content[metadata_start + 1:]}
+
+
+def write_markdown_sections(sections, markdown_file):
+    """
+    Write streamed sections to a file in the Markdown layout of `PDFToMarkdownConverter.convert`,
+    passing each section on once it is written, so the document is never held in memory.
+
+    Args:
+        sections: An iterable of dicts with the page number and text, e.g.
+            `PDFToMarkdownConverter.iter_markdown_sections()`. The section with no page number is the metadata.
+        markdown_file: A text file opened for writing.
+
+    Yields:
+        dict: The sections, unchanged.
+    """
+    markdown_file.write("# Extracted Text\n\n")
+    for section in sections:
+        if section["page"] is None:
+            markdown_file.write(section["text"])
+        else:
+            markdown_file.write(f"### Page {section['page']}\n\n{section['text']}\n\n")
+        yield section
+
+
+_worker_reader = None
+
+
+def _init_page_worker(pdf_file: str):
+    """
+    Open the PDF file once per worker process, so tasks do not re-parse the cross-reference table.
+    """
+    global _worker_reader
+    from pypdf import PdfReader
+
+    _worker_reader = PdfReader(pdf_file)
+
+
+def _scan_page_range(start: int, stop: int) -> list:
+    """
+    Scan the pages [start, stop) of the worker's PDF file. Runs inside a worker process.
+    """
+    return [_scan_page(_worker_reader.pages[idx], idx + 1) for idx in range(start, stop)]
+
+
 class PDFToMarkdownConverter:
-    def __init__(self, pdf_file):
+    def __init__(
+        self,
+        pdf_file,
+        parallel: bool = False,
+        max_workers: int = None,
+        pages_per_task: int = 16,
+        ocr_jobs: int = None,
+        ocr_min_text_chars: int = 200,
+        ocr_min_image_coverage: float = 0.3,
+    ):
         """
-        Initialize the converter with a PDF file and MongoDB connection details.
+        Initialize the converter with a PDF file.
+
+        Args:
+            pdf_file (str): Path to the PDF file.
+            parallel (bool): Extract pages across a process pool instead of a single core.
+            max_workers (int): Number of worker processes (defaults to the CPU count).
+            pages_per_task (int): Number of pages each worker extracts per task.
+            ocr_jobs (int): Number of parallel OCR jobs (defaults to the CPU count).
+            ocr_min_text_chars (int): Pages with less text than this are OCR candidates.
+            ocr_min_image_coverage (float): Fraction of the page images must cover for a candidate to be OCR'd.
         """
+        from pypdf import PdfReader
+
         self.pdf_file = pdf_file
         self.reader = PdfReader(pdf_file)
         self.metadata = self._extract_metadata()
+        self.parallel = parallel
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = max(1, pages_per_task)
+        self.ocr_jobs = ocr_jobs or os.cpu_count() or 1
+        self.ocr_min_text_chars = ocr_min_text_chars
+        self.ocr_min_image_coverage = ocr_min_image_coverage
+        self.ocr_pages = []
+        self.pages = None
         self.full_text = ""
         self.image_count = 0
 
@@ -29,48 +192,197 @@ class PDFToMarkdownConverter:
             "Title": self.reader.metadata.title,
         }
 
+    def iter_pages(self):
+        """
+        Stream the pages of the PDF file in order, extracting text and detecting images in one pass.
+
+        In parallel mode the pages are split into ranges that are scanned by a process pool.
+        At most two ranges per worker are in flight, so results are yielded as soon as the
+        next page in order is ready.
+
+        Yields:
+            dict: The page number, its text, the number of images drawn on it and their page coverage.
+        """
+        page_total = len(self.reader.pages)
+        if not self.parallel or self.max_workers < 2 or page_total <= self.pages_per_task:
+            for idx, page in enumerate(self.reader.pages):
+                yield _scan_page(page, idx + 1)
+            return
+
+        ranges = deque(
+            (start, min(start + self.pages_per_task, page_total))
+            for start in range(0, page_total, self.pages_per_task)
+        )
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers, initializer=_init_page_worker, initargs=(self.pdf_file,)
+        ) as executor:
+            in_flight = deque()
+            while ranges or in_flight:
+                while ranges and len(in_flight) < self.max_workers * 2:
+                    start, stop = ranges.popleft()
+                    in_flight.append(executor.submit(_scan_page_range, start, stop))
+                for page in in_flight.popleft().result():
+                    yield page
+
+    def _scan_pages(self):
+        """
+        Scan every page once and cache the result.
+        """
+        if self.pages is None:
+            self.pages = list(self.iter_pages())
+        return self.pages
+
     def _extract_text_from_pdf(self):
         """
         Extract text from the PDF file.
         """
-        full_text = ""
-        for idx, page in enumerate(self.reader.pages):
-            text = page.extract_text()
-            if len(text) > 0:
-                full_text += f"### Page {idx + 1}\n\n{text}\n\n"
-        return full_text.strip()
+        return "".join(
+            f"### Page {page['page']}\n\n{page['text']}\n\n"
+            for page in self._scan_pages()
+            if len(page["text"]) > 0
+        ).strip()
 
     def _count_images(self):
         """
         Count the number of images in the PDF file.
         """
-        image_count = 0
-        for page in self.reader.pages:
-            image_count += len(page.images)
-        return image_count
+        return sum(page["images"] for page in self._scan_pages())
 
-    def _perform_ocr(self):
+    def _page_needs_ocr(self, page: dict) -> bool:
         """
-        Perform OCR on the PDF file if necessary and reload the reader.
+        Decide whether a page is a scan, based on its text density and image coverage.
         """
-        out_pdf_file = self.pdf_file.replace(".pdf", "_ocr.pdf")
-        ocrmypdf.ocr(self.pdf_file, out_pdf_file, force_ocr=True)
-        self.reader = PdfReader(out_pdf_file)
-        self.full_text = self._extract_text_from_pdf()
+        if page["images"] == 0:
+            return False
+        text_chars = len(page["text"].strip())
+        if text_chars == 0:
+            return True
+        return text_chars < self.ocr_min_text_chars and page["image_coverage"] >= self.ocr_min_image_coverage
 
-    def convert(self):
+    def _iter_ocr_pages(self, page_numbers: list):
         """
-        Convert the PDF file to Markdown, extracting text and metadata, and store it in MongoDB.
+        Perform OCR on the given pages only and yield their text.
+
+        Args:
+            page_numbers (list): The 1-based numbers of the pages to OCR.
+
+        Yields:
+            dict: The page number and its OCR'd text.
         """
+        import ocrmypdf
+        from pypdf import PdfReader
+
+        # The OCR'd copy goes to a temporary directory, never next to the source file, and is
+        # removed once its pages are read.
+        with tempfile.TemporaryDirectory(prefix="clauseai_ocr_") as ocr_dir:
+            out_pdf_file = os.path.join(ocr_dir, "ocr.pdf")
+            with instrumentation.span("pdf.ocr", pages=len(page_numbers), jobs=self.ocr_jobs):
+                ocrmypdf.ocr(
+                    self.pdf_file,
+                    out_pdf_file,
+                    pages=",".join(str(number) for number in page_numbers),
+                    force_ocr=True,
+                    jobs=self.ocr_jobs,
+                    progress_bar=False,
+                )
+            ocr_reader = PdfReader(out_pdf_file)
+            self.ocr_pages = list(page_numbers)
+            for number in page_numbers:
+                yield {"page": number, "text": _scan_page(ocr_reader.pages[number - 1], number)["text"]}
+
+    def _perform_ocr(self, page_numbers: list):
+        """
+        Perform OCR on the given pages only and merge their text back into the scanned pages.
+
+        Args:
+            page_numbers (list): The 1-based numbers of the pages to OCR.
+        """
+        pages = self._scan_pages()
+        for ocr_page in self._iter_ocr_pages(page_numbers):
+            pages[ocr_page["page"] - 1]["text"] = ocr_page["text"]
         self.full_text = self._extract_text_from_pdf()
-        self.image_count = self._count_images()
-        if self.image_count > 0 and len(self.full_text) < 1000:
-            self._perform_ocr()
-        markdown_content = "# Extracted Text\n\n" + self.full_text + "\n\n"
-        markdown_content += "# Metadata\n\n"
-        for key, value in self.metadata.items():
-            markdown_content += f"- **{key}**: {value if value else 'N/A'}\n"
+
+    def iter_document_pages(self):
+        """
+        Stream the final text of every page in page order, without holding the document in memory.
+
+        Pages that need OCR are OCR'd together in one run once
+        all pages are scanned, so the pages from the first one needing OCR onwards are held
+        until then; a document without such pages is streamed as it is read.
+
+        Yields:
+            dict: The page number and its text.
+        """
+        ocr_candidates = []
+        # The pages from the first one needing OCR onwards, with no text until it is OCR'd.
+        held_pages = []
+        self.image_count = 0
+        page_count = 0
+        span = instrumentation.start_span("pdf.stream_pages", parallel=self.parallel)
+        try:
+            for page in self.iter_pages():
+                page_count += 1
+                self.image_count += page["images"]
+                if self._page_needs_ocr(page):
+                    ocr_candidates.append(page["page"])
+                    held_pages.append({"page": page["page"], "text": None})
+                elif held_pages:
+                    held_pages.append({"page": page["page"], "text": page["text"]})
+                else:
+                    yield {"page": page["page"], "text": page["text"]}
+        finally:
+            span.set(images=self.image_count, ocr_pages=len(ocr_candidates))
+            instrumentation.add("pages", page_count, span=span)
+            instrumentation.end_span(span)
+        if ocr_candidates:
+            ocr_texts = {ocr_page["page"]: ocr_page["text"] for ocr_page in self._iter_ocr_pages(ocr_candidates)}
+            for page in held_pages:
+                if page["text"] is None:
+                    page["text"] = ocr_texts[page["page"]]
+                yield page
+
+    def iter_markdown_sections(self):
+        """
+        Stream the sections of the Markdown `convert` produces: every page with text, as
+        `iter_document_pages` yields them, then the metadata section with no page number.
+
+        Yields:
+            dict: The page number and the section text.
+        """
+        for page in self.iter_document_pages():
+            if len(page["text"]) > 0:
+                yield page
+        yield {"page": None, "text": self._metadata_markdown()}
+
+    def _metadata_markdown(self) -> str:
+        """
+        Render the metadata section of the Markdown.
+        """
+        return "# Metadata\n\n" + "".join(
+            f"- **{key}**: {value if value else 'N/A'}\n" for key, value in self.metadata.items()
+        )
+
+    def generate_document_id(self) -> str:
+        """
+        Build the unique ID of the document from its file name and the current time.
+        """
         document_id = os.path.splitext(os.path.basename(self.pdf_file))[0]
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_id = f"{document_id}_{timestamp}"
+        return f"{document_id}_{timestamp}"
+
+    def convert(self):
+        """
+        Convert the PDF file to Markdown, extracting text and metadata.
+        """
+        with instrumentation.span("pdf.convert", parallel=self.parallel) as span:
+            with instrumentation.span("pdf.extract_text", pages=len(self.reader.pages)):
+                self.full_text = self._extract_text_from_pdf()
+            self.image_count = self._count_images()
+            ocr_pages = [page["page"] for page in self._scan_pages() if self._page_needs_ocr(page)]
+            if ocr_pages:
+                self._perform_ocr(ocr_pages)
+            span.set(images=self.image_count, ocr_pages=len(ocr_pages))
+            instrumentation.add("pages", len(self.pages))
+        markdown_content = "# Extracted Text\n\n" + self.full_text + "\n\n" + self._metadata_markdown()
+        unique_id = self.generate_document_id()
         return unique_id,markdown_content
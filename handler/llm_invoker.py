@@ -1,77 +1,198 @@
-import openai
-from langchain.prompts import PromptTemplate
+import math
+import time
+from typing import TYPE_CHECKING
 
+from handler.context_assembler import load_encoding
 from handler.prompt_general_query import get_general_query_prompt_template as get_general_template
 from handler.prompt_entity_extractor import get_prompt_template as get_entities_template
 from handler.prompt_entity_extractor import get_entities
+from handler.prompt_entity_extractor import get_merge_prompt_template as get_merge_template
+from handler.instrumentation import instrumentation
+
+if TYPE_CHECKING:
+    from langchain.prompts import PromptTemplate
+
+# The tiktoken encoding of GPT-4, used to count the tokens of streamed responses.
+GPT4_ENCODING = "cl100k_base"
 
 class GPT4Assistant:
     """
     A class to interact with OpenAI's GPT-4 API.
     """
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, completion_fn=None):
         """
         Initialize the GPT4Assistant with the OpenAI API key.
         Args:
             api_key (str): The OpenAI API key for authentication.
+            completion_fn: Optional replacement for `openai.ChatCompletion.create`, e.g. an offline fake.
         """
+        import openai
+
         self.api_key = api_key
         openai.api_key = self.api_key
+        self.completion_fn = completion_fn
+        self.last_latency = {}
+
+    def _create_completion(self, **kwargs):
+        if self.completion_fn is not None:
+            return self.completion_fn(**kwargs)
+        import openai
+        return openai.ChatCompletion.create(**kwargs)
+
+    def record_usage(self, response, span=None):
+        """
+        Record the prompt and completion token usage reported in a completion response.
+        """
+        usage = (response.get("usage") if isinstance(response, dict) else None) or {}
+        instrumentation.add("llm_prompt_tokens", usage.get("prompt_tokens", 0), span=span, model="gpt-4")
+        instrumentation.add("llm_completion_tokens", usage.get("completion_tokens", 0), span=span, model="gpt-4")
+
+    def count_tokens(self, text: str) -> int:
+        encoding = load_encoding(GPT4_ENCODING)
+        if encoding is not None:
+            return len(encoding.encode(text))
+        return math.ceil(len(text) / 4)
+
+    def record_stream_usage(self, messages: list, completion: str, span=None):
+        """
+        Record the token usage of a streamed completion, which carries no usage report, by counting
+        the tokens of the messages and of the streamed text. Each chat message adds 3 tokens of
+        framing and the reply is primed with 3 more, as the API counts them for GPT-4.
+        """
+        prompt_tokens = 0
+        if messages:
+            prompt_tokens = 3 + sum(3 + sum(self.count_tokens(value) for value in message.values())
+                                    for message in messages)
+        self.record_usage(
+            {"usage": {"prompt_tokens": prompt_tokens, "completion_tokens": self.count_tokens(completion)}}, span=span
+        )
 
-    def get_prompt_template(self, task_type: str) -> PromptTemplate:
+    def get_prompt_template(self, task_type: str) -> "PromptTemplate":
         """
         Load the appropriate prompt template for the given task type.
 
         Args:
-            task_type (str): The type of task, e.g., "entity_extraction" or "general_query".
+            task_type (str): The type of task, e.g., "entity_extraction", "entity_merge" or "general_query".
 
         Returns:
             PromptTemplate: The template for the specified task.
         """
         if task_type == "entity_extraction":
             return get_entities_template()
+        elif task_type == "entity_merge":
+            return get_merge_template()
         elif task_type == "general_query":
             return get_general_template()
         else:
-            raise ValueError("Invalid task type. Supported types: 'entity_extraction', 'general_query'.")
+            raise ValueError(
+                "Invalid task type. Supported types: 'entity_extraction', 'entity_merge', 'general_query'."
+            )
 
-    def get_response(self, task_type: str, context_chunks: str, query: str) -> str:
+    def build_prompt(self, task_type: str, context_chunks: str, query: str, entities: list = None) -> str:
+        """
+        Format the prompt template of the specified task.
+
+        Args:
+            task_type (str): The type of task, e.g., "entity_extraction", "entity_merge" or "general_query".
+            context_chunks (str): The context chunks to provide to the prompt.
+            query (str): The user query, required for "general_query".
+            entities (list): The entities to extract or merge (defaults to `get_entities()`).
+
+        Returns:
+            str: The formatted prompt.
+        """
+        prompt_template = self.get_prompt_template(task_type)
+
+        if task_type in ("entity_extraction", "entity_merge"):
+            entities = entities or get_entities()
+            if not entities:
+                raise ValueError("For 'entity_extraction', 'entities' must be provided.")
+            return prompt_template.format(entities=entities, context_chunks=context_chunks)
+        elif task_type == "general_query":
+            if not query:
+                raise ValueError("For 'general_query', 'query' must be provided.")
+            return prompt_template.format(query=query, context_chunks=context_chunks)
+        else:
+            raise ValueError("Invalid task type.")
+
+    def build_messages(self, prompt: str) -> list:
+        """
+        Wrap a prompt into the chat messages sent to the model.
+        """
+        return [
+            {"role": "system", "content": "You are a helpful assistant specialized in contracts."},
+            {"role": "user", "content": prompt},
+        ]
+
+    def get_response(self, task_type: str, context_chunks: str, query: str, entities: list = None) -> str:
         """
         Generate a response from GPT-4 for the specified task using the relevant prompt template.
 
         Args:
-            task_type (str): The type of task, e.g., "entity_extraction" or "general_query".
+            task_type (str): The type of task, e.g., "entity_extraction", "entity_merge" or "general_query".
             context_chunks (str): The context chunks to provide to the prompt.
-            kwargs: Additional arguments for the prompt (e.g., entities or query).
+            query (str): The user query, required for "general_query".
+            entities (list): The entities to extract or merge (defaults to `get_entities()`).
 
         Returns:
             str: The assistant's response.
         """
         try:
-            prompt_template = self.get_prompt_template(task_type)
-
-            if task_type == "entity_extraction":
-                entities = get_entities()
-                if not entities:
-                    raise ValueError("For 'entity_extraction', 'entities' must be provided.")
-                prompt = prompt_template.format(entities=entities, context_chunks=context_chunks)
-            elif task_type == "general_query":
-                if not query:
-                    raise ValueError("For 'general_query', 'query' must be provided.")
-                prompt = prompt_template.format(query=query, context_chunks=context_chunks)
-            else:
-                raise ValueError("Invalid task type.")
-
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant specialized in contracts."},
-                    {"role": "user", "content": prompt},
-                ],
-            )
+            prompt = self.build_prompt(task_type, context_chunks, query, entities)
+
+            with instrumentation.span("llm.completion", task_type=task_type, model="gpt-4"):
+                response = self._create_completion(
+                    model="gpt-4",
+                    messages=self.build_messages(prompt),
+                )
+                self.record_usage(response)
 
             return response['choices'][0]['message']['content']
         except Exception as e:
             return f"An error occurred: {str(e)}"
 
+    def stream_response(self, task_type: str, context_chunks: str, query: str):
+        """
+        Stream a response from GPT-4 for the specified task as it is generated.
+
+        Once the stream is exhausted, `last_latency` holds the time to first token, the total
+        latency in seconds and the error that ended the stream early, None when the response is
+        complete; only complete responses should be cached. Streamed responses carry no usage report, so the prompt and
+        completion tokens are counted with tiktoken, see `record_stream_usage`.
+
+        Args:
+            task_type (str): The type of task, e.g., "entity_extraction" or "general_query".
+            context_chunks (str): The context chunks to provide to the prompt.
+            query (str): The user query, required for "general_query".
+
+        Yields:
+            str: The content deltas of the assistant's response.
+        """
+        start = time.perf_counter()
+        self.last_latency = {"time_to_first_token": None, "total_latency": None, "error": None}
+        span = instrumentation.start_span("llm.stream", task_type=task_type, model="gpt-4")
+        messages, completion = None, []
+        try:
+            messages = self.build_messages(self.build_prompt(task_type, context_chunks, query))
+            response = self._create_completion(
+                model="gpt-4",
+                messages=messages,
+                stream=True,
+            )
+            for chunk in response:
+                delta = chunk['choices'][0]['delta'].get('content')
+                if delta:
+                    completion.append(delta)
+                    if self.last_latency["time_to_first_token"] is None:
+                        self.last_latency["time_to_first_token"] = time.perf_counter() - start
+                    yield delta
+        except Exception as e:
+            span.status, span.error = "error", str(e)
+            self.last_latency["error"] = str(e)
+            yield f"An error occurred: {str(e)}"
+        finally:
+            self.last_latency["total_latency"] = time.perf_counter() - start
+            span.set(time_to_first_token=self.last_latency["time_to_first_token"])
+            self.record_stream_usage(messages, "".join(completion), span=span)
+            instrumentation.end_span(span)
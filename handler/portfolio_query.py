@@ -0,0 +1,175 @@
+import heapq
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List
+
+from handler.embedding_engine import BACKEND_OPENAI, DEFAULT_MODELS, get_embedding_engine
+from handler.instrumentation import instrumentation
+from handler.qdrant_adapter import STORAGE_SHARED
+from handler.query_retrieval import QdrantQueryHandler
+
+
+class PortfolioQueryHandler:
+    """
+    Answers one question across many documents, e.g. "which contracts have a change-of-control clause?".
+
+    The query is embedded once per embedding model in use. In "per_document" storage mode the
+    document collections are searched in parallel with bounded concurrency; each search only
+    asks for hits that can still enter the global top-k, and searches not finished within
+    `timeout` are reported instead of awaited. In "shared" mode all documents of a model are
+    searched in a single grouped request. The best documents are ranked by their best hit, and
+    their hits are merged into a global top-k.
+    """
+
+    def __init__(self, openai_api_key: str, qdrant_client, embedding_cache=None, max_concurrency: int = 16,
+                 timeout: float = 10.0):
+        """
+        Initialize the PortfolioQueryHandler.
+
+        Args:
+            openai_api_key (str): The OpenAI API key for generating vector embeddings.
+            qdrant_client (QdrantHandler): The Qdrant handler instance.
+            embedding_cache (EmbeddingCache): Optional on-disk cache checked before calling the API.
+            max_concurrency (int): The maximum number of collection searches in flight.
+            timeout (float): The time budget of the fan-out in seconds.
+        """
+        self.openai_api_key = openai_api_key
+        self.qdrant_client = qdrant_client
+        self.embedding_cache = embedding_cache
+        self.max_concurrency = 1 if qdrant_client.is_local else max_concurrency
+        self.timeout = timeout
+
+    def _group_by_embedding_model(self, document_ids: List[str] = None) -> Dict[tuple, List[str]]:
+        """
+        Group the stored documents, or the given subset, by the embedding backend and model they were ingested with.
+
+        All documents are listed from the store rather than the registry, so collections created before
+        the registry existed are searched too. Documents without a registry entry were embedded with
+        the default OpenAI model.
+        """
+        entries = {entry["document_id"]: entry for entry in self.qdrant_client.registry.list_documents()}
+        if document_ids is None:
+            document_ids = self.qdrant_client.get_collection_names()
+        groups = {}
+        for document_id in document_ids:
+            entry = entries.get(document_id, {})
+            backend = entry.get("embedding_backend") or BACKEND_OPENAI
+            model = entry.get("embedding_model") or DEFAULT_MODELS[backend]
+            groups.setdefault((backend, model), []).append(document_id)
+        return groups
+
+    def embed_query(self, prompt: str, backend: str, model: str) -> list:
+        """
+        Embed the query with the given embedding backend and model.
+        """
+        query_client = QdrantQueryHandler(
+            document_id=None,
+            openai_api_key=self.openai_api_key,
+            qdrant_client=self.qdrant_client,
+            embedding_cache=self.embedding_cache,
+            embedding_engine=get_embedding_engine(backend, model_name=model, openai_api_key=self.openai_api_key),
+        )
+        return query_client.generate_vector_embedding(prompt)
+
+    def _search_collections(self, document_ids: List[str], query_vector: list, limit: int, per_document: int,
+                            score_threshold: float, search_params, deadline: float):
+        """
+        Search per-document collections with at most `max_concurrency` searches in flight.
+
+        Each new search raises its score threshold to the best score of the `limit`-th best document
+        found so far, so later collections return only hits that can still make it into the results.
+
+        Returns:
+            tuple: The hits per document and the IDs of the documents not searched within the deadline.
+        """
+        hits_by_document, best_scores = {}, []
+        pending = {}
+        todo = deque(document_ids)
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            while todo or pending:
+                while todo and len(pending) < self.max_concurrency:
+                    document_id = todo.popleft()
+                    threshold = max(score_threshold, best_scores[0]) if len(best_scores) >= limit else score_threshold
+                    future = executor.submit(
+                        self.qdrant_client.search_qdrant, document_id, query_vector,
+                        limit=per_document, score_threshold=threshold, search_params=search_params,
+                    )
+                    pending[future] = document_id
+                done, _ = wait(list(pending), timeout=max(0.0, deadline - time.perf_counter()),
+                               return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    document_id = pending.pop(future)
+                    hits = future.result()
+                    if not hits:
+                        continue
+                    hits_by_document[document_id] = hits
+                    best_score = max(hit["score"] for hit in hits)
+                    if len(best_scores) < limit:
+                        heapq.heappush(best_scores, best_score)
+                    elif best_score > best_scores[0]:
+                        heapq.heapreplace(best_scores, best_score)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return hits_by_document, list(todo) + list(pending.values())
+
+    def query_response(self, prompt: str, document_ids: List[str] = None, limit: int = 20, per_document: int = 3,
+                       score_threshold: float = 0.1, search_params=None) -> Dict:
+        """
+        Search a set of documents, by default all of them, and merge the hits.
+
+        Scores of documents embedded with different models are not comparable; the global
+        ranking mixes them as they are.
+
+        Args:
+            prompt (str): The user input or query prompt to generate embeddings.
+            document_ids (List[str]): The IDs of the documents to search (default: every document).
+            limit (int): The number of documents returned, and of hits in the global top-k.
+            per_document (int): The maximum number of hits per document.
+            score_threshold (float): The minimum similarity score threshold for results.
+            search_params (models.SearchParams): Overrides the search parameters of the collection profile.
+
+        Returns:
+            Dict: "results", the global top-k hits with their `document_id`; "documents", the matching
+                documents with their best score and hits, best first; "searched", the number of documents
+                searched; and "timed_out", the documents not searched within the time budget.
+        """
+        deadline = time.perf_counter() + self.timeout
+        hits_by_document, timed_out = {}, []
+        with instrumentation.span("query.portfolio") as span:
+            groups = self._group_by_embedding_model(document_ids)
+            for (backend, model), group_ids in groups.items():
+                query_vector = self.embed_query(prompt, backend, model)
+                if self.qdrant_client.storage_mode == STORAGE_SHARED:
+                    # Without a selection and with a single model, the whole shared collection is searched unfiltered.
+                    selection = None if document_ids is None and len(groups) == 1 else group_ids
+                    hits_by_document.update(self.qdrant_client.search_document_groups(
+                        selection, query_vector, limit=limit, group_size=per_document,
+                        score_threshold=score_threshold, search_params=search_params,
+                    ))
+                else:
+                    group_hits, group_timed_out = self._search_collections(
+                        group_ids, query_vector, limit, per_document, score_threshold, search_params, deadline
+                    )
+                    hits_by_document.update(group_hits)
+                    timed_out.extend(group_timed_out)
+
+            results = heapq.nlargest(
+                limit,
+                ({**hit, "document_id": document_id} for document_id, hits in hits_by_document.items() for hit in hits),
+                key=lambda hit: hit["score"],
+            )
+            documents = heapq.nlargest(
+                limit,
+                (
+                    {"document_id": document_id, "best_score": max(hit["score"] for hit in hits), "hits": hits}
+                    for document_id, hits in hits_by_document.items()
+                ),
+                key=lambda document: document["best_score"],
+            )
+            searched = sum(len(group_ids) for group_ids in groups.values()) - len(timed_out)
+            span.set(documents=searched, matches=len(documents), results=len(results), timed_out=len(timed_out))
+        return {"results": results, "documents": documents, "searched": searched, "timed_out": timed_out}
@@ -1,4 +1,7 @@
-from langchain.prompts import PromptTemplate
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain.prompts import PromptTemplate
 
 def get_entities() -> list[str]:
     """
@@ -25,7 +28,7 @@ def get_entities() -> list[str]:
     }
     return predefined_entities.get("general_contract", [])
 
-def get_prompt_template() -> PromptTemplate:
+def get_prompt_template() -> "PromptTemplate":
     """
     Generates a prompt template for extracting entities from a classified document using an LLM.
 
@@ -35,6 +38,8 @@ def get_prompt_template() -> PromptTemplate:
     Returns:
         PromptTemplate: A template containing the input variables and extraction instructions.
     """
+    from langchain.prompts import PromptTemplate
+
     return PromptTemplate(
         input_variables=["entities", "context_chunks"],
         template="""You are an advanced entity extractor. Your task is to extract specific entities 
@@ -65,3 +70,44 @@ def get_prompt_template() -> PromptTemplate:
 
         Extraction:""",
     )
+
+def get_merge_prompt_template() -> "PromptTemplate":
+    """
+    Generates a prompt template for reconciling conflicting entity values extracted from
+    different parts of the same document.
+
+    Returns:
+        PromptTemplate: A template containing the input variables and reconciliation instructions.
+    """
+    from langchain.prompts import PromptTemplate
+
+    return PromptTemplate(
+        input_variables=["entities", "context_chunks"],
+        template="""You are an advanced entity extractor. The entities below were extracted separately 
+        from different parts of the same contract, and some of them received more than one candidate value. 
+        Your task is to reconcile the candidates into a single value per entity.
+
+        DOCUMENT TYPE: General Contract
+
+        ENTITIES TO RECONCILE:
+        {entities}
+
+        CANDIDATE VALUES PER ENTITY:
+        {context_chunks}
+
+        Please provide your reconciled entities in the following JSON format:
+        {{
+            "extracted_entities": {{
+                "entity_name": "reconciled_value",
+                "entity_name_2": "reconciled_value_2",
+                ...
+            }}
+        }}
+
+        Remember:
+        1. Combine candidates that describe the same thing (e.g., several parties or signatories) into one value.
+        2. If candidates contradict each other, choose the one that best answers the entity.
+        3. Use only the provided candidate values.
+
+        Reconciliation:""",
+    )
@@ -1,6 +1,9 @@
-from langchain.prompts import PromptTemplate
+from typing import TYPE_CHECKING
 
-def get_general_query_prompt_template() -> PromptTemplate:
+if TYPE_CHECKING:
+    from langchain.prompts import PromptTemplate
+
+def get_general_query_prompt_template() -> "PromptTemplate":
     """
     Generates a prompt template for answering general queries related to contracts using an LLM.
 
@@ -10,6 +13,8 @@ def get_general_query_prompt_template() -> PromptTemplate:
     Returns:
         PromptTemplate: A template containing the input variables and instructions for query answering.
     """
+    from langchain.prompts import PromptTemplate
+
     return PromptTemplate(
         input_variables=["query", "context_chunks"],
         template="""You are a legal assistant specialized in contracts. Your task is to answer the user's 
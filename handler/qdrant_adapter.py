@@ -1,13 +1,92 @@
-from qdrant_client import QdrantClient
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import numpy as np
+from qdrant_client import QdrantClient, models
+from handler.collection_profiles import (
+    PROFILE_DEFAULT, CollectionProfile, get_collection_profile, infer_profile_name, resolve_profile,
+)
+from handler.document_registry import DocumentRegistry, REGISTRY_COLLECTION
+from handler.instrumentation import instrumentation
+
+STORAGE_PER_DOCUMENT = "per_document"
+STORAGE_SHARED = "shared"
+SHARED_COLLECTION = "clauseai_documents"
+
+
+def build_document_filter(document_id: str) -> models.Filter:
+    """
+    Build the filter selecting the points of one document in the shared collection.
+    """
+    return models.Filter(
+        must=[models.FieldCondition(key="document_id", match=models.MatchValue(value=document_id))]
+    )
+
+
+def build_documents_filter(document_ids) -> models.Filter:
+    """
+    Build the filter selecting the points of several documents in the shared collection.
+    """
+    return models.Filter(
+        must=[models.FieldCondition(key="document_id", match=models.MatchAny(any=list(document_ids)))]
+    )
+
+
 class QdrantHandler:
     """
     A class to manage interactions with the Qdrant client.
+
+    In "per_document" storage mode every document gets its own collection named after its ID.
+    In "shared" mode all documents live in one collection and are told apart by an indexed
+    `document_id` payload field.
     """
-    def __init__(self, url: str, api_key: str):
+    def __init__(
+        self,
+        url: str = None,
+        api_key: str = None,
+        storage_mode: str = STORAGE_PER_DOCUMENT,
+        shared_collection: str = SHARED_COLLECTION,
+        location: str = None,
+        path: str = None,
+        collection_profile=PROFILE_DEFAULT,
+    ):
         """
         Initialize the QdrantHandler with connection details.
+
+        Args:
+            url (str): The Qdrant URL.
+            api_key (str): The Qdrant API key.
+            storage_mode (str): "per_document" or "shared".
+            shared_collection (str): The collection holding all documents in "shared" mode.
+            location (str): ":memory:" to run Qdrant in-process instead of connecting to `url`.
+            path (str): A directory to run Qdrant in-process with on-disk persistence.
+            collection_profile: The name of a collection profile ("default", "on_disk", "scalar", "binary")
+                or a CollectionProfile. It sets the storage of new collections and the default search parameters.
+        """
+        if storage_mode not in (STORAGE_PER_DOCUMENT, STORAGE_SHARED):
+            raise ValueError("Invalid storage mode. Supported modes: 'per_document', 'shared'.")
+        self.is_local = location is not None or path is not None
+        if self.is_local:
+            self.qdrant_client = QdrantClient(location=location, path=path)
+        else:
+            self.qdrant_client = QdrantClient(url=url, api_key=api_key, timeout=300)
+        self.storage_mode = storage_mode
+        self.shared_collection = shared_collection
+        self.registry = DocumentRegistry(self.qdrant_client)
+        self.collection_profile = (
+            collection_profile if isinstance(collection_profile, CollectionProfile)
+            else get_collection_profile(collection_profile)
+        )
+        self._known_collections = set()
+        self._collection_profiles = {}
+
+    def _target(self, document_id: str):
+        """
+        Resolve a document ID to the collection holding it and the filter selecting its points.
         """
-        self.qdrant_client = QdrantClient(url=url, api_key=api_key, timeout=300)
+        if self.storage_mode == STORAGE_SHARED:
+            return self.shared_collection, build_document_filter(document_id)
+        return document_id, None
 
     def load_qdrant_connection(self):
         """
@@ -15,59 +94,237 @@ class QdrantHandler:
         """
         return self.qdrant_client
 
+    def collection_exists(self, collection_name: str) -> bool:
+        """
+        Check whether the specified document is stored in Qdrant.
+
+        In "shared" mode the document registry is checked instead of the collection list.
+        """
+        try:
+            if self.storage_mode == STORAGE_SHARED:
+                return self.registry.get(collection_name) is not None
+            return self.qdrant_client.collection_exists(collection_name)
+        except Exception as e:
+            print(f"Error checking collection '{collection_name}': {e}")
+            return False
+
+    def get_document_entry(self, document_id: str):
+        """
+        Return the registry entry of a document, or None if it is not registered.
+        """
+        try:
+            return self.registry.get(document_id)
+        except Exception as e:
+            print(f"Error fetching registry entry of '{document_id}': {e}")
+            return None
+
+    def get_document_version(self, document_id: str):
+        """
+        Return the version of a document, which changes every time it is (re-)ingested.
+
+        Returns None for documents that are not in the registry.
+        """
+        document = self.get_document_entry(document_id)
+        return str(document.get("updated_at")) if document else None
+
+    def resolve_collection_profile(self, document_id: str) -> CollectionProfile:
+        """
+        Return the profile the collection of a document was created with, as recorded in the registry.
+
+        Documents without a registry entry, or with an unknown profile, use the handler's profile.
+        The profile of each collection is looked up once, or taken from `ensure_collection_exists`,
+        and remembered until the collection is deleted.
+        """
+        target_collection, _ = self._target(document_id)
+        profile = self._collection_profiles.get(target_collection)
+        if profile is not None:
+            return profile
+        entry = self.get_document_entry(document_id)
+        if not entry or not entry.get("collection_profile"):
+            return self.collection_profile
+        profile = resolve_profile(entry["collection_profile"], self.collection_profile)
+        self._collection_profiles[target_collection] = profile
+        return profile
+
+    def _existing_collection_profile(self, collection_name: str, collection_config) -> CollectionProfile:
+        """
+        Tell the profile an existing collection was created with from its configuration.
+
+        The local mode does not keep quantization settings, so there the profile recorded for a
+        document already stored in the collection is used when there is one.
+        """
+        name = infer_profile_name(collection_config)
+        if self.is_local:
+            entry = self.registry.find_by_collection(collection_name)
+            if entry and entry.get("collection_profile"):
+                name = entry["collection_profile"]
+        return resolve_profile(name, self.collection_profile)
+
     def ensure_collection_exists(self, collection_name: str, vector_size: int):
         """
         Ensure that the specified Qdrant collection exists.
-        If it does not exist, create it.
+        If it does not exist, create it with the storage settings of the collection profile.
+        The shared collection also gets a tenant index on `document_id`.
+
+        The profile of an existing collection is read back from its configuration, so the registry
+        records the profile the collection was created with rather than the handler's.
         """
-        existing_collections = [
-            col.name for col in self.qdrant_client.get_collections().collections
-        ]
-        if collection_name not in existing_collections:
-            print(f"Collection '{collection_name}' does not exist. Creating it...")
+        if collection_name in self._known_collections:
+            return
+        if not self.qdrant_client.collection_exists(collection_name):
+            print(
+                f"Collection '{collection_name}' does not exist. "
+                f"Creating it with the '{self.collection_profile.name}' profile..."
+            )
             self.qdrant_client.create_collection(
                 collection_name=collection_name,
-                vectors_config={"distance": "Cosine", "size": vector_size},
+                **self.collection_profile.collection_kwargs(vector_size),
             )
+            if collection_name == self.shared_collection:
+                self.qdrant_client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name="document_id",
+                    field_schema=models.KeywordIndexParams(type="keyword", is_tenant=True),
+                )
             print(f"Collection '{collection_name}' created successfully.")
+            self._collection_profiles[collection_name] = self.collection_profile
         else:
-            print(f"Collection '{collection_name}' already exists.")
+            collection_config = self.qdrant_client.get_collection(collection_name).config
+            existing_size = collection_config.params.vectors.size
+            if existing_size != vector_size:
+                raise ValueError(
+                    f"Collection '{collection_name}' stores {existing_size}-dimensional vectors, "
+                    f"but the embedding model produces {vector_size} dimensions."
+                )
+            profile = self._existing_collection_profile(collection_name, collection_config)
+            self._collection_profiles[collection_name] = profile
+            print(f"Collection '{collection_name}' already exists with the '{profile.name}' profile.")
+        self._known_collections.add(collection_name)
+
+    @staticmethod
+    def shared_point_id(document_id: str, index: int) -> str:
+        """
+        Build a point ID that is unique across all documents of the shared collection.
+        """
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{document_id}/{index}"))
 
-    def store_in_qdrant(self, docs_vector_store, split_documents, collection_name: str):
+    def _upload_batch(self, document_id: str, first_id: int, payloads: list, vectors, parent_span=None):
         """
-        Upload the vector embeddings to the specified Qdrant collection.
+        Upsert one batch of points of a document, numbered from `first_id`.
         """
-        self.ensure_collection_exists(collection_name, docs_vector_store.index.d)
-        vectors = [
-            docs_vector_store.index.reconstruct(i)
-            for i in range(docs_vector_store.index.ntotal)
-        ]
-        payloads = [{"text": doc.page_content} for doc in split_documents]
-        self.qdrant_client.upload_collection(
-            collection_name=collection_name, vectors=vectors, payload=payloads
+        collection_name, _ = self._target(document_id)
+        ids = list(range(first_id, first_id + len(payloads)))
+        if self.storage_mode == STORAGE_SHARED:
+            ids = [self.shared_point_id(document_id, idx) for idx in ids]
+            payloads = [{**payload, "document_id": document_id} for payload in payloads]
+        payload_bytes = sum(len(payload.get("text", "").encode("utf-8")) for payload in payloads)
+        with instrumentation.span("qdrant.upsert", parent=parent_span, points=len(ids)) as span:
+            self.qdrant_client.upsert(
+                collection_name=collection_name,
+                points=models.Batch(ids=ids, vectors=vectors.tolist(), payloads=payloads),
+                wait=True,
+            )
+            span.set(vector_bytes=vectors.nbytes, payload_bytes=payload_bytes)
+            instrumentation.add("vectors_uploaded", len(ids))
+            instrumentation.add("bytes_uploaded", vectors.nbytes + payload_bytes)
+
+    def store_batches(self, batches, collection_name: str, upload_workers: int = 4, metadata: dict = None) -> int:
+        """
+        Stream batches of embeddings of a document to Qdrant as they are produced.
+
+        Uploads run on a thread pool while the next batch is being embedded. At most
+        `upload_workers` batches are pending at once, so memory is bounded by the batch size.
+        The in-process local mode is not thread-safe, so it uploads with a single worker.
+        The document is added to the registry once all batches are uploaded.
+
+        Args:
+            batches: An iterable of (payloads, vectors) tuples, vectors being a 2-D NumPy array.
+            collection_name (str): The ID of the document, which is its collection in "per_document" mode.
+            upload_workers (int): The number of parallel upload workers.
+            metadata (dict): Extra fields recorded in the registry, e.g. the embedding backend and model.
+
+        Returns:
+            int: The number of points uploaded.
+        """
+        target_collection, _ = self._target(collection_name)
+        if self.is_local:
+            upload_workers = 1
+        uploaded = 0
+        pending = deque()
+        with instrumentation.span("qdrant.store_batches", collection=target_collection) as span, \
+                ThreadPoolExecutor(max_workers=upload_workers) as executor:
+            for payloads, vectors in batches:
+                if uploaded == 0:
+                    self.ensure_collection_exists(target_collection, vectors.shape[1])
+                while len(pending) >= upload_workers:
+                    pending.popleft().result()
+                pending.append(
+                    executor.submit(self._upload_batch, collection_name, uploaded, payloads, vectors, span)
+                )
+                uploaded += len(payloads)
+            while pending:
+                pending.popleft().result()
+            span.set(points=uploaded)
+        self.registry.register(
+            collection_name,
+            collection=target_collection,
+            storage_mode=self.storage_mode,
+            chunk_count=uploaded,
+            collection_profile=self._collection_profiles.get(target_collection, self.collection_profile).name,
+            **(metadata or {}),
         )
-        print(f"Data successfully uploaded to Qdrant collection: {collection_name}")
+        print(f"Data successfully uploaded to Qdrant collection: {target_collection}")
+        return uploaded
 
-    def search_qdrant(self, collection_name: str, query_vector: list, limit: int = 10, score_threshold: float = 0.5):
+    def delete_document(self, document_id: str):
+        """
+        Delete the points and the registry entry of a document, e.g. a partially stored one.
+        """
+        target_collection, document_filter = self._target(document_id)
+        if document_filter is None:
+            if self.qdrant_client.collection_exists(target_collection):
+                self.qdrant_client.delete_collection(target_collection)
+            self._known_collections.discard(target_collection)
+            self._collection_profiles.pop(target_collection, None)
+        elif self.qdrant_client.collection_exists(target_collection):
+            self.qdrant_client.delete(
+                collection_name=target_collection,
+                points_selector=models.FilterSelector(filter=document_filter),
+                wait=True,
+            )
+        self.registry.remove(document_id)
+
+    def search_qdrant(self, collection_name: str, query_vector: list, limit: int = 10, score_threshold: float = 0.5,
+                      search_params: models.SearchParams = None):
         """
         Search for similar vectors in the specified Qdrant collection.
 
         Args:
-            collection_name (str): The name of the Qdrant collection to search in.
+            collection_name (str): The ID of the document to search, which is its collection in "per_document" mode.
             query_vector (list): The query vector to search for.
             limit (int): The maximum number of results to retrieve.
             score_threshold (float): The minimum similarity score threshold for results.
+            search_params (models.SearchParams): HNSW `ef` and quantization oversampling/rescoring
+                (defaults to those of the profile the collection was created with, see
+                `resolve_collection_profile` and `CollectionProfile.search_params`).
 
         Returns:
             list: A list of search results with their payloads and similarity scores.
         """
         try:
-            results = self.qdrant_client.search(
-                collection_name=collection_name,
-                query_vector=query_vector,
-                limit=limit,
-                score_threshold=score_threshold,
-            )
+            target_collection, document_filter = self._target(collection_name)
+            if search_params is None:
+                search_params = self.resolve_collection_profile(collection_name).search_params()
+            with instrumentation.span("qdrant.search", collection=target_collection, limit=limit) as span:
+                results = self.qdrant_client.search(
+                    collection_name=target_collection,
+                    query_vector=query_vector,
+                    query_filter=document_filter,
+                    search_params=search_params,
+                    limit=limit,
+                    score_threshold=score_threshold,
+                )
+                span.set(results=len(results))
             formatted_results = [
                 {
                     "id": result.id,
@@ -81,66 +338,142 @@ class QdrantHandler:
             print(f"Error during search in Qdrant: {e}")
             return []
 
+    def search_document_groups(self, document_ids, query_vector: list, limit: int = 10, group_size: int = 3,
+                               score_threshold: float = 0.5, search_params: models.SearchParams = None) -> dict:
+        """
+        Search several documents of the shared collection in one request, grouping the hits by document.
+
+        Only available in "shared" storage mode; per-document collections are searched one by one.
+
+        Args:
+            document_ids: The IDs of the documents to search, or None for every document of the collection.
+            query_vector (list): The query vector to search for.
+            limit (int): The maximum number of documents returned.
+            group_size (int): The maximum number of hits per document.
+            score_threshold (float): The minimum similarity score threshold for results.
+            search_params (models.SearchParams): Overrides the search parameters of the profile the shared
+                collection was created with.
+
+        Returns:
+            dict: The hits of each matching document, best first, formatted like `search_qdrant` results.
+        """
+        if self.storage_mode != STORAGE_SHARED:
+            raise ValueError("Grouped search requires a QdrantHandler in 'shared' storage mode.")
+        try:
+            if search_params is None:
+                profile = (
+                    self.resolve_collection_profile(document_ids[0]) if document_ids
+                    else self._collection_profiles.get(self.shared_collection, self.collection_profile)
+                )
+                search_params = profile.search_params()
+            with instrumentation.span("qdrant.search_groups", collection=self.shared_collection, limit=limit) as span:
+                groups = self.qdrant_client.search_groups(
+                    collection_name=self.shared_collection,
+                    query_vector=query_vector,
+                    group_by="document_id",
+                    query_filter=build_documents_filter(document_ids) if document_ids is not None else None,
+                    search_params=search_params,
+                    limit=limit,
+                    group_size=group_size,
+                    score_threshold=score_threshold,
+                ).groups
+                span.set(results=len(groups))
+            return {
+                group.id: [{"id": hit.id, "payload": hit.payload, "score": hit.score} for hit in group.hits]
+                for group in groups
+            }
+        except Exception as e:
+            print(f"Error during grouped search in Qdrant: {e}")
+            return {}
+
     def get_collection_names(self):
         """
-        Retrieve and return a list of all collection names in Qdrant.
-        
+        Retrieve and return a list of all document IDs.
+
+        In "per_document" mode these are the Qdrant collection names, excluding internal collections.
+        In "shared" mode they are read from the document registry.
+
         Returns:
             list: A list of collection names.
         """
         try:
+            if self.storage_mode == STORAGE_SHARED:
+                return self.registry.list_document_ids()
             collections = self.qdrant_client.get_collections()
-            collection_names = [collection.name for collection in collections.collections]
+            collection_names = [
+                collection.name
+                for collection in collections.collections
+                if collection.name not in (REGISTRY_COLLECTION, self.shared_collection)
+            ]
             return collection_names
         except Exception as e:
             print(f"Error fetching collection names: {e}")
             return []
-        
-    def get_all_payloads(self, collection_name: str):
+
+    def iter_points(self, collection_name: str, batch_size: int = 1000, with_vectors: bool = False):
         """
-        Retrieve all payloads and their associated vectors from a Qdrant collection.
-        Merge the payloads into a single string.
+        Stream the points of a document in batches, for exports and bulk reads.
+
+        Vectors are only transferred when requested, and come back as one contiguous float32
+        array per batch. In "shared" mode the `document_id` payload field is dropped, so the
+        payloads look the same in both storage modes.
 
         Args:
-            collection_name (str): The name of the collection to fetch data from.
+            collection_name (str): The ID of the document to read.
+            batch_size (int): The number of points fetched per scroll request.
+            with_vectors (bool): Also fetch the vectors.
 
-        Returns:
-            str: A string of all merged payloads in the collection.
+        Yields:
+            tuple: (payloads, vectors) per batch, `vectors` being a 2-D NumPy array or None.
         """
-        merged_payloads = []
-        try:
-            next_offset = None
-            while True:
-                # Fetch a batch of records
-                scroll_response = self.qdrant_client.scroll(
-                    collection_name=collection_name,
-                    limit=100,
-                    offset=next_offset,
-                    with_payload=True,
-                    with_vectors=True,
-                )
-
-                # Handle tuple response (for older Qdrant client versions)
-                if isinstance(scroll_response, tuple):
-                    scroll_result, _ = scroll_response
-                    points = scroll_result.points
-                    next_offset = scroll_result.next_page_offset
-                else:
-                    points = scroll_response.points
-                    next_offset = scroll_response.next_page_offset
+        target_collection, document_filter = self._target(collection_name)
+        next_offset = None
+        while True:
+            points, next_offset = self.qdrant_client.scroll(
+                collection_name=target_collection,
+                scroll_filter=document_filter,
+                limit=batch_size,
+                offset=next_offset,
+                with_payload=True,
+                with_vectors=with_vectors,
+            )
+            if points:
+                payloads = [point.payload or {} for point in points]
+                if self.storage_mode == STORAGE_SHARED:
+                    payloads = [
+                        {key: value for key, value in payload.items() if key != "document_id"}
+                        for payload in payloads
+                    ]
+                vectors = np.asarray([point.vector for point in points], dtype=np.float32) if with_vectors else None
+                yield payloads, vectors
+            if next_offset is None:
+                break
 
-                if not points:
-                    break
+    def get_all_payloads(self, collection_name: str, batch_size: int = 1000):
+        """
+        Retrieve the text of every chunk of a document, merged into a single string in document order.
 
-                for point in points:
-                    text = point.payload.get("text", "") if point.payload else ""
-                    vector = point.vector
-                    merged_payloads.append(f"Vector: {vector}\nText: {text}")
+        Points are scrolled in ID order, which in "shared" mode is unrelated to their position, so the
+        chunks are sorted by page and character offset; chunks without a page (the metadata) come last.
+        Vectors are not fetched; use `iter_points` to read them.
 
-                if not next_offset:
-                    break
+        Args:
+            collection_name (str): The ID of the document to fetch data from.
+            batch_size (int): The number of points fetched per scroll request.
 
-            return "\n\n".join(merged_payloads)
+        Returns:
+            str: The chunk texts separated by blank lines.
+        """
+        try:
+            payloads = [
+                payload
+                for batch, _ in self.iter_points(collection_name, batch_size=batch_size)
+                for payload in batch
+            ]
+            payloads.sort(key=lambda payload: (
+                payload.get("page") is None, payload.get("page") or 0, payload.get("char_start") or 0,
+            ))
+            return "\n\n".join(payload.get("text", "") for payload in payloads)
         except Exception as e:
-            print(f"Error fetching payloads and vectors from Qdrant: {e}")
+            print(f"Error fetching payloads from Qdrant: {e}")
             return ""
@@ -1,10 +1,13 @@
 from typing import List, Dict
-from langchain_community.embeddings import OpenAIEmbeddings
+from handler.embedding_cache import CachedEmbeddings
+from handler.embedding_engine import get_embedding_engine
+from handler.instrumentation import instrumentation
 class QdrantQueryHandler:
     """
     A class to handle querying and retrieving responses from Qdrant using vector embeddings.
     """
-    def __init__(self, document_id: str, openai_api_key: str, qdrant_client):
+    def __init__(self, document_id: str, openai_api_key: str, qdrant_client, embedding_cache=None,
+                 embedding_engine=None):
         """
         Initialize the QdrantQueryHandler with required parameters.
 
@@ -12,12 +15,18 @@ class QdrantQueryHandler:
             document_id (str): The ID of the document in Qdrant.
             openai_api_key (str): The OpenAI API key for generating vector embeddings.
             qdrant_client: The Qdrant client instance.
+            embedding_cache (EmbeddingCache): Optional on-disk cache checked before calling the API.
+            embedding_engine (EmbeddingEngine): The embedding backend. By default the backend and model
+                recorded for the document at ingest time are used.
         """
         self.document_id = document_id
         self.qdrant_client = qdrant_client
         self.openai_api_key = openai_api_key
+        self.embedding_cache = embedding_cache
+        self.embedding_engine = embedding_engine
 
-    def query_response(self, prompt: str, limit: int = 10, score_threshold: float = 0.1) -> List[Dict]:
+    def query_response(self, prompt: str, limit: int = 10, score_threshold: float = 0.1,
+                       query_vector: list = None, search_params=None) -> List[Dict]:
         """
         Generate a query response by searching the Qdrant collection.
 
@@ -25,23 +34,42 @@ class QdrantQueryHandler:
             prompt (str): The user input or query prompt to generate embeddings.
             limit (int): The maximum number of results to retrieve (default is 10).
             score_threshold (float): The minimum similarity score threshold for results.
+            query_vector (list): The embedding of the prompt, if already computed.
+            search_params (models.SearchParams): Overrides the search parameters of the collection profile.
 
         Returns:
             List[Dict]: A list of search results with payloads and similarity scores.
         """
-        query_vector = self.generate_vector_embedding(prompt)
-        
-        query_results = self.qdrant_client.search_qdrant(
-            collection_name=self.document_id,
-            query_vector=query_vector,
-            limit=limit,
-            score_threshold=score_threshold
-        )
+        with instrumentation.span("query.retrieve", document_id=self.document_id) as span:
+            if query_vector is None:
+                query_vector = self.generate_vector_embedding(prompt)
+
+            query_results = self.qdrant_client.search_qdrant(
+                collection_name=self.document_id,
+                query_vector=query_vector,
+                limit=limit,
+                score_threshold=score_threshold,
+                search_params=search_params,
+            )
+            span.set(results=len(query_results))
         return query_results
     
+    def get_embedding_engine(self):
+        """
+        Return the embedding backend the document was ingested with, resolving it from the registry on first use.
+        """
+        if self.embedding_engine is None:
+            document = self.qdrant_client.get_document_entry(self.document_id) or {}
+            self.embedding_engine = get_embedding_engine(
+                document.get("embedding_backend"),
+                model_name=document.get("embedding_model"),
+                openai_api_key=self.openai_api_key,
+            )
+        return self.embedding_engine
+
     def generate_vector_embedding(self, text: str):
         """
-        Generate a vector embedding for a given string using OpenAI embeddings.
+        Generate a vector embedding for a given string with the document's embedding backend.
 
         Args:
             text (str): The text or string for which the embedding needs to be generated.
@@ -49,7 +77,9 @@ class QdrantQueryHandler:
         Returns:
             List[float]: The generated vector embedding.
         """
-        embeddings = OpenAIEmbeddings(openai_api_key=self.openai_api_key)
-        vector = embeddings.embed_query(text)
-        return vector
-    
\ No newline at end of file
+        embeddings = self.get_embedding_engine()
+        if self.embedding_cache is not None:
+            embeddings = CachedEmbeddings(embeddings, self.embedding_cache)
+        with instrumentation.span("query.embed", model=embeddings.model_name):
+            vector = embeddings.embed_query(text)
+        return vector.tolist()
@@ -1,8 +1,10 @@
-from qdrant_client import QdrantClient
-from langchain_community.document_loaders import UnstructuredMarkdownLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import OpenAIEmbeddings
+from itertools import islice
+
+import numpy as np
+from handler.embedding_cache import CachedEmbeddings
+from handler.embedding_engine import OpenAIEmbeddingEngine
+from handler.instrumentation import instrumentation
+from handler.layout_identifier import iter_markdown_pages
 
 
 class QdrantDocumentProcessor:
@@ -10,7 +12,17 @@ class QdrantDocumentProcessor:
     A class to process Markdown files, generate vector embeddings, and store them in Qdrant.
     """
 
-    def __init__(self, openai_api_key: str, qdrant_client, document_content: str, document_id: str):
+    def __init__(
+        self,
+        openai_api_key: str,
+        qdrant_client,
+        document_content: str,
+        document_id: str,
+        embedding_cache=None,
+        embedding_engine=None,
+        batch_size: int = 256,
+        upload_workers: int = 4,
+    ):
         """
         Initialize the QdrantDocumentProcessor class.
 
@@ -20,38 +32,152 @@ class QdrantDocumentProcessor:
             mongo_uri (str): MongoDB URI for connecting to the database.
             db_name (str): Name of the database in MongoDB.
             document_id (str): ID of the document to process.
+            embedding_cache (EmbeddingCache): Optional on-disk cache checked before calling the API.
+            embedding_engine (EmbeddingEngine): The embedding backend (defaults to OpenAI).
+            batch_size (int): Number of chunks embedded and uploaded per batch.
+            upload_workers (int): Number of parallel Qdrant upload workers.
         """
         self.openai_api_key = openai_api_key
         self.qdrant_client = qdrant_client
         self.document_content = document_content
         self.document_id = document_id
+        self.embedding_cache = embedding_cache
+        self.embedding_engine = embedding_engine
+        self.batch_size = batch_size
+        self.upload_workers = upload_workers
+
+    def get_embedding_engine(self):
+        """
+        Return the embedding backend, creating the default OpenAI engine on first use.
+        """
+        if self.embedding_engine is None:
+            self.embedding_engine = OpenAIEmbeddingEngine(self.openai_api_key)
+        return self.embedding_engine
+
+    def get_embeddings(self):
+        """
+        Build the embeddings client, wrapped by the embedding cache when one is configured.
+        """
+        embeddings = self.get_embedding_engine()
+        if self.embedding_cache is not None:
+            return CachedEmbeddings(embeddings, self.embedding_cache)
+        return embeddings
 
     def split_file(self, file_content: str):
         """
         Split the file content into smaller chunks.
         """
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-        split_documents = text_splitter.create_documents([file_content])
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        with instrumentation.span("document.split", chars=len(file_content)) as span:
+            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+            split_documents = text_splitter.create_documents([file_content])
+            span.set(chunks=len(split_documents))
+        instrumentation.add("chunks", len(split_documents))
         return split_documents
 
-    def generate_vector_embeddings(self, split_documents):
+    def iter_page_chunks(self, pages):
+        """
+        Split pages into chunks one page at a time, as the pages are produced.
+
+        Chunks never span two pages, so each one can be cited by page.
+
+        Args:
+            pages: An iterable of dicts with the page number and text, e.g.
+                `PDFToMarkdownConverter.iter_document_pages()`.
+
+        Yields:
+            dict: The chunk payload: its text, page number and character offsets within the page.
         """
-        Generate vector embeddings for the split documents using OpenAI embeddings.
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100, add_start_index=True)
+        for page in pages:
+            chunks = text_splitter.create_documents([page["text"]])
+            instrumentation.add("chunks", len(chunks))
+            for chunk in chunks:
+                char_start = chunk.metadata["start_index"]
+                yield {
+                    "text": chunk.page_content,
+                    "page": page["page"],
+                    "char_start": char_start,
+                    "char_end": char_start + len(chunk.page_content),
+                }
+
+    def iter_payload_batches(self, payloads):
         """
-        embeddings = OpenAIEmbeddings(openai_api_key=self.openai_api_key)
-        docs_vector_store = FAISS.from_documents(split_documents, embeddings)
-        return docs_vector_store
+        Embed chunk payloads batch by batch, pulling only one batch from the iterable at a time.
 
-    def process_document(self):
+        Yields:
+            tuple: The payloads of the batch and their embeddings as a contiguous float32 array.
         """
-        Main method to process the document: load, split, embed, and store.
+        embeddings = self.get_embeddings()
+        model_name = self.get_embedding_engine().model_name
+        payloads = iter(payloads)
+        while True:
+            batch = list(islice(payloads, self.batch_size))
+            if not batch:
+                return
+            with instrumentation.span("embedding.batch", chunks=len(batch), model=model_name):
+                vectors = np.asarray(embeddings.embed_documents([payload["text"] for payload in batch]), dtype=np.float32)
+                instrumentation.add("vectors_embedded", len(vectors))
+            yield batch, vectors
+
+    def iter_embedding_batches(self, split_documents):
+        """
+        Embed the split documents batch by batch.
+
+        Yields:
+            tuple: The payloads of the batch and their embeddings as a contiguous float32 array.
+        """
+        return self.iter_payload_batches({"text": doc.page_content} for doc in split_documents)
+
+    def store_pages(self, pages) -> int:
+        """
+        Chunk, embed and upload pages as a stream. Only the batches in flight are held in memory.
+
+        The embedding backend and model are recorded in the document registry, so queries
+        embed with the same model.
+
+        Args:
+            pages: An iterable of dicts with the page number and text.
+
+        Returns:
+            int: The number of chunks stored.
+        """
+        embedding_engine = self.get_embedding_engine()
+        with instrumentation.span("document.process", document_id=self.document_id):
+            return self.qdrant_client.store_batches(
+                self.iter_payload_batches(self.iter_page_chunks(pages)),
+                collection_name=self.document_id,
+                upload_workers=self.upload_workers,
+                metadata={
+                    "embedding_backend": embedding_engine.backend,
+                    "embedding_model": embedding_engine.model_name,
+                },
+            )
+
+    def process_pages(self, pages) -> int:
+        """
+        Process a document straight from the converter's page stream, e.g.
+        `PDFToMarkdownConverter.iter_document_pages()`, so embedding starts with the first page.
+
+        Returns:
+            int: The number of chunks stored.
         """
         print(f"Processing document: {self.document_id}")
         try:
-            file_content = self.document_content
-            split_documents = self.split_file(file_content)
-            docs_vector_store = self.generate_vector_embeddings(split_documents)
-            self.qdrant_client.store_in_qdrant(docs_vector_store, split_documents, collection_name=self.document_id)
+            chunk_count = self.store_pages(pages)
             print(f"Document processing completed successfully for: {self.document_id}")
+            return chunk_count
         except Exception as e:
-            raise Exception(f"Error processing document: {e}")
+            raise Exception(f"Error processing document: {e}") from e
+
+    def process_document(self):
+        """
+        Main method to process the document: split it page by page, embed, and store.
+
+        Returns:
+            int: The number of chunks stored.
+        """
+        return self.process_pages(iter_markdown_pages(self.document_content))
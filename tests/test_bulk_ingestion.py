@@ -0,0 +1,65 @@
+import pytest
+
+from benchmarks.fakes import FakeEmbeddingEngine
+from benchmarks.synthetic_pdf import write_pdf
+from handler.bulk_ingestion import STATUS_FAILED, BulkIngestor, convert_pdf
+from handler.ingestion_cache import IngestionCache
+from handler.qdrant_adapter import STORAGE_PER_DOCUMENT, STORAGE_SHARED, QdrantHandler
+
+
+class FailingQdrantHandler(QdrantHandler):
+    """
+    Stores the first batch of every document, then fails like a dropped connection.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(location=":memory:", **kwargs)
+        self.batches = 0
+
+    def _upload_batch(self, *args, **kwargs):
+        self.batches += 1
+        if self.batches > 1:
+            raise ConnectionError("Connection reset by peer")
+        return super()._upload_batch(*args, **kwargs)
+
+
+@pytest.fixture
+def pdf_file(tmp_path):
+    return write_pdf(str(tmp_path / "contract.pdf"), 20)
+
+
+def make_ingestor(qdrant_handler, tmp_path, **kwargs):
+    return BulkIngestor(
+        "offline", qdrant_handler, str(tmp_path / "checkpoint.jsonl"),
+        embedding_engine=FakeEmbeddingEngine(dimension=32), batch_size=8, upload_workers=1, **kwargs,
+    )
+
+
+@pytest.mark.parametrize("storage_mode", [STORAGE_PER_DOCUMENT, STORAGE_SHARED])
+def test_failed_upload_leaves_no_partial_document(pdf_file, tmp_path, storage_mode):
+    qdrant_handler = FailingQdrantHandler(storage_mode=storage_mode)
+    ingestor = make_ingestor(qdrant_handler, tmp_path)
+    content_hash = IngestionCache.compute_file_hash(pdf_file)
+    converted = convert_pdf(pdf_file, content_hash, str(tmp_path))
+
+    with pytest.raises(Exception):
+        ingestor.ingest_converted(converted)
+
+    assert qdrant_handler.batches > 1
+    assert not qdrant_handler.collection_exists(converted["document_id"])
+    assert converted["document_id"] not in qdrant_handler.get_collection_names()
+    assert qdrant_handler.get_document_entry(converted["document_id"]) is None
+    if storage_mode == STORAGE_SHARED:
+        assert qdrant_handler.qdrant_client.count(qdrant_handler.shared_collection).count == 0
+
+
+def test_failed_file_is_not_cached_or_stored(pdf_file, tmp_path):
+    qdrant_handler = FailingQdrantHandler()
+    ingestion_cache = IngestionCache(str(tmp_path / "cache"))
+    ingestor = make_ingestor(qdrant_handler, tmp_path, ingestion_cache=ingestion_cache, convert_workers=1)
+
+    summary = ingestor.run([pdf_file], progress=lambda message: None)
+
+    assert summary[STATUS_FAILED] == 1
+    assert qdrant_handler.get_collection_names() == []
+    assert ingestion_cache.lookup(IngestionCache.compute_file_hash(pdf_file)) is None
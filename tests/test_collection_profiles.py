@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from handler.collection_profiles import (
+    PROFILE_BINARY, PROFILE_DEFAULT, PROFILE_ON_DISK, PROFILE_SCALAR, get_collection_profile, infer_profile_name,
+)
+from handler.qdrant_adapter import STORAGE_PER_DOCUMENT, STORAGE_SHARED, QdrantHandler
+
+
+def store(qdrant_handler, document_id, points=4, dimension=16):
+    payloads = [{"text": f"{document_id} {index}", "page": 1, "char_start": 0, "char_end": 1} for index in range(points)]
+    vectors = np.random.default_rng(0).standard_normal((points, dimension)).astype(np.float32)
+    qdrant_handler.store_batches(iter([(payloads, vectors)]), collection_name=document_id)
+
+
+@pytest.mark.parametrize("name", [PROFILE_DEFAULT, PROFILE_ON_DISK, PROFILE_SCALAR, PROFILE_BINARY])
+def test_infer_profile_name_reads_the_collection_config(name):
+    # Shaped like the `CollectionInfo.config` of a Qdrant server; the local mode drops quantization settings.
+    profile = get_collection_profile(name)
+    config = SimpleNamespace(
+        params=SimpleNamespace(vectors=profile.vectors_config(16)),
+        quantization_config=profile.quantization_config(),
+    )
+
+    assert infer_profile_name(config) == name
+
+
+@pytest.mark.parametrize("storage_mode", [STORAGE_PER_DOCUMENT, STORAGE_SHARED])
+def test_registry_records_the_profile_of_an_existing_collection(storage_mode):
+    creator = QdrantHandler(location=":memory:", storage_mode=storage_mode, collection_profile=PROFILE_BINARY)
+    store(creator, "contract")
+    # A handler configured with another profile, e.g. another QDRANT_COLLECTION_PROFILE, on the same store.
+    other = QdrantHandler(location=":memory:", storage_mode=storage_mode, collection_profile=PROFILE_DEFAULT)
+    other.qdrant_client, other.registry = creator.qdrant_client, creator.registry
+
+    document_id = "contract" if storage_mode == STORAGE_PER_DOCUMENT else "amendment"
+    store(other, document_id)
+
+    assert other.get_document_entry(document_id)["collection_profile"] == PROFILE_BINARY
+    expected = get_collection_profile(PROFILE_BINARY).search_params()
+    assert other.resolve_collection_profile(document_id).search_params() == expected
+    fresh = QdrantHandler(location=":memory:", storage_mode=storage_mode)
+    fresh.qdrant_client, fresh.registry = creator.qdrant_client, creator.registry
+    assert fresh.resolve_collection_profile(document_id).search_params() == expected
@@ -0,0 +1,33 @@
+import numpy as np
+
+from handler.document_snapshot import export_document, import_document
+from handler.qdrant_adapter import QdrantHandler
+
+
+def store(qdrant_handler, document_id, points):
+    payloads = [{"text": f"{document_id} {index}", "page": 1, "char_start": 0, "char_end": 1} for index in range(points)]
+    vectors = np.random.default_rng(0).standard_normal((points, 16)).astype(np.float32)
+    qdrant_handler.store_batches(iter([(payloads, vectors)]), collection_name=document_id)
+
+
+def test_snapshot_round_trip(tmp_path):
+    source = QdrantHandler(location=":memory:")
+    store(source, "contract", points=5)
+    export_document(source, "contract", str(tmp_path / "contract"))
+    target = QdrantHandler(location=":memory:")
+
+    assert import_document(target, str(tmp_path / "contract"), document_id="copy") == 5
+
+    assert target.get_document_entry("copy")["chunk_count"] == 5
+
+
+def test_empty_snapshot_registers_no_document(tmp_path):
+    source = QdrantHandler(location=":memory:")
+    store(source, "contract", points=0)
+    export_document(source, "contract", str(tmp_path / "contract"))
+    target = QdrantHandler(location=":memory:")
+
+    assert import_document(target, str(tmp_path / "contract"), document_id="copy") == 0
+
+    assert target.get_document_entry("copy") is None
+    assert not target.collection_exists("copy")
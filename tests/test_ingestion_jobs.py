@@ -0,0 +1,154 @@
+import os
+import time
+
+import pytest
+
+from handler.embedding_scheduler import DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE
+from handler.ingestion_jobs import (
+    JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, STAGE_EMBED, JobQueue, split_embedding_rate_limits,
+)
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    return JobQueue(str(tmp_path), retry_delay=10.0)
+
+
+def make_due(job_queue, job_id):
+    with job_queue._connect() as connection:
+        connection.execute("UPDATE jobs SET not_before = 0 WHERE job_id = ?", (job_id,))
+
+
+def test_submit_queues_the_job(job_queue, tmp_path):
+    job_id = job_queue.submit(str(tmp_path / "contract.pdf"), max_attempts=2)
+
+    job = job_queue.get(job_id)
+    assert job["status"] == JOB_QUEUED
+    assert job["file_name"] == "contract.pdf"
+    assert job["attempts"] == 0
+    assert job["max_attempts"] == 2
+    assert job_queue.get("unknown") is None
+
+
+def test_claim_takes_the_oldest_queued_job_once(job_queue):
+    first = job_queue.submit("first.pdf")
+    second = job_queue.submit("second.pdf")
+
+    job = job_queue.claim("worker-1")
+    assert job["job_id"] == first
+    assert job["status"] == JOB_RUNNING
+    assert job["attempts"] == 1
+    assert job["worker"] == "worker-1"
+    assert job_queue.claim("worker-2")["job_id"] == second
+    assert job_queue.claim("worker-3") is None
+
+
+def test_complete_records_the_result(job_queue):
+    job_id = job_queue.submit("contract.pdf")
+    job_queue.claim("worker")
+    job_queue.update_progress(job_id, STAGE_EMBED, 0.5, "Embedding")
+    assert job_queue.get(job_id)["progress"] == pytest.approx(0.5)
+
+    job_queue.complete(job_id, {"document_id": "contract_1"})
+
+    job = job_queue.get(job_id)
+    assert job["status"] == JOB_DONE
+    assert job["progress"] == 1.0
+    assert job["result"] == {"document_id": "contract_1"}
+
+
+def test_transient_failures_are_retried_with_exponential_backoff(job_queue):
+    job_id = job_queue.submit("contract.pdf", max_attempts=3)
+
+    for attempt, delay in ((1, 10.0), (2, 20.0)):
+        job_queue.claim("worker")
+        before = time.time()
+        assert job_queue.fail(job_id, "rate limited", retry=True) == JOB_QUEUED
+        job = job_queue.get(job_id)
+        assert job["status"] == JOB_QUEUED
+        assert job["attempts"] == attempt
+        assert job["error"] == "rate limited"
+        assert job["worker"] is None
+        assert job["not_before"] == pytest.approx(before + delay, abs=1.0)
+        assert job_queue.claim("worker") is None
+        make_due(job_queue, job_id)
+
+    job_queue.claim("worker")
+    assert job_queue.fail(job_id, "rate limited", retry=True) == JOB_FAILED
+    job = job_queue.get(job_id)
+    assert job["status"] == JOB_FAILED
+    assert job["attempts"] == 3
+    assert job["finished_at"] is not None
+
+
+def test_permanent_failures_are_not_retried(job_queue):
+    job_id = job_queue.submit("contract.pdf", max_attempts=3)
+    job_queue.claim("worker")
+
+    assert job_queue.fail(job_id, "not a PDF", retry=False) == JOB_FAILED
+    assert job_queue.get(job_id)["status"] == JOB_FAILED
+    assert job_queue.claim("worker") is None
+
+
+def test_cancel_queued_job_removes_its_upload(job_queue):
+    job_id = job_queue.submit_upload("contract.pdf", b"%PDF-1.4")
+    upload_path = job_queue.get(job_id)["pdf_path"]
+    assert os.path.exists(upload_path)
+
+    assert job_queue.cancel(job_id)
+
+    assert job_queue.get(job_id)["status"] == JOB_CANCELLED
+    assert not os.path.exists(upload_path)
+    assert job_queue.claim("worker") is None
+
+
+def test_cancel_running_job_is_requested_from_the_worker(job_queue):
+    job_id = job_queue.submit("contract.pdf")
+    job_queue.claim("worker")
+
+    assert job_queue.cancel(job_id)
+
+    job = job_queue.get(job_id)
+    assert job["status"] == JOB_RUNNING
+    assert job_queue.is_cancel_requested(job_id)
+    # A transient failure of a job being cancelled is final.
+    assert job_queue.fail(job_id, "timeout", retry=True) == JOB_FAILED
+
+
+def test_mark_cancelled_finishes_the_job(job_queue):
+    job_id = job_queue.submit("contract.pdf")
+    job_queue.claim("worker")
+    job_queue.cancel(job_id)
+
+    job_queue.mark_cancelled(job_id)
+
+    assert job_queue.get(job_id)["status"] == JOB_CANCELLED
+    assert not job_queue.cancel(job_id)
+
+
+def test_requeue_stale_recovers_jobs_without_heartbeat(job_queue):
+    stale = job_queue.submit("stale.pdf")
+    alive = job_queue.submit("alive.pdf")
+    job_queue.claim("crashed-worker")
+    job_queue.claim("live-worker")
+    with job_queue._connect() as connection:
+        connection.execute("UPDATE jobs SET heartbeat_at = ? WHERE job_id = ?", (time.time() - 600, stale))
+    job_queue.heartbeat(alive)
+
+    assert job_queue.requeue_stale(stale_seconds=120) == 1
+
+    assert job_queue.get(stale)["status"] == JOB_QUEUED
+    assert job_queue.get(stale)["error"] == "The worker running this job stopped responding."
+    assert job_queue.get(alive)["status"] == JOB_RUNNING
+
+
+def test_default_embedding_limits_are_split_between_workers_and_the_ui():
+    limits = {"tokens_per_minute": None, "requests_per_minute": None, "max_in_flight": 4}
+
+    worker_limits, ui_limits = split_embedding_rate_limits(limits, workers=3, reserved_share=0.1)
+
+    assert worker_limits["tokens_per_minute"] == (DEFAULT_TOKENS_PER_MINUTE * 9 // 10) // 3
+    assert worker_limits["requests_per_minute"] == (DEFAULT_REQUESTS_PER_MINUTE * 9 // 10) // 3
+    assert ui_limits["tokens_per_minute"] == DEFAULT_TOKENS_PER_MINUTE // 10
+    assert ui_limits["requests_per_minute"] == DEFAULT_REQUESTS_PER_MINUTE // 10
+    assert worker_limits["max_in_flight"] == ui_limits["max_in_flight"] == 4
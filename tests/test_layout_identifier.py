@@ -0,0 +1,44 @@
+from benchmarks.synthetic_pdf import write_pdf
+from handler.layout_identifier import PDFToMarkdownConverter, write_markdown_sections
+
+
+class ScannedPagesConverter(PDFToMarkdownConverter):
+    """
+    Treats the given pages as scans and OCRs them without ocrmypdf.
+    """
+
+    def __init__(self, pdf_file, scanned_pages):
+        super().__init__(pdf_file)
+        self.scanned_pages = scanned_pages
+
+    def _page_needs_ocr(self, page):
+        return page["page"] in self.scanned_pages
+
+    def _iter_ocr_pages(self, page_numbers):
+        for number in page_numbers:
+            yield {"page": number, "text": f"OCR text of page {number}"}
+
+
+def test_ocr_pages_are_streamed_in_page_order(tmp_path):
+    converter = ScannedPagesConverter(write_pdf(str(tmp_path / "contract.pdf"), 6), scanned_pages={3, 5})
+
+    pages = list(converter.iter_document_pages())
+
+    assert [page["page"] for page in pages] == [1, 2, 3, 4, 5, 6]
+    assert pages[2]["text"] == "OCR text of page 3"
+    assert pages[4]["text"] == "OCR text of page 5"
+    assert pages[3]["text"] and not pages[3]["text"].startswith("OCR")
+
+
+def test_markdown_sections_are_written_in_page_order(tmp_path):
+    converter = ScannedPagesConverter(write_pdf(str(tmp_path / "contract.pdf"), 4), scanned_pages={1})
+    markdown_path = tmp_path / "contract.md"
+
+    with open(markdown_path, "w", encoding="utf-8") as markdown_file:
+        sections = list(write_markdown_sections(converter.iter_markdown_sections(), markdown_file))
+
+    assert [section["page"] for section in sections] == [1, 2, 3, 4, None]
+    markdown = markdown_path.read_text(encoding="utf-8")
+    positions = [markdown.index(f"### Page {number}\n") for number in (1, 2, 3, 4)]
+    assert positions == sorted(positions)
+    assert "OCR text of page 1" in markdown
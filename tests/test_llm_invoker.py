@@ -0,0 +1,34 @@
+from benchmarks.fakes import FakeChatCompletion
+from handler.instrumentation import instrumentation
+from handler.llm_invoker import GPT4Assistant
+
+
+def test_stream_response_records_prompt_and_completion_tokens():
+    assistant = GPT4Assistant("offline", completion_fn=FakeChatCompletion(reply_words=20))
+    instrumentation.reset()
+
+    context_chunks, query = "The term is two years.", "What is the term?"
+
+    answer = "".join(assistant.stream_response("general_query", context_chunks, query))
+
+    counters = instrumentation.snapshot()["counters"]
+    messages = assistant.build_messages(assistant.build_prompt("general_query", context_chunks, query))
+    assert counters["llm_prompt_tokens"] > sum(assistant.count_tokens(message["content"]) for message in messages)
+    assert counters["llm_completion_tokens"] == assistant.count_tokens(answer)
+    assert assistant.last_latency["total_latency"] is not None
+
+
+def test_stream_response_reports_a_stream_failing_midway():
+    def failing_completion(**kwargs):
+        yield {"choices": [{"delta": {"content": "The term "}}]}
+        raise ConnectionError("Connection reset by peer")
+
+    assistant = GPT4Assistant("offline", completion_fn=failing_completion)
+
+    answer = "".join(assistant.stream_response("general_query", "The term is two years.", "What is the term?"))
+
+    assert answer.startswith("The term An error occurred")
+    assert assistant.last_latency["error"] == "Connection reset by peer"
+    assistant.completion_fn = FakeChatCompletion(reply_words=5)
+    "".join(assistant.stream_response("general_query", "The term is two years.", "What is the term?"))
+    assert assistant.last_latency["error"] is None
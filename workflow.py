@@ -1,10 +1,19 @@
 import streamlit as st
-from handler.layout_identifier import PDFToMarkdownConverter
 from handler.qdrant_adapter import QdrantHandler
-from handler.vector_generator import QdrantDocumentProcessor
 from handler.query_retrieval import QdrantQueryHandler
+from handler.portfolio_query import PortfolioQueryHandler
+from handler.context_assembler import ContextAssembler
 from handler.llm_invoker import GPT4Assistant
+from handler.ingestion_cache import IngestionCache
+from handler.embedding_cache import EmbeddingCache
+from handler.answer_cache import SemanticAnswerCache
+from handler.instrumentation import configure_instrumentation
+from handler.embedding_scheduler import configure_embedding_scheduler
+from handler.ingestion_jobs import (
+    ACTIVE_STATUSES, JOB_CANCELLED, JOB_DONE, JobQueue, JobWorkerPool, split_embedding_rate_limits,
+)
 from dotenv import load_dotenv
+import atexit
 import os
 
 load_dotenv()
@@ -12,47 +21,181 @@ load_dotenv()
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+QDRANT_STORAGE_MODE = os.getenv("QDRANT_STORAGE_MODE", "per_document")
+QDRANT_COLLECTION_PROFILE = os.getenv("QDRANT_COLLECTION_PROFILE", "default")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL") or None
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+EMBEDDING_RATE_LIMITS = {
+    "tokens_per_minute": int(os.getenv("OPENAI_EMBEDDING_TPM", "0")) or None,
+    "requests_per_minute": int(os.getenv("OPENAI_EMBEDDING_RPM", "0")) or None,
+    "max_in_flight": int(os.getenv("OPENAI_EMBEDDING_CONCURRENCY", "0")) or None,
+}
+# The share of the embedding limits kept for the queries of this process; the workers split the rest.
+EMBEDDING_UI_SHARE = float(os.getenv("OPENAI_EMBEDDING_UI_SHARE", "0.1"))
+
+
+@st.cache_resource
+def load_instrumentation():
+    return configure_instrumentation(
+        os.getenv("CLAUSEAI_METRICS", "").split(","),
+        json_log_path=os.getenv("CLAUSEAI_METRICS_LOG") or None,
+        prometheus_port=int(os.getenv("CLAUSEAI_METRICS_PORT", "0")) or None,
+    )
+
+
+@st.cache_resource
+def load_qdrant_handler():
+    """
+    Build the Qdrant handler once per server process; its connection is shared by all sessions and reruns.
+    """
+    return QdrantHandler(
+        url=QDRANT_URL, api_key=QDRANT_API_KEY, storage_mode=QDRANT_STORAGE_MODE,
+        collection_profile=QDRANT_COLLECTION_PROFILE,
+    )
+
+
+@st.cache_resource
+def load_caches():
+    """
+    Open the on-disk ingestion, embedding and answer caches once per server process.
+    """
+    answer_cache = SemanticAnswerCache(
+        similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")),
+        ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    )
+    return IngestionCache(), EmbeddingCache(), answer_cache
+
+
+@st.cache_resource
+def load_job_queue():
+    return JobQueue()
+
+
+@st.cache_resource
+def start_ingestion_workers():
+    """
+    Start the ingestion worker processes once per server process. With INGESTION_WORKERS=0 the jobs
+    are left to workers started separately with `python -m handler.ingestion_jobs`.
+    """
+    if INGESTION_WORKERS <= 0:
+        return None
+    pool = JobWorkerPool(
+        load_job_queue().cache_dir,
+        {
+            "openai_api_key": OPENAI_API_KEY,
+            "qdrant_url": QDRANT_URL,
+            "qdrant_api_key": QDRANT_API_KEY,
+            "storage_mode": QDRANT_STORAGE_MODE,
+            "collection_profile": QDRANT_COLLECTION_PROFILE,
+            "embedding_backend": EMBEDDING_BACKEND,
+            "embedding_model": EMBEDDING_MODEL,
+            "embedding_rate_limits": EMBEDDING_RATE_LIMITS,
+        },
+        workers=INGESTION_WORKERS,
+        reserved_share=EMBEDDING_UI_SHARE,
+    ).start()
+    atexit.register(pool.stop)
+    return pool
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def list_document_ids():
+    """
+    List the stored documents. Cached for a minute and cleared whenever a document is ingested.
+    """
+    return load_qdrant_handler().get_collection_names()
+
+
+load_instrumentation()
+configure_embedding_scheduler(**split_embedding_rate_limits(EMBEDDING_RATE_LIMITS, 1, EMBEDDING_UI_SHARE)[1])
+qdrant_handler = load_qdrant_handler()
+ingestion_cache, embedding_cache, answer_cache = load_caches()
+job_queue = load_job_queue()
+start_ingestion_workers()
 
 st.sidebar.title("Control Panel")
-page = st.sidebar.radio("Choose a page:", ["Process Document", "Query Document"])
+page = st.sidebar.radio("Choose a page:", ["Process Document", "Query Document", "Query Portfolio"])
+
+
+@st.fragment(run_every=2)
+def show_job_progress(job_id: str):
+    """
+    Poll a running ingestion job. Only this fragment reruns while the job is active;
+    the whole page is redrawn once it finishes.
+    """
+    job = job_queue.get(job_id)
+    if job["status"] not in ACTIVE_STATUSES:
+        list_document_ids.clear()
+        st.rerun()
+    stage = job["stage"] or "queued"
+    st.progress(job["progress"], text=f"{stage.capitalize()}: {job['message']}")
+    if st.button("Cancel", key=f"cancel_{job_id}"):
+        job_queue.cancel(job_id)
+
+
+def show_document(file_name: str, result: dict):
+    if result["reused"]:
+        st.success(f"Document '{file_name}' was already processed as '{result['document_id']}'.")
+    else:
+        st.success(f"Document '{file_name}' processed as '{result['document_id']}'.")
+    st.code(result["markdown_preview"], language="markdown")
+    st.json(result["entities"])
 
-qdrant_handler = QdrantHandler(url=QDRANT_URL, api_key=QDRANT_API_KEY)
 
 if page == "Process Document":
     st.title("ClauseAI")
 
     uploaded_file = st.file_uploader("Upload a Document", type=["pdf"])
     if uploaded_file:
-        pdf_path = f"/tmp/{uploaded_file.name}"
-        with open(pdf_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        st.success(f"Document '{uploaded_file.name}' uploaded successfully!")
-
-        st.write("**Step 1: Converting Document to Markdown...**")
-        converter = PDFToMarkdownConverter(pdf_path)
-        markdown_file, markdown_content = converter.convert()
-        st.code(markdown_content[:500], language="markdown")
-
-        st.write("**Step 2: Generating Vector Embeddings...**")
-        processor = QdrantDocumentProcessor(
-            OPENAI_API_KEY, qdrant_handler, markdown_content, markdown_file
-        )
-        processor.process_document()
-        st.success("Vector embeddings generated successfully!")
+        # Streamlit reruns this script on every interaction; each upload is queued once per session.
+        upload_jobs = st.session_state.setdefault("upload_jobs", {})
+        content_hash = IngestionCache.compute_bytes_hash(uploaded_file.getbuffer())
+        force_reprocess = st.button("Re-process document")
+
+        cached_document = None if force_reprocess else ingestion_cache.lookup(content_hash)
+        if cached_document and not (
+            cached_document["entities"] and qdrant_handler.collection_exists(cached_document["document_id"])
+        ):
+            cached_document = None
 
-        st.write("**Step 3: Extracting Entities...**")
-        assistant = GPT4Assistant(OPENAI_API_KEY)
-        response = assistant.get_response(
-            task_type="entity_extraction", context_chunks=markdown_content, query=""
+        if cached_document and content_hash not in upload_jobs:
+            show_document(uploaded_file.name, {
+                "document_id": cached_document["document_id"],
+                "markdown_preview": cached_document["markdown_content"][:500],
+                "entities": cached_document["entities"],
+                "reused": True,
+            })
+        else:
+            if force_reprocess or content_hash not in upload_jobs:
+                upload_jobs[content_hash] = job_queue.submit_upload(
+                    uploaded_file.name, uploaded_file.getbuffer(), force_reprocess=force_reprocess
+                )
+            job = job_queue.get(upload_jobs[content_hash])
+            if job["status"] in ACTIVE_STATUSES:
+                show_job_progress(job["job_id"])
+            elif job["status"] == JOB_DONE:
+                show_document(uploaded_file.name, job["result"])
+            elif job["status"] == JOB_CANCELLED:
+                st.warning(f"Processing of '{uploaded_file.name}' was cancelled.")
+            else:
+                st.error(f"Processing of '{uploaded_file.name}' failed after {job['attempts']} attempts: {job['error']}")
+
+    with st.expander("Recent ingestion jobs"):
+        st.dataframe(
+            [
+                {key: job[key] for key in ("file_name", "status", "stage", "progress", "attempts", "message")}
+                for job in job_queue.list_jobs(limit=20)
+            ],
+            use_container_width=True,
         )
-        st.json(response)
-        st.success("Entities extracted successfully!")
 
 if page == "Query Document":
     st.title("ClauseAI")
 
     st.write("**Step 1: Select a Document ID**")
-    document_ids = qdrant_handler.get_collection_names()
+    document_ids = list_document_ids()
 
     if not document_ids:
         st.warning("No documents found in Qdrant. Please process a document first.")
@@ -66,21 +209,75 @@ if page == "Query Document":
             query_client = QdrantQueryHandler(
                 document_id=selected_document_id,
                 openai_api_key=OPENAI_API_KEY,
-                qdrant_client=qdrant_handler
+                qdrant_client=qdrant_handler,
+                embedding_cache=embedding_cache,
             )
-            qdrant_response = query_client.query_response(query)
+            query_vector = query_client.generate_vector_embedding(query)
+            document_version = qdrant_handler.get_document_version(selected_document_id)
+            cached_answer = answer_cache.lookup(selected_document_id, query_vector, document_version)
 
-            st.write("**Qdrant Query Response:**")
-            st.json(qdrant_response)
+            if cached_answer:
+                st.write("**LLM Refined Response:**")
+                st.write(cached_answer["answer"])
+                st.caption(
+                    f"Answered from cache (similar question: \"{cached_answer['query']}\", "
+                    f"similarity {cached_answer['similarity']:.3f})"
+                )
+            else:
+                qdrant_response = query_client.query_response(query, query_vector=query_vector)
 
-            context_chunks = [result["payload"] for result in qdrant_response]
+                st.write("**Qdrant Query Response:**")
+                st.json(qdrant_response)
 
-            assistant = GPT4Assistant(OPENAI_API_KEY)
-            refined_response = assistant.get_response(
-                task_type="general_query",
-                context_chunks=context_chunks,
-                query=query
-            )
+                context_assembler = ContextAssembler(token_budget=CONTEXT_TOKEN_BUDGET)
+                context_chunks = context_assembler.assemble(qdrant_response)
+
+                assistant = GPT4Assistant(OPENAI_API_KEY)
+
+                st.write("**LLM Refined Response:**")
+                refined_response = st.write_stream(
+                    assistant.stream_response(
+                        task_type="general_query",
+                        context_chunks=context_chunks,
+                        query=query
+                    )
+                )
+                st.caption(
+                    f"Time to first token: {assistant.last_latency['time_to_first_token'] or 0:.2f}s, "
+                    f"total: {assistant.last_latency['total_latency']:.2f}s, "
+                    f"context: {context_assembler.last_stats['tokens']} tokens from "
+                    f"{context_assembler.last_stats['chunks']} chunks"
+                )
+                if qdrant_response and assistant.last_latency["error"] is None:
+                    answer_cache.store(selected_document_id, query, query_vector, refined_response, document_version)
 
-            st.write("**LLM Refined Response:**")
-            st.write(refined_response)
+if page == "Query Portfolio":
+    st.title("ClauseAI")
+
+    document_ids = list_document_ids()
+    if not document_ids:
+        st.warning("No documents found in Qdrant. Please process a document first.")
+    else:
+        selected_document_ids = st.multiselect("Documents to search (all when empty):", document_ids)
+        query = st.text_input("Enter your question about the documents:")
+        col_documents, col_hits = st.columns(2)
+        limit = col_documents.number_input("Documents to show", min_value=1, max_value=100, value=10)
+        per_document = col_hits.number_input("Passages per document", min_value=1, max_value=10, value=3)
+
+        if query:
+            portfolio_client = PortfolioQueryHandler(
+                OPENAI_API_KEY, qdrant_handler, embedding_cache=embedding_cache,
+                max_concurrency=int(os.getenv("PORTFOLIO_QUERY_CONCURRENCY", "16")),
+            )
+            response = portfolio_client.query_response(
+                query, document_ids=selected_document_ids or None, limit=int(limit), per_document=int(per_document)
+            )
+            st.caption(f"Searched {response['searched']} documents, {len(response['documents'])} matched.")
+            if response["timed_out"]:
+                st.warning(f"{len(response['timed_out'])} documents were not searched within the time budget.")
+            for document in response["documents"]:
+                with st.expander(f"{document['document_id']} (best score {document['best_score']:.3f})"):
+                    for hit in document["hits"]:
+                        page_number = hit["payload"].get("page")
+                        st.markdown(f"**{hit['score']:.3f}**" + (f" · page {page_number}" if page_number else ""))
+                        st.write(hit["payload"].get("text", ""))